@@ -0,0 +1,129 @@
+# text analysis off the UI thread, for app.py
+#   worker = AnalysisWorker(analyze, master.after)
+#   worker.submit(text, on_done)      # on_done(result, seconds, cached) runs on the Tk thread
+# one background thread analyses the newest request only; results come back by polling
+# a queue from master.after, so Tk is only ever touched from its own thread.
+
+import collections
+import hashlib
+import queue
+import threading
+import time
+
+
+class LRUCache:
+    """A small least-recently-used mapping."""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._items = collections.OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        if key not in self._items:
+            return default
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+
+def text_key(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class AnalysisWorker:
+    """Runs analyze(text) on a background thread and hands the result back to the UI.
+
+    after(ms, fn) schedules fn on the UI thread (Tk's master.after). A new submit
+    cancels the previous request: if it has not started it is dropped, if it is
+    running its result is cached but not delivered. Unchanged text is served from
+    an LRU cache keyed by the text's SHA-256, without touching the thread.
+    """
+
+    def __init__(self, analyze, after, cache_size=32, poll_ms=20):
+        self.analyze = analyze
+        self.after = after
+        self.poll_ms = poll_ms
+        self.cache = LRUCache(cache_size)
+        self._generation = 0
+        self._callbacks = None          # (on_done, on_error) of the current request
+        self._request = None            # newest request not yet picked up by the thread
+        self._wakeup = threading.Condition()
+        self._results = queue.Queue()
+        self._polling = False
+        self._thread = None
+
+    @property
+    def busy(self):
+        return self._callbacks is not None
+
+    def submit(self, text, on_done, on_error=None):
+        """Analyse text; on_done(result, seconds, cached) or on_error(exc) runs on the UI thread."""
+        key = text_key(text)
+        self._generation += 1
+        if key in self.cache:
+            self._callbacks = None
+            start = time.perf_counter()
+            on_done(self.cache.get(key), time.perf_counter() - start, True)
+            return
+        self._callbacks = (on_done, on_error)
+        with self._wakeup:
+            self._request = (self._generation, key, text)
+            self._wakeup.notify()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='analysis', daemon=True)
+            self._thread.start()
+        if not self._polling:
+            self._polling = True
+            self.after(self.poll_ms, self._poll)
+
+    def cancel(self):
+        """Drop the current request; a running analysis finishes into the cache only."""
+        self._generation += 1
+        self._callbacks = None
+        with self._wakeup:
+            self._request = None
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while self._request is None:
+                    self._wakeup.wait()
+                generation, key, text = self._request
+                self._request = None
+            start = time.perf_counter()
+            try:
+                result, error = self.analyze(text), None
+            except Exception as exc:    # reported to on_error on the UI thread
+                result, error = None, exc
+            self._results.put((generation, key, result, error, time.perf_counter() - start))
+
+    def _poll(self):
+        while True:
+            try:
+                generation, key, result, error, seconds = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if error is None:
+                self.cache.put(key, result)
+            if generation == self._generation and self._callbacks is not None:
+                on_done, on_error = self._callbacks
+                self._callbacks = None
+                if error is None:
+                    on_done(result, seconds, False)
+                elif on_error is not None:
+                    on_error(error)
+        if self.busy:
+            self.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
@@ -3,44 +3,28 @@
 
 import tkinter as tk
 from tkinter import scrolledtext
-from pyo import Server, Sine, Adsr, Pattern
+from analysis_worker import AnalysisWorker
+from audio_backend import get_backend
+from feature_cache import from_env
+import metrics
 from six_dimensions import analyze_text
-import random
-
-# Configuration constants
-CHORD_VOL_MIN, CHORD_VOL_MAX = 0.01, 0.4
-NOTES_VOL_MIN, NOTES_VOL_MAX = 1.0, 3.0
-INTERVAL_MIN, INTERVAL_MAX = 0.5, 4.0
-TEMPO_JITTER = 0.1
-ROOT_C4 = 261.63
-
-# Mapping functions
-def map_valence(valence):
-    intervals = [0,4,7] if valence >= 0 else [0,3,7]
-    root_freq = ROOT_C4 * (2 ** valence)
-    return [root_freq * (2 ** (i/12)) for i in intervals]
-
-def map_variation(variation):
-    chord_vol = CHORD_VOL_MAX - variation * (CHORD_VOL_MAX - CHORD_VOL_MIN)
-    note_vol  = NOTES_VOL_MIN + variation * (NOTES_VOL_MAX - NOTES_VOL_MIN)
-    return chord_vol, note_vol
-
-def map_arousal(arousal_norm):
-    return INTERVAL_MAX - arousal_norm * (INTERVAL_MAX - INTERVAL_MIN)
-
-note_index = [0]
-def map_dominance(dominance_norm, chord):
-    if random.random() < dominance_norm:
-        note_index[0] = (note_index[0] + 1) % len(chord)
-        return chord[note_index[0]]
-    else:
-        return random.choice(chord)
-
-def map_subjectivity(subjectivity, min_release=0.1, max_release=1.0):
-    return min_release + subjectivity * (max_release - min_release)
+from mapping import APP, clamp_features, soundscape_params
+from soundscape import HOP_WORDS, NOTES_PER_WINDOW, WINDOW_WORDS, Soundscape
+from trajectory import analyze_windows
+import time
+
+# the mapping (volumes, tempo, pitch, envelope) is mapping.py's APP preset, shared with main.py's
+
+# runs on the analysis thread: whole-text features plus the per-window trajectory;
+# with $SOUNDSCAPE_CACHE set, whole-text features survive restarts in that SQLite file
+_cache = from_env()
+
+def analyze(text):
+    features = _cache.analyze(text) if _cache is not None else analyze_text(text)
+    return features, analyze_windows(text, window=WINDOW_WORDS, hop=HOP_WORDS)
 
 class EmotionMusicApp:
-    def __init__(self, master):
+    def __init__(self, master, backend=None):
         self.master = master
         master.title("Emotion-to-Music")
 
@@ -56,15 +40,27 @@ class EmotionMusicApp:
         self.run_button = tk.Button(master, text="Play & Analyze", font=font, command=self.run_analysis)
         self.run_button.grid(row=2, column=0, pady=5)
 
+        # Instrumentation (metrics.py): per-stage timings and counters, shown in the console
+        self.profile = tk.BooleanVar(master, metrics.enabled())
+        tk.Checkbutton(master, text="Profile", font=font, variable=self.profile,
+                       command=lambda: metrics.enable(self.profile.get())).grid(row=2, column=1, sticky="w")
+        self.stats_button = tk.Button(master, text="Stats", font=font, command=self.show_stats)
+        self.stats_button.grid(row=2, column=1, sticky="e", pady=5)
+
         # Output console
         tk.Label(master, text="Analysis Output:", font=font).grid(row=3, column=0, sticky="w")
         self.output_console = scrolledtext.ScrolledText(master, height=12, width=80, font=font, state="disabled")
         self.output_console.grid(row=4, column=0, columnspan=2, padx=5, pady=5)
 
-        # Set up Pyo server
-        self.server = Server(duplex=False, nchnls=2, sr=44100, audio='portaudio').boot()
-        self.server.start()
-        self.pattern = None
+        # Audio backend (pyo unless $SOUNDSCAPE_AUDIO says otherwise, or the one passed in,
+        # e.g. a null one in tests); it boots with the first analysis, not at startup
+        self.backend = backend if backend is not None else get_backend()
+        self.audio_booted = False
+        self.scape = None
+
+        # Analysis runs on a background thread, results come back through master.after
+        self.worker = AnalysisWorker(analyze, master.after)
+        self.pressed_at = None
 
     def log(self, message):
         self.output_console.config(state="normal")
@@ -72,77 +68,65 @@ class EmotionMusicApp:
         self.output_console.see(tk.END)
         self.output_console.config(state="disabled")
  
+    def show_stats(self):
+        self.log(metrics.report())
+
     def run_analysis(self):
         # Clear previous output
         self.output_console.config(state="normal")
         self.output_console.delete("1.0", tk.END)
         self.output_console.config(state="disabled")
 
-        # Stop any existing pattern
-        if self.pattern:
-            self.pattern.stop()
+        # Stop any melody still playing
+        if self.scape:
+            self.scape.stop()
 
-        # Analyze text
+        # Analyze text in the background (this replaces any analysis still running)
         text = self.text_entry.get("1.0", tk.END).strip()
-        features = analyze_text(text)
-
-        # 1) Clamp raw features to their true ranges
-        valence      = max(-1.0, min(features['valence'],    1.0))
-        arousal_raw  = max(-1.0, min(features['arousal'],    1.0))
-        dominance_raw= max(-1.0, min(features['dominance'],  1.0))
-        subjectivity = max(0.0,  min(features['subjectivity'], 1.0))
-        variation    = max(0.0,  min(features['variation'],    1.0))
-
-        # 2) Normalize arousal & dominance into [0,1] for your mappers
-        arousal_norm   = (arousal_raw   + 1) / 2
-        dominance_norm = (dominance_raw + 1) / 2
-
-        # Map to musical parameters
-        chord       = map_valence(valence)
-        #chord_vol, note_vol = map_variation(variation)
-        chord_vol, note_vol = 0.02,3.9
-        tempo       = map_arousal(arousal_norm)
-        release     = map_subjectivity(subjectivity)
-        attack      = 0.005 + subjectivity * (0.05 - 0.005)
-        decay       = 0.05  + subjectivity * (0.5  - 0.05)
-        sustain     = 0.2   + subjectivity * (0.8  - 0.2)
-        dur         = release + 1
-
-        # background chord
-        if hasattr(self, 'background'):
-            for src in self.background:
-                src.stop()
-        self.background = []
-        for note in chord:
-            self.background.append(Sine(freq=note, mul=chord_vol).out(chnl=0))
-            self.background.append(Sine(freq=note, mul=chord_vol).out(chnl=1))
+        self.pressed_at = time.perf_counter()
+        self.log(f"Analyzing {len(text.split())} words...")
+        self.worker.submit(text, self.play_analysis, self.analysis_failed)
+
+    def analysis_failed(self, error):
+        self.log(f"Analysis failed: {error!r}")
+
+    def play_analysis(self, result, seconds, cached):
+        features, trajectory = result
+        waited = time.perf_counter() - self.pressed_at
+        if cached:
+            self.log(f"Analysis: cached result, {waited * 1000:.1f} ms")
+        else:
+            self.log(f"Analysis: {seconds:.2f} s ({waited:.2f} s after pressing Play)")
+
+        # Map to musical parameters: the whole text, and the same mapping window by window
+        clamped = clamp_features(features, APP)
+        params = soundscape_params(features, APP)
+        windows = soundscape_params(trajectory, APP)
+        chord, tempo = params['chord'], params['tempo']
+        chord_vol, note_vol = params['chord_vol'], params['note_vol']
+        window_tempos = windows['tempo']
+
+        # boot the audio the first time it is needed
+        if not self.audio_booted:
+            start = time.perf_counter()
+            self.backend.boot()
+            self.audio_booted = True
+            self.log(f"Audio: {type(self.backend).__name__} booted in {(time.perf_counter() - start) * 1000:.0f} ms")
 
         # Log results
         freqs_str = ", ".join(f"{freq:.0f}" for freq in chord)
-        self.log(f"Valence (–1 to 1) = {valence:.2f}, Chord frequencies = [{freqs_str}]")
-        self.log(f"Arousal (-1 to 1): {arousal_raw:.2f}, Tempo: {tempo:.2f}")
-        self.log(f"Dominance (-1 to 1):  {dominance_raw:.2f}")
-        self.log(f"Variation (0 to 1): {variation:.2f}, Background chord volume: {chord_vol:.2f}, Notes volume: {note_vol:.2f}")
-        self.log(f"Subjectivity (0 to 1): {subjectivity:.2f}, Attack = {attack:.3f}, Decay = {decay:.3f}, Sustain = {sustain:.2f}, Release = {release:.2f}")
-
-        # Play melody
-        left_melody = []
-        right_melody = []
-
-        def play_note():
-            freq = map_dominance(dominance_norm, chord)
-            env = Adsr(
-                attack=attack, decay=decay, sustain=sustain,
-                release=release, dur=dur, mul=note_vol
-            )
-            env.play()
-            left_melody.append(Sine(freq=freq, mul=env).out(chnl=0))
-            right_melody.append(Sine(freq=freq, mul=env).out(chnl=1))
-            if len(left_melody) > 50:
-                old = left_melody.pop(0); old.stop()
-                old = right_melody.pop(0); old.stop()
-
-        self.pattern = Pattern(play_note, time=tempo).play()
+        self.log(f"Valence (–1 to 1) = {clamped['valence']:.2f}, Chord frequencies = [{freqs_str}]")
+        self.log(f"Arousal (-1 to 1): {features['arousal']:.2f}, Tempo: {tempo:.2f}")
+        self.log(f"Dominance (-1 to 1):  {features['dominance']:.2f}")
+        self.log(f"Variation (0 to 1): {clamped['variation']:.2f}, Background chord volume: {chord_vol:.2f}, Notes volume: {note_vol:.2f}")
+        self.log(f"Subjectivity (0 to 1): {clamped['subjectivity']:.2f}, Attack = {params['attack']:.3f}, Decay = {params['decay']:.3f}, Sustain = {params['sustain']:.2f}, Release = {params['release']:.2f}")
+        self.log(f"{len(window_tempos)} windows of {WINDOW_WORDS} words, tempo {window_tempos.min():.2f} to {window_tempos.max():.2f}")
+
+        # Play the background chord and the melody, window by window at a steady tempo;
+        # the notes are scheduled ahead, so their timing does not depend on this thread
+        self.scape = Soundscape(params, windows, NOTES_PER_WINDOW, jitter=0).start(self.backend)
+        if metrics.enabled():
+            self.show_stats()
 
 
 if __name__ == "__main__":
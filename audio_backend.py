@@ -0,0 +1,403 @@
+# where the soundscape is heard: live through pyo, rendered to a file, or nowhere
+#   backend = get_backend()            # $SOUNDSCAPE_AUDIO: pyo (default), offline or null
+#   scape = Soundscape(params, windows).start(backend)     # pyo boots here, not at import
+#   backend.wait(locals())             # pyo: server window; offline: write the file; null: run the clock
+# every backend takes the same calls: set_chord, note_on, play (a scheduler.Schedule of events
+# at set samples), every (a repeating timer) and stop. the offline and null backends run on a
+# virtual clock, so they need no sound card and no pyo, and play every event at its sample.
+# each has a fixed number of melody voices (voices.py): a note reuses a free one or steals one
+# (steal='age' or 'amplitude'), and stop() gives them all back, so hours of playing, or a new
+# soundscape started after every analysis, hold no more voices than the first minute did.
+#   SOUNDSCAPE_AUDIO=offline SOUNDSCAPE_OUTPUT=story.wav SOUNDSCAPE_SECONDS=120 python main.py
+
+import collections
+import itertools
+import math
+import os
+
+import numpy as np
+
+import metrics
+from scheduler import Schedule
+from soundscape import Soundscape
+from synth import BLOCK, VOICES, SynthEngine, write_wav
+from voices import VoiceAllocator
+
+ENV_BACKEND = 'SOUNDSCAPE_AUDIO'
+ENV_OUTPUT = 'SOUNDSCAPE_OUTPUT'
+ENV_SECONDS = 'SOUNDSCAPE_SECONDS'
+LOOKAHEAD = 0.25        # seconds of a schedule handed to pyo at a time
+
+Event = collections.namedtuple('Event', 'time kind args')
+
+
+def pan_gains(gain=1.0, pan=0.0):
+    """(left, right) levels for a gain and a pan from -1 (left) to 1 (right); centre is (gain, gain)."""
+    return gain * min(1.0, 1.0 - pan), gain * min(1.0, 1.0 + pan)
+
+
+class PyoBackend:
+    """pyo: real time through portaudio, or its offline driver (render.py).
+
+    The server boots on the first sound (or boot()), so creating the backend is
+    free. Several backends can share one booted server (server=...), one per
+    text, each with its own gain and pan; only the owner shuts it down.
+
+    Melody notes play on a ring of at most `voices` pyo voices (an Adsr and a
+    Sine per channel), made on first use and retriggered for every later note;
+    stop() stops them and lets them go.
+    """
+
+    def __init__(self, sr=44100, nchnls=2, audio='portaudio', server=None, gain=1.0, pan=0.0,
+                 voices=VOICES, steal='age', **server_options):
+        self.sr, self.nchnls, self.audio = sr, nchnls, audio
+        self.server_options = server_options
+        self.server = server
+        self.owner = server is None
+        self.levels = pan_gains(gain, pan)
+        self.chord = []                 # (left, right) Sines
+        self.voices = VoiceAllocator(voices, steal, sr)
+        self.pool = {}                  # voice -> (Adsr, Sines)
+        self.now = 0                    # samples, at the last hand-over of play()
+        self.timers = []
+        self.pending = {}               # CallAfters not fired yet, by number; each removes itself when it fires
+        self.calls = itertools.count()
+        self.fired = []                 # fired CallAfters, let go of on the next _after
+
+    def boot(self):
+        """The running pyo server (an offline one is started by wait())."""
+        if self.server is None:
+            from pyo import Server      # importing pyo is part of the boot cost
+            self.server = Server(duplex=False, nchnls=self.nchnls, sr=self.sr, audio=self.audio,
+                                 **self.server_options).boot()
+            if self.audio != 'offline':
+                self.server.start()
+        return self.server
+
+    def set_chord(self, freqs, amp):
+        self.boot()
+        from pyo import Sine
+        freqs, amp = [float(f) for f in freqs], float(amp)    # pyo takes Python floats only
+        if len(freqs) != len(self.chord):
+            for pair in self.chord:
+                for src in pair:
+                    src.stop()
+            self.chord = [tuple(Sine(freq=f, mul=amp * level).out(chnl=c) for c, level in enumerate(self.levels))
+                          for f in freqs]
+            return
+        for f, pair in zip(freqs, self.chord):
+            for src, level in zip(pair, self.levels):
+                src.setFreq(f)
+                src.setMul(amp * level)
+
+    def _voice(self, v):
+        if v not in self.pool:
+            from pyo import Adsr, Sine
+            env = Adsr(mul=0.0)
+            self.pool[v] = (env, tuple(Sine(mul=env * level).out(chnl=c) for c, level in enumerate(self.levels)))
+        return self.pool[v]
+
+    def _after(self, callback, delay):
+        # kept until it fires, with no cap: a CallAfter dropped before then never calls back. a fired
+        # one is not let go in its own callback: freeing it mid-block would shift pyo's list of
+        # streams and skip the next one for a block. here, called from dispatch or from outside the
+        # server, every fired CallAfter comes after the caller in that list, so it is safe
+        from pyo import CallAfter
+        self.fired.clear()
+        key = next(self.calls)
+
+        def fire():
+            self.fired.append(self.pending.pop(key))
+            callback()
+        self.pending[key] = CallAfter(fire, delay)
+
+    def _trigger(self, v, freq, amp, attack, decay, sustain, release, dur):
+        env, sines = self._voice(v)
+        for sine in sines:
+            sine.setFreq(freq)
+            sine.reset()                # every note starts at phase 0, as a new Sine would
+        env.setAttack(attack), env.setDecay(decay), env.setSustain(sustain)
+        env.setRelease(release), env.setDur(dur)
+        env.setMul(amp)
+        env.play()
+
+    def note_on(self, freq, amp, attack, decay, sustain, release, dur, delay=0.0):
+        """Start a note delay seconds after the last hand-over of play() (or now)."""
+        self.boot()
+        args = [float(x) for x in (freq, amp, attack, decay, sustain, release, dur)]
+        v = self.voices.allocate(self.now + round(delay * self.sr), *args[1:])
+        self._voice(v)
+        bs = self.server.getBufferSize()
+        block = round(delay * self.sr / bs)
+        if block > 0:
+            # the note starts at the nearest block, like a delayed play(). the voice already runs
+            # ahead of the CallAfter, so it plays from the block after the callback; a CallAfter
+            # calls back in the block before the one its time falls in: aim at the middle of this one
+            self._after(lambda: self._trigger(v, *args), (block - 0.5) * bs / self.sr)
+        else:
+            self._trigger(v, *args)
+
+    def every(self, callback, seconds):
+        """Call callback now and then every seconds; set .time on the result to change the interval."""
+        self.boot()
+        from pyo import Pattern
+        timer = Pattern(callback, time=float(seconds)).play()
+        self.timers.append(timer)
+        return timer
+
+    def play(self, schedule, lookahead=LOOKAHEAD):
+        """Play a Schedule, handing pyo the next lookahead seconds of it at a time.
+
+        Each event is started with a delay counted on the server's sample clock
+        from the first hand-over, so a late Python call does not move it; pyo
+        starts it at the nearest 256-sample block.
+        """
+        server = self.boot()
+        from pyo import Pattern
+        bs = server.getBufferSize()
+        period = math.ceil(lookahead * self.sr / bs) * bs     # whole blocks between hand-overs
+        calls = [0]
+
+        def dispatch():
+            now = self.now = calls[0] * period
+            calls[0] += 1
+            with metrics.timer('dispatch'):
+                for event in schedule.until(now + 2 * period):
+                    delay = (event.sample - now) / self.sr
+                    if event.kind == 'note':
+                        self.note_on(*event.args, delay=delay)
+                    elif delay == 0:
+                        self.set_chord(*event.args)
+                    else:
+                        self._after(lambda args=event.args: self.set_chord(*args), delay)
+
+        # half a sample short, so the Pattern's ceil(time * sr) is exactly period
+        timer = Pattern(dispatch, time=(period - 0.5) / self.sr).play()
+        self.timers.append(timer)
+        return timer
+
+    def stop(self):
+        for src in (self.timers + list(self.pending.values()) + [s for pair in self.chord for s in pair]
+                    + [s for env, sines in self.pool.values() for s in (env,) + sines]):
+            src.stop()
+        self.timers, self.chord = [], []
+        self.pool.clear()
+        self.pending.clear()
+        self.fired.clear()
+        self.voices.reclaim(self.now)
+
+    def wait(self, namespace=None):
+        """Keep playing: pyo's server window, or run the offline server to the end of its recording."""
+        server = self.boot()
+        if self.audio == 'offline':
+            server.start()
+        else:
+            server.gui(namespace or {})
+
+    def shutdown(self):
+        if self.server is not None:
+            self.stop()
+            if self.owner:
+                self.server.shutdown()
+            self.server = None
+
+
+class _Timer:
+    """A repeating callback on a virtual clock, set .time to change the next interval (like pyo's Pattern)."""
+
+    def __init__(self, callback, time, due):
+        self.callback, self.time, self.due = callback, time, due
+        self.active = True
+
+    def stop(self):
+        self.active = False
+        return self
+
+
+class _ClockBackend:
+    """A virtual clock that plays schedules to the sample and fires timers where pyo's Pattern would.
+
+    A schedule's events sound at their samples, counted from the play() call.
+    A timer is due ceil(interval * sr) samples after its previous call and is
+    called at the start of the block it falls in; a chord set from a timer is
+    heard from the next block. Between events whole spans are rendered at once.
+    """
+
+    def __init__(self, sr=44100, block=BLOCK):
+        self.sr, self.block = sr, block
+        self.now = 0                    # samples since the start
+        self.timers = []
+        self.schedules = []             # (start sample, Schedule)
+        self._firing = False
+        self._pending_chord = None
+
+    @property
+    def time(self):
+        return self.now / self.sr
+
+    def boot(self):
+        return self
+
+    def every(self, callback, seconds):
+        timer = _Timer(callback, seconds, self.now)
+        self.timers.append(timer)
+        return timer
+
+    def play(self, schedule):
+        self.schedules.append((self.now, schedule))
+
+    def set_chord(self, freqs, amp):
+        freqs, amp = [float(f) for f in freqs], float(amp)
+        if self._firing:
+            self._pending_chord = (freqs, amp)
+        else:
+            self._chord(freqs, amp)
+
+    def run(self, seconds):
+        """Advance the clock by seconds, calling the timers on the way."""
+        end = self.now + int(round(seconds * self.sr))
+        while self.now < end:
+            block_end = (self.now // self.block + 1) * self.block
+            self._firing = True
+            for timer in list(self.timers):
+                while timer.active and timer.due < block_end:
+                    timer.callback()
+                    timer.due += math.ceil(timer.time * self.sr)
+            self._firing = False
+            self.timers = [t for t in self.timers if t.active]
+            with metrics.timer('dispatch'):
+                for start, schedule in self.schedules:
+                    for event in schedule.until(self.now - start + 1):
+                        if event.kind == 'note':
+                            self.note_on(*event.args)
+                        else:
+                            self._chord(*event.args)
+            if self._pending_chord is not None:
+                stop = min(end, block_end)
+            else:
+                # nothing changes until the block holding the next due timer
+                due = min((t.due for t in self.timers), default=end)
+                stop = min(end, max(block_end, due // self.block * self.block))
+            # or until the next scheduled event
+            stop = min([stop] + [start + schedule.peek() for start, schedule in self.schedules])
+            self._advance(stop - self.now)
+            self.now = stop
+            if self._pending_chord is not None:
+                self._chord(*self._pending_chord)
+                self._pending_chord = None
+
+    def stop(self):
+        for timer in self.timers:
+            timer.stop()
+        self.timers, self.schedules = [], []
+        self._pending_chord = None
+
+    def shutdown(self):
+        self.stop()
+
+
+class OfflineBackend(_ClockBackend):
+    """Renders with the NumPy engine (synth.py) as fast as the CPU allows.
+
+    wait() renders seconds of audio and writes it to path (a .wav) if one is
+    given; audio() is everything rendered so far, (frames, 2) float32.
+    """
+
+    def __init__(self, path=None, seconds=60.0, sr=44100, block=BLOCK, voices=VOICES, steal='age'):
+        super().__init__(sr, block)
+        self.path, self.seconds = path, seconds
+        self.engine = SynthEngine(sr, voices, steal)
+        self.voices = self.engine.voices
+        self._chunks = []
+
+    def _chord(self, freqs, amp):
+        self.engine.set_chord(freqs, amp)
+
+    def note_on(self, freq, amp, attack, decay, sustain, release, dur):
+        self.engine.note_on(freq, amp, attack, decay, sustain, release, dur)
+
+    def _advance(self, n):
+        self._chunks.append(self.engine.render(n))
+
+    def stop(self):
+        super().stop()
+        self.engine.set_chord([], 0.0)
+        self.engine.reclaim()
+
+    def audio(self):
+        mono = np.concatenate(self._chunks) if self._chunks else np.zeros(0, dtype=np.float32)
+        return np.repeat(mono[:, None], 2, axis=1)
+
+    def wait(self, namespace=None):
+        self.run(self.seconds)
+        if self.path:
+            write_wav(self.path, self.audio(), self.sr)
+
+
+class NullBackend(_ClockBackend):
+    """Plays nothing and records what would have sounded, as Events (time in seconds, kind, args).
+
+    kinds: 'chord' (freqs, amp), 'note' (freq, amp, attack, decay, sustain,
+    release, dur) and 'stop' (). wait() runs the clock for seconds. keep bounds
+    the events kept to the latest ones (None: all of them); the voices a pyo
+    or offline backend would use are allocated all the same.
+    """
+
+    def __init__(self, seconds=60.0, sr=44100, block=BLOCK, voices=VOICES, steal='age', keep=None):
+        super().__init__(sr, block)
+        self.seconds = seconds
+        self.events = collections.deque(maxlen=keep)
+        self.voices = VoiceAllocator(voices, steal, sr)
+
+    def _chord(self, freqs, amp):
+        self.events.append(Event(self.time, 'chord', (freqs, amp)))
+
+    def note_on(self, freq, amp, attack, decay, sustain, release, dur):
+        args = tuple(float(x) for x in (freq, amp, attack, decay, sustain, release, dur))
+        self.voices.allocate(self.now, *args[1:])
+        self.events.append(Event(self.time, 'note', args))
+
+    def _advance(self, n):
+        pass
+
+    def stop(self):
+        super().stop()
+        self.voices.reclaim(self.now)
+        self.events.append(Event(self.time, 'stop', ()))
+
+    def wait(self, namespace=None):
+        self.run(self.seconds)
+
+
+BACKENDS = {'pyo': PyoBackend, 'offline': OfflineBackend, 'null': NullBackend}
+
+
+def get_backend(name=None, **options):
+    """A new, not yet booted backend: name, else $SOUNDSCAPE_AUDIO, else 'pyo'.
+
+    options go to the backend's constructor; the offline backend's path and
+    seconds default to $SOUNDSCAPE_OUTPUT and $SOUNDSCAPE_SECONDS, the null
+    backend's seconds to $SOUNDSCAPE_SECONDS.
+    """
+    name = name or os.environ.get(ENV_BACKEND) or 'pyo'
+    if name not in BACKENDS:
+        raise ValueError(f"audio backend must be one of {sorted(BACKENDS)}, not {name!r}")
+    if name in ('offline', 'null') and os.environ.get(ENV_SECONDS):
+        options.setdefault('seconds', float(os.environ[ENV_SECONDS]))
+    if name == 'offline':
+        options.setdefault('path', os.environ.get(ENV_OUTPUT, 'soundscape.wav'))
+    return BACKENDS[name](**options)
+
+
+def render_soundscape(params, windows=None, duration=60.0, seed=None, sr=44100,
+                      block=BLOCK, voices=VOICES, quantum=1, **options):
+    """duration seconds of the Soundscape for params/windows, as a (frames, 2) float32 array.
+
+    Notes start at their exact samples; quantum=BLOCK rounds them to blocks as
+    pyo does, and then the result matches render.py's pyo output for the same seed.
+    options go to the Soundscape (jitter, interval_range).
+    """
+    backend = OfflineBackend(sr=sr, block=block, voices=voices)
+    backend.play(Schedule(Soundscape(params, windows, seed=seed, **options), sr, quantum=quantum))
+    backend.run(duration)
+    return backend.audio()
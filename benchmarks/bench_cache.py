@@ -0,0 +1,39 @@
+# benchmark: a corpus re-run with the SQLite feature cache, cold (analyse + store) vs warm (lookups)
+#   python benchmarks/bench_cache.py [--texts 500] [--words 2000]
+
+import argparse
+import os
+import tempfile
+import time
+
+from textgen import synthetic_text
+from corpus import analyze_corpus
+from feature_cache import FeatureCache
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--texts', type=int, default=500)
+    parser.add_argument('--words', type=int, default=2000)
+    args = parser.parse_args()
+    texts = [synthetic_text(args.words, seed=i) for i in range(args.texts)]
+    list(analyze_corpus(texts[:1], workers=1))         # load the lexicons
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FeatureCache(os.path.join(tmp, 'features.sqlite'))
+        print(f"{args.texts} texts of {args.words} words, one worker\n")
+        print(f"{'run':>5} {'seconds':>8} {'texts/s':>9} {'hit rate':>9} {'get ms':>7} {'put ms':>7}")
+        for run in ('cold', 'warm'):
+            start = time.perf_counter()
+            for _ in analyze_corpus(texts, workers=1, chunksize=50, cache=cache):
+                pass
+            elapsed = time.perf_counter() - start
+            s = cache.stats()
+            print(f"{run:>5} {elapsed:>8.2f} {args.texts / elapsed:>9.0f} {s['hit_rate']:>9.2f} "
+                  f"{s['get_ms']:>7.2f} {s['put_ms']:>7.2f}")
+        print(f"\n{s['entries']} entries, {os.path.getsize(cache.path) / 1024:.0f} KiB on disk "
+              f"(plus the WAL until the next checkpoint)")
+
+
+if __name__ == "__main__":
+    main()
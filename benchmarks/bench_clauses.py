@@ -0,0 +1,45 @@
+# benchmark: clause segmentation throughput, clauses.clause_spans against the CL_SPLIT regex
+#   python benchmarks/bench_clauses.py [--sizes 100 1000 10000 100000 1000000] [--repeat 5]
+# synthetic narrative text at each size, then the adversarial inputs from suite.py (long runs
+# of separators, conjunction chains, one huge token). both find the same matches.
+
+import argparse
+import time
+
+from textgen import synthetic_text
+from clauses import clause_spans
+from six_dimensions import CL_SPLIT
+from suite import ADVERSARIAL
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def row(name, text, repeat):
+    regex = best_of(lambda: [m.span() for m in CL_SPLIT.finditer(text)], repeat)
+    spans = best_of(lambda: clause_spans(text), repeat)
+    mb = len(text) / 1e6
+    print(f"{name:<22} {len(text):>10} {mb / regex:>10.1f} {mb / spans:>10.1f} {regex / spans:>8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'text':<22} {'chars':>10} {'regex MB/s':>10} {'spans MB/s':>10} {'speedup':>9}")
+    for n in args.sizes:
+        row(f"synthetic {n} words", synthetic_text(n), args.repeat)
+    for name, make in ADVERSARIAL.items():
+        row(name, make(), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# benchmark: analyze_corpus scaling, documents per second for 1..N worker processes
+#   python benchmarks/bench_corpus.py [--docs 400] [--words 2000] [--max-workers 8]
+
+import argparse
+import os
+import time
+
+from textgen import synthetic_text
+from corpus import analyze_corpus
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--docs', type=int, default=400)
+    parser.add_argument('--words', type=int, default=2000)
+    parser.add_argument('--chunksize', type=int, default=8)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    texts = [synthetic_text(args.words, seed=i) for i in range(args.docs)]
+    print(f"{args.docs} docs x {args.words} words\n")
+    print(f"{'workers':>7} {'docs/s':>9} {'speedup':>8}")
+    base = None
+    workers = 1
+    while workers <= args.max_workers:
+        start = time.perf_counter()
+        n = sum(1 for _ in analyze_corpus(texts, workers=workers, chunksize=args.chunksize))
+        rate = n / (time.perf_counter() - start)
+        base = base or rate
+        print(f"{workers:>7} {rate:>9.1f} {rate / base:>7.2f}x")
+        workers *= 2
+    if workers // 2 != args.max_workers:
+        start = time.perf_counter()
+        n = sum(1 for _ in analyze_corpus(texts, workers=args.max_workers, chunksize=args.chunksize))
+        rate = n / (time.perf_counter() - start)
+        print(f"{args.max_workers:>7} {rate:>9.1f} {rate / base:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
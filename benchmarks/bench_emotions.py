@@ -0,0 +1,69 @@
+# benchmark: emotion-word counting, NRCLex(text) vs the emotion index over the VAD term ids
+#   python benchmarks/bench_emotions.py [--sizes 1000 100000 1000000]
+# without the NLTK punkt data NRCLex(text) cannot run; its path is then timed as
+# TextBlob's word tokenizer over the whole text (no sentence split) plus NRCLex's counting.
+
+import argparse
+import time
+
+import nltk
+from nrclex import NRCLex, build_word_affect
+from textblob.utils import strip_punc
+
+from textgen import synthetic_text
+from six_dimensions import count_emotion_words, load_vad_lexicon
+
+
+def has_punkt():
+    try:
+        nltk.data.find('tokenizers/punkt_tab')
+        return True
+    except LookupError:
+        return False
+
+
+def nrclex_count(text, punkt):
+    if punkt:
+        nrc = NRCLex(text)
+    else:
+        nrc = NRCLex.__new__(NRCLex)
+        tokens = nltk.word_tokenize(text, preserve_line=True)
+        nrc.words = [w if w.startswith("'") else strip_punc(w) for w in tokens if strip_punc(w)]
+        build_word_affect(nrc)
+    return sum(nrc.raw_emotion_scores.values())
+
+
+def best_of(fn, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    args = parser.parse_args()
+    punkt = has_punkt()
+    if not punkt:
+        print("punkt data missing: NRCLex timed without its sentence split\n")
+
+    vad_lex = load_vad_lexicon()
+    start = time.perf_counter()
+    emotions = vad_lex.emotions
+    print(f"index: {len(emotions)} emotion words, {len(emotions.extra)} outside the VAD lexicon, "
+          f"built in {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    print(f"{'words':>9} {'NRCLex s':>9} {'index s':>9} {'speedup':>8}  same count")
+    for n in args.sizes:
+        text = synthetic_text(n)
+        repeat = 3 if n <= 100000 else 1
+        t_old, old = best_of(lambda: nrclex_count(text, punkt), repeat)
+        t_new, new = best_of(lambda: count_emotion_words(text, vad_lex), repeat)
+        print(f"{n:>9} {t_old:>9.3f} {t_new:>9.3f} {t_old / t_new:>7.1f}x  {old == new}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# benchmark: single-pass VAD + variation vs the original per-feature re-tokenization
+#   python benchmarks/bench_features.py [--sizes 100 1000 10000 100000 1000000]
+
+import argparse
+import time
+
+from textgen import (legacy_compute_sentiment_variation, legacy_compute_vad,
+                     legacy_load_vad_lexicon, synthetic_text)
+from six_dimensions import load_vad_lexicon, scan_text
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    legacy_lex = legacy_load_vad_lexicon()
+    vad_lex = load_vad_lexicon()
+
+    def legacy(text):
+        return legacy_compute_vad(text, legacy_lex), legacy_compute_sentiment_variation(text, legacy_lex)
+
+    def single_pass(text):
+        scan = scan_text(text, vad_lex)
+        return scan.vad(), scan.variation()
+
+    print(f"{'words':>9} {'legacy ms':>11} {'single-pass ms':>15} {'speedup':>8} {'max |diff|':>11}")
+    for n in args.sizes:
+        text = synthetic_text(n)
+        repeat = max(1, min(20, 200000 // n))
+        old = legacy(text)
+        new = single_pass(text)
+        diff = max(max(abs(old[0][k] - new[0][k]) for k in old[0]), abs(old[1] - new[1]))
+        t_old = best_of(lambda: legacy(text), repeat)
+        t_new = best_of(lambda: single_pass(text), repeat)
+        print(f"{n:>9} {t_old * 1000:>11.2f} {t_new * 1000:>15.2f} {t_old / t_new:>7.1f}x {diff:>11.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmark: lexicon ingestion and artifact loading
+#   python benchmarks/bench_ingest.py [--repeat 5]
+# ingests the NRC-VAD lexicon's valid rows as a .csv and as NRC's tab-separated .txt,
+# then loads the artifact in a fresh interpreter each time (the page cache stays warm) and
+# runs the first lookups, against parsing the CSV without an artifact.
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from textgen import ROOT, synthetic_text
+import ingest
+from vad_lexicon import DEFAULT_LEXICON
+
+LOAD = ("import time, json\n"
+        "start = time.perf_counter()\n"
+        "from vad_lexicon import build_vad_lexicon\n"
+        "imported = time.perf_counter()\n"
+        "lex = build_vad_lexicon({path!r}, use_cache={cache})\n"
+        "loaded = time.perf_counter()\n"
+        "lex.lookup_words({words!r}, lex.phrases.extra)\n"
+        "print(json.dumps([loaded - imported, time.perf_counter() - loaded]))\n")
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def fresh(path, cache, words, repeat):
+    code = LOAD.format(path=path, cache=cache, words=words)
+    runs = [json.loads(subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                                      capture_output=True, text=True).stdout) for _ in range(repeat)]
+    return min(r[0] for r in runs), min(r[1] for r in runs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        csv = os.path.join(tmp, 'nrc.csv')
+        txt = os.path.join(tmp, 'nrc.txt')
+        artifact = os.path.join(tmp, 'nrc.vadlex')
+        terms, scores = ingest.read_lexicon(DEFAULT_LEXICON, strict=False)
+        ingest.write_csv(csv, terms, scores)
+        with open(txt, 'w', encoding='utf-8') as f:
+            f.write('term\tvalence\tarousal\tdominance\n')
+            f.writelines(f"{t}\t{v:g}\t{a:g}\t{d:g}\n" for t, (v, a, d) in zip(terms, scores.tolist()))
+
+        print(f"{len(terms)} terms")
+        for name, source in (('ingest .csv', csv), ('ingest .txt', txt)):
+            print(f"{name:<28} {best_of(lambda: ingest.ingest(source, artifact), args.repeat) * 1000:>9.1f} ms")
+        words = synthetic_text(1000).split()
+        for name, path, cache in (('load artifact', artifact, True), ('parse .csv (no artifact)', csv, False)):
+            load, lookup = fresh(path, cache, words, args.repeat)
+            print(f"{name:<28} {load * 1000:>9.1f} ms  (then 1000 words with phrases: {lookup * 1000:.1f} ms)")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
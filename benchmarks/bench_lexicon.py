@@ -0,0 +1,97 @@
+# benchmark: lexicon load time and resident memory
+# compares the original csv.DictReader dict-of-dicts loader against the cached VADLexicon store.
+# each variant runs in a fresh interpreter so load times and memory are not shared.
+#   python benchmarks/bench_lexicon.py [--repeat 5]
+
+import argparse
+import csv
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def legacy_load_vad_lexicon(filepath):
+    # the loader six_dimensions used before the cached store
+    vad = {}
+    with open(filepath, encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            term = row['term'].lower()
+            vad[term] = {
+                'valence': float(row['valence']),
+                'arousal': float(row['arousal']),
+                'dominance': float(row['dominance'])
+            }
+    return vad
+
+
+def max_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 if sys.platform == 'darwin' else rss
+
+
+def run_variant(variant, path):
+    import numpy  # noqa: F401  (keep numpy's own import cost out of the measurement)
+    import vad_lexicon
+
+    before = max_rss_kb()
+    start = time.perf_counter()
+    if variant == 'legacy':
+        lex = legacy_load_vad_lexicon(path)
+    else:
+        lex = vad_lexicon.build_vad_lexicon(path)
+        # touch every score so the memory-mapped pages are counted too
+        float(lex.vad.sum())
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'seconds': elapsed, 'rss_kb': max_rss_kb() - before, 'terms': len(lex)}))
+
+
+def measure(variant, path):
+    out = subprocess.run([sys.executable, __file__, '--variant', variant, '--path', path],
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--variant')
+    parser.add_argument('--path')
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args.variant, args.path)
+        return
+
+    import vad_lexicon
+    # work on a copy so the benchmark never clobbers the real cache
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, os.path.basename(vad_lexicon.DEFAULT_LEXICON))
+        shutil.copy(vad_lexicon.DEFAULT_LEXICON, path)
+        results = {'legacy': [], 'cold': [], 'warm': []}
+        for _ in range(args.repeat):
+            results['legacy'].append(measure('legacy', path))
+            shutil.rmtree(vad_lexicon.cache_dir(path), ignore_errors=True)
+            results['cold'].append(measure('cold', path))
+            results['warm'].append(measure('warm', path))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"{'variant':<8} {'best ms':>9} {'median ms':>10} {'rss MiB':>8}")
+    for name, runs in results.items():
+        times = sorted(r['seconds'] * 1000 for r in runs)
+        rss = sorted(r['rss_kb'] / 1024 for r in runs)[len(runs) // 2]
+        print(f"{name:<8} {times[0]:>9.1f} {times[len(times) // 2]:>10.1f} {rss:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
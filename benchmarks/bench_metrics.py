@@ -0,0 +1,54 @@
+# benchmark: what the instrumentation (metrics.py) costs, off and on, and what it reports
+#   python benchmarks/bench_metrics.py [--texts 200] [--words 300] [--seconds 20] [--repeat 3]
+# analyses the same texts and renders the same soundscape with metrics off, then on, best of
+# --repeat runs each; off should be within noise of the uninstrumented code.
+
+import argparse
+import time
+
+from textgen import synthetic_text
+import metrics
+from audio_backend import render_soundscape
+from six_dimensions import analyze_text, load_vad_lexicon
+
+PARAMS = {'chord': [261.63, 329.63, 392.0], 'chord_vol': 0.1, 'note_vol': 2.0, 'tempo': 0.3,
+          'dominance': 0.5, 'attack': 0.01, 'decay': 0.1, 'sustain': 0.5, 'release': 0.2, 'duration': 0.4}
+
+
+def best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--texts', type=int, default=200)
+    parser.add_argument('--words', type=int, default=300)
+    parser.add_argument('--seconds', type=float, default=20.0, help="seconds of audio rendered")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    texts = [synthetic_text(args.words, seed=i) for i in range(args.texts)]
+    load_vad_lexicon()
+    analyze_text(texts[0])                              # warm up TextBlob
+    workloads = {'analyze_text': lambda: [analyze_text(t) for t in texts],
+                 'render': lambda: render_soundscape(PARAMS, duration=args.seconds, seed=1)}
+
+    print(f"{args.texts} texts of {args.words} words; {args.seconds:g} s of audio; best of {args.repeat}\n")
+    print(f"{'workload':<14} {'off s':>8} {'on s':>8} {'on/off':>7}")
+    for name, fn in workloads.items():
+        metrics.disable()
+        off = best(fn, args.repeat)
+        metrics.enable()
+        on = best(fn, args.repeat)
+        print(f"{name:<14} {off:>8.3f} {on:>8.3f} {on / off:>7.3f}")
+    print()
+    print(metrics.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmark: multi-word phrase matching vs the single-word path on long documents
+#   python benchmarks/bench_phrases.py [--sizes 10000 100000 1000000]
+
+import argparse
+import time
+
+from textgen import synthetic_text
+from phrases import PhraseTrie
+from six_dimensions import load_vad_lexicon, scan_text
+
+
+def best_of(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    vad_lex = load_vad_lexicon()
+    start = time.perf_counter()
+    trie = vad_lex.phrases
+    print(f"trie: {len(trie)} phrases, built in {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    print(f"{'words':>9} {'single Mw/s':>12} {'phrases Mw/s':>13} {'ratio':>6}")
+    for n in args.sizes:
+        text = synthetic_text(n, phrase_rate=0.05)
+        t_single = best_of(lambda: scan_text(text, vad_lex).variation())
+        t_phrase = best_of(lambda: scan_text(text, vad_lex, phrases=True).variation())
+        print(f"{n:>9} {n / t_single / 1e6:>12.2f} {n / t_phrase / 1e6:>13.2f} {t_single / t_phrase:>6.2f}")
+
+    # the matcher alone, against tries built from growing slices of the phrase list
+    n = args.sizes[-1]
+    words = synthetic_text(n, phrase_rate=0.05).split()
+    multi = [t for t in vad_lex.terms if ' ' in t]
+    print(f"\nmatcher only, {n} words")
+    print(f"{'phrases':>9} {'ms':>8}")
+    for share in (0.01, 0.1, 1.0):
+        kept = set(multi[:int(len(multi) * share)])
+        terms = [t if ' ' not in t or t in kept else '' for t in vad_lex.terms]
+        sub = PhraseTrie(terms, vad_lex.index)
+        ids = vad_lex.lookup_words(words, sub.extra)
+        print(f"{len(sub):>9} {best_of(lambda: sub.match(ids)) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# load test for server.py over localhost: latency percentiles and throughput under concurrency
+#   python benchmarks/bench_server.py                       # starts its own server (--workers)
+#   python benchmarks/bench_server.py --port 8765 --concurrency 32 --requests 2000
+#   python benchmarks/bench_server.py --endpoint render --duration 5 --requests 50
+# every client keeps one HTTP/1.1 connection open and sends its next request as soon as the
+# last one is answered; 503s (the server's in-flight bound) are counted, not retried.
+
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from textgen import ROOT, synthetic_text
+
+
+async def request(reader, writer, method, path, body=b''):
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n'.encode()
+                 + body)
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split()[1])
+    length = next(int(line.split(b':')[1]) for line in head.split(b'\r\n') if line.lower().startswith(b'content-length'))
+    return status, await reader.readexactly(length)
+
+
+async def client(port, path, bodies, latencies, statuses):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for body in bodies:
+        start = time.perf_counter()
+        status, _ = await request(reader, writer, 'POST', path, body)
+        statuses.append(status)
+        if status == 200:
+            latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def load(port, path, texts, concurrency, n):
+    latencies, statuses = [], []
+    bodies = [texts[i % len(texts)].encode() for i in range(n)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, path, bodies[c::concurrency], latencies, statuses)
+                           for c in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    _, health = await request(reader, writer, 'GET', '/health')
+    writer.close()
+    return np.array(latencies), statuses, elapsed, json.loads(health)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("the server exited")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("the server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, help="a running server's port (default: start one)")
+    parser.add_argument('--workers', type=int, default=None, help="workers of the server started here")
+    parser.add_argument('--endpoint', choices=['analyze', 'render'], default='analyze')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--words', type=int, default=300, help="words per text")
+    parser.add_argument('--texts', type=int, default=100, help="distinct texts (the cache, if any, sees repeats)")
+    parser.add_argument('--duration', type=float, default=2.0, help="seconds per render")
+    args = parser.parse_args()
+
+    proc, port = None, args.port
+    if port is None:
+        port = free_port()
+        cmd = [sys.executable, 'server.py', '--port', str(port)]
+        if args.workers:
+            cmd += ['--workers', str(args.workers)]
+        proc = subprocess.Popen(cmd, cwd=ROOT)
+        wait_for(port, proc)
+    try:
+        texts = [synthetic_text(args.words, seed=i) for i in range(args.texts)]
+        path = '/analyze' if args.endpoint == 'analyze' else f'/render?duration={args.duration}&seed=1'
+        asyncio.run(load(port, path, texts[:2], 2, 4))          # warm up the workers
+        latencies, statuses, elapsed, health = asyncio.run(
+            load(port, path, texts, args.concurrency, args.requests))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    ok, rejected = statuses.count(200), statuses.count(503)
+    print(f"{args.requests} x POST {path}, {args.words}-word texts, {args.concurrency} connections, "
+          f"{health['workers']} workers\n")
+    print(f"{'ok':>6} {'503':>6} {'other':>6} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'batch':>6}")
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000 if ok else (float('nan'),) * 3
+    print(f"{ok:>6} {rejected:>6} {len(statuses) - ok - rejected:>6} {ok / elapsed:>8.1f} "
+          f"{p50:>8.1f} {p90:>8.1f} {p99:>8.1f} {health['batch_mean']:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# benchmark: startup to the first analysis, with and without booting the audio backend
+#   python benchmarks/bench_startup.py [--repeat 5]
+# each case is a fresh interpreter: imports, a windowed analysis of a short text, the
+# backend created (lazy) and, in the "boot" cases, booted.
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from textgen import ROOT
+
+SETUP = ("from trajectory import analyze_windows\n"
+         "from audio_backend import get_backend\n"
+         "analyze_windows('I love sunny days, but sometimes I feel anxious when it is too bright.', 5, 5)\n"
+         "backend = get_backend({args})\n")
+
+CASES = [
+    ("analysis only, pyo backend not booted", "'pyo'", False),
+    ("null backend, booted", "'null'", True),
+    ("offline backend (NumPy), booted", "'offline'", True),
+    ("pyo offline driver, booted", "'pyo', audio='offline', verbosity=1", True),
+    ("pyo portaudio, booted", "'pyo'", True),
+]
+
+
+def run_case(args, boot, repeat):
+    code = SETUP.format(args=args) + ("backend.boot()\nbackend.shutdown()\n" if boot else "")
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True)
+        if proc.returncode != 0:
+            lines = proc.stderr.decode(errors='replace').strip().splitlines()
+            return lines[-1] if lines else f"exit status {proc.returncode}"
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(f"median of {args.repeat} fresh interpreters\n")
+    baseline = None
+    for name, backend_args, boot in CASES:
+        t = run_case(backend_args, boot, args.repeat)
+        if isinstance(t, str):
+            print(f"{name:<40} failed: {t}")
+            continue
+        baseline = baseline or t
+        print(f"{name:<40} {t * 1000:>7.0f} ms  (+{(t - baseline) * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
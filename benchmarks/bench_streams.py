@@ -0,0 +1,71 @@
+# benchmark: how many soundscape streams one session mixes in real time before buffers run late
+#   python benchmarks/bench_streams.py [--streams 1 2 4 8 16 32 64 96 128] [--buffer 512] [--seconds 10]
+# each stream is a random text's soundscape (chord changes every window), all on one MixEngine;
+# a buffer underruns when mixing it takes longer than it lasts. stops after the first count
+# with underruns.
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from textgen import ROOT  # noqa: F401  (puts the repo on sys.path)
+from mapping import soundscape_params
+from session import Session
+
+SR = 44100
+DIMENSIONS = ('valence', 'arousal', 'dominance', 'subjectivity', 'variation', 'density')
+
+
+def random_score(rng, windows=20):
+    features = {k: rng.uniform(-1 if k == 'valence' else 0, 1) for k in DIMENSIONS}
+    trajectory = {k: np.clip(features[k] + np.array([rng.gauss(0, 0.2) for _ in range(windows)]), -1, 1)
+                  for k in DIMENSIONS}
+    return soundscape_params(features), soundscape_params(trajectory)
+
+
+def mix(n_streams, buffer, seconds, seed=0):
+    rng = random.Random(seed)
+    session = Session()
+    for i in range(n_streams):
+        params, windows = random_score(rng)
+        session.add(params=params, windows=windows, seed=i, gain=1 / n_streams, pan=rng.uniform(-1, 1))
+    session.render(SR)                                  # warm up, voices filling
+    for s in session.streams:
+        s.cpu = 0.0
+    budget = buffer / SR
+    times = []
+    for _ in range(int(seconds * SR / buffer)):
+        start = time.perf_counter()
+        session.render(buffer)
+        times.append(time.perf_counter() - start)
+    times = np.array(times)
+    loads = [s.cpu / seconds for s in session.streams]
+    return times, budget, loads
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streams', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64, 96, 128])
+    parser.add_argument('--buffer', type=int, default=512, help="samples per buffer (default: 512)")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{args.buffer}-sample buffers at {SR} Hz: {args.buffer / SR * 1000:.1f} ms each\n")
+    print(f"{'streams':>7} {'mean ms':>8} {'p99 ms':>7} {'% budget':>9} {'underruns':>10} {'ms/stream':>10}")
+    best = 0
+    for n in args.streams:
+        times, budget, loads = mix(n, args.buffer, args.seconds)
+        underruns = int((times > budget).sum())
+        print(f"{n:>7} {times.mean() * 1000:>8.2f} {np.percentile(times, 99) * 1000:>7.2f} "
+              f"{times.mean() / budget * 100:>8.0f}% {underruns:>10} "
+              f"{np.mean(loads) * budget * 1000:>10.3f}")
+        if underruns:
+            break
+        best = n
+    print(f"\nmost streams without an underrun: {best}")
+
+
+if __name__ == "__main__":
+    main()
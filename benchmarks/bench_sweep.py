@@ -0,0 +1,61 @@
+# benchmark: auditioning a grid of mapping settings, sweep.py against re-running everything per setting
+#   python benchmarks/bench_sweep.py [--words 2000] [--grid 3 3] [--seconds 3] [--workers N]
+# the naive loop analyses the text and renders once per setting, one after the other, as tuning
+# the constants by hand did; sweep.py analyses once, maps the grid in one pass and renders in
+# parallel.
+
+import argparse
+import time
+
+from textgen import synthetic_text
+import sweep
+from audio_backend import render_soundscape
+from soundscape import text_score
+import mapping
+
+
+def naive(text, points, seconds):
+    for settings in points:
+        features = sweep.analyze_text(text)
+        params = mapping.soundscape_params(features, settings)
+        windows = mapping.soundscape_params(sweep.analyze_windows(text, window=sweep.WINDOW_WORDS,
+                                                                  hop=sweep.HOP_WORDS), settings)
+        render_soundscape(params, windows, seconds, 1,
+                          interval_range=(settings['interval_min'], settings['interval_max']))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--words', type=int, default=2000)
+    parser.add_argument('--grid', type=int, nargs=2, default=[3, 3], help="values of interval_max and chord_vol_max")
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    text = synthetic_text(args.words)
+    text_score(text)                                    # warm up TextBlob and the lexicon
+    axes = {'interval_max': [0.5 + i for i in range(args.grid[0])],
+            'chord_vol_max': [0.1 + 0.2 * i for i in range(args.grid[1])]}
+    points = [s for s, _, _ in sweep.sweep_params(*sweep.analyze_once(text), axes)]
+    sweep._ANALYSES = sweep.LRUCache()                  # the sweep pays for its one analysis
+
+    start = time.perf_counter()
+    naive(text, points, args.seconds)
+    slow = time.perf_counter() - start
+    start = time.perf_counter()
+    features, trajectory = sweep.analyze_once(text)
+    analysed = time.perf_counter()
+    sweep.sweep_params(features, trajectory, axes, mapping.DEFAULTS)
+    mapped = time.perf_counter()
+    sweep.render_previews(text, axes, args.seconds, workers=args.workers)
+    fast = time.perf_counter() - start
+
+    print(f"{len(points)} settings, {args.words}-word text, {args.seconds:g} s previews\n")
+    print(f"per setting, sequential:   {slow:8.2f} s")
+    print(f"sweep.py:                  {fast:8.2f} s  (analysis {analysed - start:.2f} s once, "
+          f"mapping {(mapped - analysed) * 1000:.1f} ms for the grid)")
+    print(f"speedup:                   {slow / fast:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
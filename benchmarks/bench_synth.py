@@ -0,0 +1,72 @@
+# benchmark: CPU per audio block against the number of sounding melody voices,
+# NumPy engine (synth.py) vs pyo's Adsr + two Sines per note, both offline
+#   python benchmarks/bench_synth.py [--voices 0 1 4 8 16 32 64] [--seconds 20]
+
+import argparse
+import os
+import tempfile
+import time
+
+from textgen import ROOT  # noqa: F401  (puts the repo on sys.path)
+from synth import BLOCK, SynthEngine
+
+SR = 44100
+CHORD = [261.63, 329.63, 392.0]
+
+
+def numpy_block_us(voices, blocks):
+    engine = SynthEngine(SR, voices=max(voices, 1))
+    engine.set_chord(CHORD, 0.1)
+    for k in range(voices):
+        engine.note_on(300.0 + 10 * k, 0.1, 0.01, 0.1, 0.5, 0.5, 1e6)   # held for the whole run
+    start = time.perf_counter()
+    for _ in range(blocks):
+        engine.render(BLOCK)
+    return (time.perf_counter() - start) / blocks * 1e6
+
+
+def pyo_block_us(voices, blocks, tmp):
+    from pyo import Server, Sine, Adsr
+    server = Server(audio='offline', nchnls=2, sr=SR, buffersize=BLOCK, duplex=0, verbosity=1).boot()
+    # a .wav name that matches fileformat=0, so pyo has nothing to warn about
+    server.recordOptions(dur=blocks * BLOCK / SR, filename=os.path.join(tmp, 'bench.wav'), fileformat=0)
+    objs = [Sine(freq=f, mul=0.1).out(chnl=c) for f in CHORD for c in (0, 1)]
+    for k in range(voices):
+        env = Adsr(attack=0.01, decay=0.1, sustain=0.5, release=0.5, dur=1e6, mul=0.1)
+        env.play()
+        objs += [env] + [Sine(freq=300.0 + 10 * k, mul=env).out(chnl=c) for c in (0, 1)]
+    start = time.perf_counter()
+    server.start()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    del objs
+    return elapsed / blocks * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--voices', type=int, nargs='+', default=[0, 1, 4, 8, 16, 32, 64])
+    parser.add_argument('--seconds', type=float, default=20.0)
+    args = parser.parse_args()
+    blocks = int(args.seconds * SR / BLOCK)
+    try:
+        import pyo  # noqa: F401
+        has_pyo = True
+    except ImportError:
+        has_pyo = False
+
+    budget = BLOCK / SR * 1e6
+    print(f"{BLOCK}-sample blocks at {SR} Hz: real-time budget {budget:.0f} us per block\n")
+    print(f"{'voices':>6} {'numpy us':>9} {'% budget':>9}" + (f" {'pyo us':>8} {'% budget':>9}" if has_pyo else ""))
+    with tempfile.TemporaryDirectory() as tmp:
+        for voices in args.voices:
+            t = numpy_block_us(voices, blocks)
+            line = f"{voices:>6} {t:>9.1f} {t / budget * 100:>8.1f}%"
+            if has_pyo:
+                p = pyo_block_us(voices, blocks, tmp)
+                line += f" {p:>8.1f} {p / budget * 100:>8.1f}%"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# benchmark: sliding-window trajectories on a novel-length text, prefix sums vs
+# re-analysing every window (the naive cost is timed on a sample of windows and scaled up)
+#   python benchmarks/bench_windows.py [--words 90000] [--window 500] [--hops 250 50 10]
+
+import argparse
+import time
+
+import numpy as np
+
+from textgen import synthetic_text
+from six_dimensions import (compute_lexical_density, compute_sentiment_variation, compute_subjectivity,
+                            compute_vad, load_vad_lexicon)
+from trajectory import analyze_windows
+
+
+def naive_window(words, start, end, vad_lex):
+    text = " ".join(words[start:end])
+    return (compute_vad(text, vad_lex), compute_subjectivity(text), compute_sentiment_variation(text, vad_lex),
+            compute_lexical_density(text, vad_lex))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--words', type=int, default=90000)
+    parser.add_argument('--window', type=int, default=500)
+    parser.add_argument('--hops', type=int, nargs='+', default=[250, 50, 10])
+    parser.add_argument('--sample', type=int, default=40, help="windows timed for the naive estimate")
+    args = parser.parse_args()
+
+    text = synthetic_text(args.words)
+    words = text.split()
+    vad_lex = load_vad_lexicon()
+    analyze_windows(text[:1000])        # load lexicons once
+
+    print(f"{args.words} words, window {args.window} words\n")
+    print(f"{'hop':>5} {'windows':>8} {'prefix-sum s':>13} {'naive s (est.)':>15} {'speedup':>8} {'max |diff|':>11}")
+    for hop in args.hops:
+        start = time.perf_counter()
+        traj = analyze_windows(text, window=args.window, hop=hop)
+        t_new = time.perf_counter() - start
+
+        n = len(traj['start'])
+        sample = np.unique(np.linspace(0, n - 1, min(args.sample, n)).astype(int))
+        start = time.perf_counter()
+        diff = 0.0
+        for w in sample:
+            vad, subj, _, density = naive_window(words, traj['start'][w], traj['end'][w], vad_lex)
+            diff = max(diff, abs(vad['valence'] - traj['valence'][w]), abs(vad['arousal'] - traj['arousal'][w]),
+                       abs(vad['dominance'] - traj['dominance'][w]), abs(subj - traj['subjectivity'][w]),
+                       abs(density - traj['density'][w]))
+        t_old = (time.perf_counter() - start) / len(sample) * n
+        print(f"{hop:>5} {n:>8} {t_new:>13.2f} {t_old:>15.1f} {t_old / t_new:>7.0f}x {diff:>11.1e}")
+    # subjectivity can differ a little where a window cuts a modifier from its word ("really | good")
+
+
+if __name__ == "__main__":
+    main()
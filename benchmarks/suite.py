@@ -0,0 +1,286 @@
+# benchmark suite and regression check for the analysis-to-audio pipeline; runs offline, no sound device
+#   python benchmarks/suite.py run [--save baseline.json] [-k analyze] [--min-time 0.2] [--rounds 5]
+#   python benchmarks/suite.py compare baseline.json current.json [--threshold 0.25]
+#   python benchmarks/suite.py run --save current.json --compare baseline.json     # exit 1 on a regression
+#   python benchmarks/suite.py list
+# every benchmark sets up outside the clock and returns the call to time; each round repeats the
+# call until min-time has passed, and a result is the per-call time over rounds (median, min, ...).
+# compare flags a benchmark whose median grew by more than threshold (0.25 = 25 %) over its
+# baseline. baselines are only comparable on the same machine; the JSON records which one.
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from textgen import ROOT, synthetic_text
+from clauses import clause_spans
+from scheduler import Schedule
+from session import Session
+from six_dimensions import analyze_text, load_vad_lexicon, split_clauses
+from soundscape import Soundscape, text_score
+from audio_backend import NullBackend, render_soundscape
+from vad_lexicon import DEFAULT_LEXICON, build_vad_lexicon
+
+SIZES = (100, 1_000, 10_000, 100_000)       # words, for analyze_text
+TEXTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'texts')
+THRESHOLD = 0.25
+SR = 44100
+
+BENCHMARKS = {}
+
+
+def benchmark(name, group):
+    def register(setup):
+        BENCHMARKS[name] = (group, setup)
+        return setup
+    return register
+
+
+def real_text(n_words):
+    """The public-domain excerpts in benchmarks/texts, repeated to n_words."""
+    words = []
+    for name in sorted(os.listdir(TEXTS)):
+        with open(os.path.join(TEXTS, name), encoding='utf-8') as f:
+            words += f.read().split(' ')
+    return ' '.join(words[i % len(words)] for i in range(n_words))
+
+
+#1. analysis ─────────────────────────────────────────────────────────────────────────────────────────
+@benchmark('lexicon_load/csv', 'analysis')
+def _():
+    return lambda: build_vad_lexicon(DEFAULT_LEXICON, use_cache=False)
+
+
+@benchmark('lexicon_load/cache', 'analysis')
+def _():
+    build_vad_lexicon(DEFAULT_LEXICON)              # make sure the binary cache exists
+    return lambda: build_vad_lexicon(DEFAULT_LEXICON)
+
+
+def _analyze(make_text, n):
+    def setup():
+        text = make_text(n)
+        load_vad_lexicon()
+        analyze_text("warm up")
+        return lambda: analyze_text(text)
+    return setup
+
+
+for _n in SIZES:
+    benchmark(f'analyze_text/synthetic/{_n}', 'analysis')(_analyze(synthetic_text, _n))
+    benchmark(f'analyze_text/real/{_n}', 'analysis')(_analyze(real_text, _n))
+
+# inputs that have made regex clause splitters slow: long runs of separators, separators
+# without whitespace, conjunction chains, one huge token, and almost no separators at all
+ADVERSARIAL = {
+    'punctuation_runs': lambda: ('word' + '!?.,;:' * 50 + ' ') * 500,
+    'dash_runs': lambda: ('a ' + '- — -- ' * 20) * 1000,
+    'glued_separators': lambda: ',a;b.c!d?e:f' * 10_000,
+    'conjunction_chain': lambda: ' and but or so yet' * 20_000,
+    'one_token': lambda: 'x' * 100_000 + '.',
+    'no_separators': lambda: 'lorem ipsum dolor sit amet ' * 20_000,
+    'newlines': lambda: 'line\n\n\n' * 20_000,
+}
+
+
+def _split(make_text):
+    def setup():
+        text = make_text()
+        return lambda: split_clauses(text)
+    return setup
+
+
+for _name, _make in ADVERSARIAL.items():
+    benchmark(f'split_clauses/{_name}', 'analysis')(_split(_make))
+
+# the segmenter alone on runs that would make a backtracking splitter quadratic, at two sizes:
+# linear time keeps the 160k run within about 8x the 20k one
+PATHOLOGICAL = {'commas': ', ', 'dashes': '- ', 'wide_commas': ',' + ' ' * 50, 'conjunctions': 'and '}
+
+
+def _spans(unit, n):
+    def setup():
+        text = unit * n
+        return lambda: clause_spans(text)
+    return setup
+
+
+for _name, _unit in PATHOLOGICAL.items():
+    for _n in (20_000, 160_000):
+        benchmark(f'clause_spans/{_name}/{_n // 1000}k', 'analysis')(_spans(_unit, _n))
+
+
+#2. audio (virtual clock, no device) ─────────────────────────────────────────────────────────────────
+def _score():
+    return text_score(real_text(1_000))
+
+
+@benchmark('schedule/60s', 'audio')
+def _():
+    params, windows = _score()
+
+    def run():
+        Schedule(Soundscape(params, windows, seed=1), SR).until(60 * SR)
+    return run
+
+
+@benchmark('null_backend/60s', 'audio')
+def _():
+    params, windows = _score()
+
+    def run():
+        backend = NullBackend(seconds=60.0)
+        Soundscape(params, windows, seed=1).start(backend)
+        backend.wait()
+    return run
+
+
+@benchmark('render_offline/10s', 'audio')
+def _():
+    params, windows = _score()
+    return lambda: render_soundscape(params, windows, duration=10.0, seed=1)
+
+
+@benchmark('session_mix/8x5s', 'audio')
+def _():
+    params, windows = _score()
+
+    def run():
+        session = Session()
+        for i in range(8):
+            session.add(params=params, windows=windows, seed=i, gain=1 / 8, pan=i / 4 - 1)
+        session.run(5.0)
+    return run
+
+
+#3. running and comparing ───────────────────────────────────────────────────────────────────────────
+def measure(fn, min_time, rounds):
+    fn()                                            # warm up, and a first estimate
+    start = time.perf_counter()
+    fn()
+    once = max(time.perf_counter() - start, 1e-9)
+    iterations = max(1, int(min_time / once))
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        times.append((time.perf_counter() - start) / iterations)
+    return {'median': statistics.median(times), 'min': min(times), 'mean': statistics.fmean(times),
+            'stddev': statistics.stdev(times) if len(times) > 1 else 0.0,
+            'rounds': rounds, 'iterations': iterations}
+
+
+def machine():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+            'machine': platform.machine(), 'cpus': os.cpu_count(), 'commit': commit}
+
+
+def run(names, min_time, rounds, out=sys.stdout):
+    results = {}
+    for name in names:
+        group, setup = BENCHMARKS[name]
+        r = measure(setup(), min_time, rounds)
+        results[name] = dict(group=group, **r)
+        print(f"{name:<40} {r['median'] * 1000:>11.3f} ms  (min {r['min'] * 1000:.3f}, "
+              f"{r['rounds']} x {r['iterations']})", file=out, flush=True)
+    return {'datetime': datetime.datetime.now().isoformat(timespec='seconds'), 'machine': machine(),
+            'min_time': min_time, 'benchmarks': results}
+
+
+def compare(baseline, current, threshold=THRESHOLD, out=sys.stdout):
+    """Print the change of every benchmark; the names that got slower by more than threshold."""
+    old, new = baseline['benchmarks'], current['benchmarks']
+    if baseline['machine'] != current['machine']:
+        print(f"note: different machines or versions\n  baseline {baseline['machine']}\n"
+              f"  current  {current['machine']}", file=out)
+    print(f"{'benchmark':<40} {'baseline ms':>12} {'current ms':>12} {'change':>8}", file=out)
+    regressions = []
+    for name in sorted(set(old) | set(new)):
+        if name not in new:
+            print(f"{name:<40} {old[name]['median'] * 1000:>12.3f} {'':>12} {'':>8}  missing", file=out)
+            continue
+        if name not in old:
+            print(f"{name:<40} {'':>12} {new[name]['median'] * 1000:>12.3f} {'':>8}  new", file=out)
+            continue
+        change = new[name]['median'] / old[name]['median'] - 1
+        status = ''
+        if change > threshold:
+            status = 'REGRESSION'
+            regressions.append(name)
+        elif change < -threshold:
+            status = 'faster'
+        print(f"{name:<40} {old[name]['median'] * 1000:>12.3f} {new[name]['median'] * 1000:>12.3f} "
+              f"{change:>+8.1%}  {status}", file=out)
+    print(f"\n{len(regressions)} regression(s) over {threshold:.0%}", file=out)
+    return regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save(path, results):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
+
+
+def select(patterns):
+    names = list(BENCHMARKS)
+    if patterns:
+        names = [n for n in names if any(p in n for p in patterns)]
+    if not names:
+        raise SystemExit(f"no benchmark matches {patterns}")
+    return names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis and audio pipeline; compare runs.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    p = commands.add_parser('run', help="run benchmarks")
+    p.add_argument('-k', dest='patterns', action='append', help="only names containing this (repeatable)")
+    p.add_argument('--min-time', type=float, default=0.2, help="seconds per round (default: 0.2)")
+    p.add_argument('--rounds', type=int, default=5)
+    p.add_argument('--save', help="write the results here (JSON)")
+    p.add_argument('--compare', help="a baseline to compare with; exit 1 on a regression")
+    p.add_argument('--threshold', type=float, default=THRESHOLD)
+    p = commands.add_parser('compare', help="compare two saved runs; exit 1 on a regression")
+    p.add_argument('baseline')
+    p.add_argument('current')
+    p.add_argument('--threshold', type=float, default=THRESHOLD,
+                   help=f"relative slowdown that fails (default: {THRESHOLD})")
+    commands.add_parser('list', help="list the benchmarks")
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for name, (group, _) in BENCHMARKS.items():
+            print(f"{group:<10} {name}")
+        return 0
+    if args.command == 'compare':
+        return 1 if compare(load(args.baseline), load(args.current), args.threshold) else 0
+    results = run(select(args.patterns), args.min_time, args.rounds)
+    if args.save:
+        save(args.save, results)
+    if args.compare:
+        print()
+        return 1 if compare(load(args.compare), results, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
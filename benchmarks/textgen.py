@@ -0,0 +1,102 @@
+# shared helpers for the benchmarks: synthetic texts and the original (pre-cache) analysis code
+
+import csv
+import os
+import random
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from six_dimensions import CL_SPLIT, lexicon  # noqa: E402
+
+FILLER = ['the', 'a', 'of', 'to', 'in', 'it', 'was', 'she', 'he', 'they', 'with', 'at', 'on', 'her', 'his']
+CONJUNCTIONS = ['and', 'but', 'or', 'so', 'for', 'nor', 'yet', 'if', 'when', 'while', 'because',
+                'although', 'though', 'unless', 'since']
+PUNCT = ['.', ',', '!', '?', ';', ':', ' -', ' —', '\n']
+
+_TERMS = None
+
+
+def _terms():
+    global _TERMS
+    if _TERMS is None:
+        with open(lexicon, encoding='utf-8') as f:
+            _TERMS = [row['term'] for row in csv.DictReader(f) if row['term'].strip()]
+    return _TERMS
+
+
+def synthetic_text(n_words, seed=0, phrase_rate=0.0):
+    """Narrative-ish text mixing lexicon words, filler, conjunctions and clause punctuation.
+
+    phrase_rate is the share of positions that get a whole multi-word term.
+    """
+    rng = random.Random(seed)
+    terms = _terms()
+    phrases = [t for t in terms if ' ' in t]
+    out = []
+    for i in range(n_words):
+        r = rng.random()
+        if rng.random() < phrase_rate:
+            w = rng.choice(phrases)
+        elif r < 0.45:
+            w = rng.choice(terms).split()[0]
+        elif r < 0.8:
+            w = rng.choice(FILLER)
+        elif r < 0.9:
+            w = rng.choice(CONJUNCTIONS)
+        elif r < 0.95:
+            w = f"{rng.choice(terms).split()[0]}-{rng.choice(CONJUNCTIONS)}-{rng.choice(FILLER)}"
+        else:
+            w = rng.choice(terms).split()[0].capitalize()
+        if rng.random() < 0.12:
+            w += rng.choice(PUNCT)
+        out.append(w)
+    return ' '.join(out)
+
+
+# the original implementations, kept as the reference the benchmarks compare against
+def legacy_load_vad_lexicon(filepath=lexicon):
+    vad = {}
+    with open(filepath, encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            term = row['term'].lower()
+            vad[term] = {
+                'valence': float(row['valence']),
+                'arousal': float(row['arousal']),
+                'dominance': float(row['dominance'])
+            }
+    return vad
+
+
+def legacy_compute_vad(text, vad_lex):
+    tokens = [w.strip('.,!?;:').lower() for w in text.split()]
+    vs, ars, doms = [], [], []
+    for t in tokens:
+        if t in vad_lex:
+            vs.append(vad_lex[t]['valence'])
+            ars.append(vad_lex[t]['arousal'])
+            doms.append(vad_lex[t]['dominance'])
+    return {
+        'valence': np.mean(vs) if vs else 0.0,
+        'arousal': np.mean(ars) if ars else 0.0,
+        'dominance': np.mean(doms) if doms else 0.0
+    }
+
+
+def legacy_split_clauses(text):
+    return [part.strip() for part in CL_SPLIT.split(text) if part.strip()]
+
+
+def legacy_compute_sentiment_variation(text, vad_lex):
+    clauses = legacy_split_clauses(text)
+    clause_vals = []
+    for clause in clauses:
+        tokens = [w.strip('.,!?;:').lower() for w in clause.split()]
+        vals = [vad_lex[t]['valence'] for t in tokens if t in vad_lex]
+        clause_vals.append(np.mean(vals) if vals else 0.0)
+    return float(np.std(clause_vals)) if len(clause_vals) > 1 else 0.0
@@ -0,0 +1,161 @@
+# clause segmentation in linear time: the separator spans CL_SPLIT (six_dimensions.py) finds,
+# computed with array operations over the text's code points instead of the regex
+#   ms, me = clause_spans(text)          # == [m.span() for m in CL_SPLIT.finditer(text)]
+#   starts, ends = clause_bounds(text)   # offsets of split_clauses(text), no substrings made
+# CL_SPLIT's matches never overlap and each one depends only on its neighbourhood, so all five
+# kinds are found independently: punctuation + whitespace run, comma + whitespace run before a
+# conjunction prefix, whole-word conjunctions and newline runs. words (\w runs) of 2-8 letters
+# get an id from their case-folded letters packed into 64 bits, and conjunctions are looked up
+# by that id. every step is a fixed number of passes over the text, whatever it contains.
+
+import numpy as np
+
+CONJUNCTIONS = ('and', 'but', 'or', 'so', 'for', 'nor', 'yet', 'if', 'when', 'while', 'because',
+                'although', 'though', 'unless', 'since')
+COMMA_CONJUNCTIONS = ('and', 'but', 'or', 'so', 'because')     # after a comma, as prefixes
+SENTENCE_END = '.?!;:—-'                # each starts a separator when whitespace follows
+MAX_WORD = 8                            # longest conjunction, letters per packed id
+
+# str.split()'s (and the regex's \s) whitespace
+_WHITESPACE = ('\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680'
+               '\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a'
+               '\u2028\u2029\u202f\u205f\u3000')
+TABLE_SIZE = 0x3002             # code point tables; the last slot stands in for everything above
+
+_WS_TABLE = np.zeros(TABLE_SIZE, dtype=bool)
+_WS_TABLE[[ord(c) for c in _WHITESPACE]] = True
+_SEP_TABLE = np.zeros(TABLE_SIZE, dtype=bool)
+_SEP_TABLE[[ord(c) for c in SENTENCE_END]] = True
+# the regex's \w (str.isalnum() or '_'); code points past the table are looked up as they come
+_WORD_TABLE = np.array([chr(i).isalnum() or i == 95 for i in range(TABLE_SIZE)], dtype=bool)
+_WORD_TABLE[-1] = False
+_word_bmp = None                # \w for the rest of the Basic Multilingual Plane, built on first use
+
+# case folding as re.IGNORECASE does it for the conjunctions' letters; 0 for anything else
+_FOLD = np.zeros(0x181, dtype=np.uint64)
+for _c in set(''.join(CONJUNCTIONS)):
+    _FOLD[[ord(_c), ord(_c.upper())]] = ord(_c)
+_FOLD[[0x130, 0x131]] = ord('i')        # İ and ı match i, ſ matches s
+_FOLD[0x17f] = ord('s')
+
+
+def _pack(word):
+    return sum(ord(c) << (8 * k) for k, c in enumerate(word))
+
+
+_MASKS = np.array([(1 << (8 * k)) - 1 for k in range(MAX_WORD + 1)], dtype=np.uint64)
+_CONJ_IDS = np.sort(np.array([_pack(w) for w in CONJUNCTIONS], dtype=np.uint64))
+_PREFIX_IDS = {n: np.sort(np.array([_pack(w) for w in COMMA_CONJUNCTIONS if len(w) == n], dtype=np.uint64))
+               for n in sorted({len(w) for w in COMMA_CONJUNCTIONS})}
+
+
+def code_points(text):
+    return np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+
+
+def _is_word(codes, capped):
+    global _word_bmp
+    word = _WORD_TABLE[capped]
+    rest = np.flatnonzero(capped == TABLE_SIZE - 1)
+    if len(rest):
+        if _word_bmp is None:
+            _word_bmp = np.array([chr(i).isalnum() for i in range(0x10000)], dtype=bool)
+        c = codes[rest]
+        bmp = c < 0x10000
+        word[rest[bmp]] = _word_bmp[c[bmp]]
+        astral = rest[~bmp]
+        if len(astral):         # rare: looked up one distinct code point at a time
+            values, inverse = np.unique(codes[astral], return_inverse=True)
+            word[astral] = np.array([chr(v).isalnum() for v in values.tolist()], dtype=bool)[inverse]
+    return word
+
+
+def _ids(letters, starts, size):
+    """Packed ids of letters[start:start + size] (letters is padded past the text's end)."""
+    ids = np.zeros(len(starts), dtype=np.uint64)
+    for k in range(size):
+        ids |= letters[starts + k] << np.uint64(8 * k)
+    return ids
+
+
+def _isin(ids, table):
+    at = np.minimum(np.searchsorted(table, ids), len(table) - 1)
+    return table[at] == ids
+
+
+def clause_spans(text):
+    """Start and end offsets of CL_SPLIT's matches in text (a str or its code points)."""
+    codes = code_points(text) if isinstance(text, str) else text
+    n = len(codes)
+    if not n:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    capped = np.minimum(codes, TABLE_SIZE - 1)
+    ws = _WS_TABLE[capped]
+    # the first non-whitespace at or after every offset, n past the last (and at n)
+    ends = np.full(n + 1, n, dtype=np.int64)
+    ends[:n] = np.minimum.accumulate(np.where(ws, n, np.arange(n))[::-1])[::-1]
+    # case-folded conjunction letters (0 for anything else), padded for the ids
+    letters = np.zeros(n + MAX_WORD, dtype=np.uint64)
+    letters[:n] = _FOLD[np.minimum(codes, len(_FOLD) - 1)]
+
+    # punctuation (or a comma before a conjunction) and the whole whitespace run after it
+    followed = np.zeros(n, dtype=bool)
+    followed[:-1] = ws[1:]
+    punct = np.flatnonzero(followed & _SEP_TABLE[capped])
+    commas = np.flatnonzero(followed & (codes == 44))
+    if len(commas):
+        after = ends[commas + 1]
+        before_conj = np.zeros(len(commas), dtype=bool)
+        for size, table in _PREFIX_IDS.items():
+            before_conj |= _isin(_ids(letters, after, size), table)
+        punct = np.concatenate((punct, commas[before_conj]))
+    run_ends = ends[punct + 1]
+
+    # whole words that are conjunctions, by id
+    edges = np.diff(np.concatenate(([False], _is_word(codes, capped), [False])).view(np.int8))
+    w_start, w_end = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    length = w_end - w_start
+    short = np.flatnonzero((length >= 2) & (length <= MAX_WORD))
+    w_start, w_end, length = w_start[short], w_end[short], length[short]
+    # a word's id is its own letters; it can only be a conjunction if every one of them folds
+    ids = _ids(letters, w_start, MAX_WORD) & _MASKS[length]
+    nonletters = np.concatenate(([0], np.cumsum(letters[:n] == 0)))
+    ids[nonletters[w_end] != nonletters[w_start]] = 0
+    conj = _isin(ids, _CONJ_IDS)
+    w_start, w_end = w_start[conj], w_end[conj]
+
+    # newline runs, except those inside a punctuation match's whitespace
+    edges = np.diff(np.concatenate(([False], codes == 10, [False])).view(np.int8))
+    n_start, n_end = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    if len(n_start) and len(punct):
+        covered = np.zeros(n + 1, dtype=np.int64)
+        covered[punct] += 1                 # the runs neither overlap nor share a start or an end
+        covered[run_ends] -= 1
+        free = np.cumsum(covered)[n_start] == 0
+        n_start, n_end = n_start[free], n_end[free]
+
+    # matches never overlap, so a table by start puts them in order without a sort
+    end_at = np.full(n, -1, dtype=np.int64)
+    end_at[punct] = run_ends
+    end_at[w_start] = w_end
+    end_at[n_start] = n_end
+    starts = np.flatnonzero(end_at >= 0)
+    return starts, end_at[starts]
+
+
+def clause_bounds(text, spans=None):
+    """Start and end offsets of the clauses split_clauses returns (pieces between matches, stripped)."""
+    codes = code_points(text) if isinstance(text, str) else text
+    n = len(codes)
+    ms, me = clause_spans(codes) if spans is None else spans
+    a = np.concatenate(([0], me)).astype(np.int64)
+    b = np.concatenate((ms, [n])).astype(np.int64)
+    if not n:
+        return a[:0], b[:0]
+    pos = np.arange(n, dtype=np.int64)
+    ws = _WS_TABLE[np.minimum(codes, len(_WS_TABLE) - 1)]
+    solid_after = np.append(np.minimum.accumulate(np.where(ws, n, pos)[::-1])[::-1], n)
+    solid_before = np.concatenate(([-1], np.maximum.accumulate(np.where(ws, -1, pos))))  # last < i
+    first, last = solid_after[a], solid_before[b]
+    keep = first < b
+    return first[keep], last[keep] + 1
@@ -0,0 +1,171 @@
+# batch analysis for whole corpora (chapters, posts, ...) across a process pool
+#   python corpus.py chapters/ -o features.jsonl --workers 8
+#   python corpus.py posts.jsonl -o features.csv --format csv
+#   python corpus.py chapters/ -o features.jsonl --cache features.sqlite   # re-runs skip known texts
+
+import argparse
+import collections
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+
+import feature_cache
+import metrics
+from six_dimensions import analyze_text, lexicon, load_vad_lexicon
+
+FEATURES = ['valence', 'arousal', 'dominance', 'subjectivity', 'variation', 'density']
+
+# the pieces of analyze_corpus, public for other pools (server.py, sweep.py):
+# init_worker and analyze_chunk run in the workers, lookup_cached/merge_cached around them
+
+# per-worker settings, filled in by init_worker
+_WORKER = {}
+
+
+def init_worker(vad_path, phrases):
+    """Pool initializer: the lexicon and options analyze_chunk uses in this worker."""
+    _WORKER.update(vad_path=vad_path, phrases=phrases)
+    # with fork the lexicon is already here (shared copy-on-write); with spawn this
+    # memory-maps the binary cache, so the pages are still shared, never pickled.
+    # one throwaway analysis loads TextBlob's data and the emotion index once per worker
+    analyze_text("warm up", vad_path, phrases)
+    metrics.reset()                     # not counted as work
+
+
+def analyze_chunk(texts):
+    """analyze_text features for texts, in a worker set up by init_worker."""
+    return [analyze_text(t, _WORKER['vad_path'], _WORKER['phrases']) for t in texts]
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def pool_context():
+    """The multiprocessing context for analysis pools."""
+    # on Linux fork lets workers inherit the already-loaded lexicon without any copying. elsewhere
+    # the platform's default stays (macOS spawns: fork is unsafe with its frameworks and with Tk),
+    # and spawned workers memory-map the lexicon's artifact, so it is never pickled either
+    if sys.platform.startswith('linux'):
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def lookup_cached(chunk, cache):
+    """The chunk's cached features (None where missing) and the texts still to analyse."""
+    found = cache.get_many(chunk) if cache is not None else [None] * len(chunk)
+    return found, [t for t, f in zip(chunk, found) if f is None]
+
+
+def merge_cached(found, todo, results, cache):
+    """lookup_cached's found with the results for todo filled in (and stored in the cache)."""
+    if cache is not None and todo:
+        cache.put_many(zip(todo, results))
+    results = iter(results)
+    return [f if f is not None else next(results) for f in found]
+
+
+def analyze_corpus(texts, workers=None, chunksize=16, vad_path=lexicon, phrases=False, cache=None):
+    """Yield analyze_text features for every text, in input order.
+
+    texts may be any iterable (it is consumed lazily); at most 2 * workers
+    chunks of chunksize texts are in flight at once. With a FeatureCache (opened
+    with the same vad_path and phrases) each chunk is looked up in one go and
+    only the texts it lacks are analysed, then stored.
+    """
+    workers = workers or os.cpu_count() or 1
+    load_vad_lexicon(vad_path)
+    if workers == 1:
+        for chunk in _chunks(texts, chunksize):
+            found, todo = lookup_cached(chunk, cache)
+            yield from merge_cached(found, todo, [analyze_text(t, vad_path, phrases) for t in todo], cache)
+        return
+
+    with pool_context().Pool(workers, initializer=init_worker, initargs=(vad_path, phrases)) as pool:
+        pending = collections.deque()
+        for chunk in _chunks(texts, chunksize):
+            found, todo = lookup_cached(chunk, cache)
+            pending.append((found, todo, pool.apply_async(analyze_chunk, (todo,))))
+            if len(pending) >= 2 * workers:
+                found, todo, job = pending.popleft()
+                yield from merge_cached(found, todo, job.get(), cache)
+        while pending:
+            found, todo, job = pending.popleft()
+            yield from merge_cached(found, todo, job.get(), cache)
+
+
+# CLI: directory of .txt files or a JSONL file in, JSONL or CSV features out
+def read_records(source, text_field='text'):
+    """Yield (id, text) from a directory of .txt files or a JSONL file."""
+    path = Path(source)
+    if path.is_dir():
+        for f in sorted(path.rglob('*.txt')):
+            yield str(f.relative_to(path)), f.read_text(encoding='utf-8')
+        return
+    with open(path, encoding='utf-8') as f:
+        for n, line in enumerate(f):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                yield n, record
+            else:
+                yield record.get('id', n), record[text_field]
+
+
+def write_features(rows, out, fmt):
+    if fmt == 'csv':
+        writer = csv.DictWriter(out, fieldnames=['id'] + FEATURES)
+        writer.writeheader()
+        for rid, features in rows:
+            writer.writerow({'id': rid, **features})
+    else:
+        for rid, features in rows:
+            out.write(json.dumps({'id': rid, **features}) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a corpus into six-dimension features.")
+    parser.add_argument('source', help="directory of .txt files or a JSONL file")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    parser.add_argument('--format', choices=['jsonl', 'csv'],
+                        help="output format (default: from the output extension, else jsonl)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=16)
+    parser.add_argument('--text-field', default='text', help="JSONL field holding the text")
+    parser.add_argument('--phrases', action='store_true', help="match multi-word lexicon terms")
+    parser.add_argument('--cache', default=os.environ.get(feature_cache.ENV_CACHE),
+                        help="SQLite feature cache to reuse and fill (default: $SOUNDSCAPE_CACHE)")
+    args = parser.parse_args(argv)
+    cache = feature_cache.FeatureCache(args.cache, phrases=args.phrases) if args.cache else None
+
+    fmt = args.format or ('csv' if args.output and args.output.endswith('.csv') else 'jsonl')
+    ids = collections.deque()
+
+    def texts():
+        for rid, text in read_records(args.source, args.text_field):
+            ids.append(rid)
+            yield text
+
+    features = analyze_corpus(texts(), args.workers, args.chunksize, phrases=args.phrases, cache=cache)
+    rows = ((ids.popleft(), f) for f in features)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as out:
+            write_features(rows, out, fmt)
+    else:
+        write_features(rows, sys.stdout, fmt)
+    if cache is not None:
+        print(f"feature cache: {json.dumps(cache.stats())}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# NRCLex's emotion words as an index over the VAD lexicon's term ids, built once per process
+# (VADLexicon.emotions). emotion density becomes a label count over the whitespace tokens
+# instead of a new NRCLex(text), which re-tokenizes the whole text with TextBlob every call.
+#   counts = get_vad_lexicon().emotions.lookup_words(text.split())   # labels per token
+#   density = counts.sum() / len(counts)
+
+import re
+import string
+
+import numpy as np
+from nltk.tokenize import NLTKWordTokenizer
+from nrclex import NRCLex
+
+_tokenizer = NLTKWordTokenizer()
+# Treebank keeps letters joined by single hyphens as one word ("war-torn") ...
+_PLAIN = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*")
+# ... unless a part is one of its contractions, e.g. "wanna" -> "wan" "na" (read off NLTK's patterns)
+_CONTRACTIONS = {re.sub(r"\\b|\(\?#X\)|\(\?=\\s\)|[() ']", '', r.pattern.replace('(?i)', ''))
+                 for r in NLTKWordTokenizer.CONTRACTIONS2 + NLTKWordTokenizer.CONTRACTIONS3}
+
+
+def nrc_words(token):
+    """The words TextBlob, so NRCLex, makes of one whitespace token ("mother's." -> mother 's)."""
+    word = token.strip(string.punctuation)
+    if _PLAIN.fullmatch(word) and _CONTRACTIONS.isdisjoint(word.lower().split('-')):
+        return [word]
+    # TextBlob's WordTokenizer with include_punc=False
+    return [w if w.startswith("'") else w.strip(string.punctuation)
+            for w in _tokenizer.tokenize(token) if w.strip(string.punctuation)]
+
+
+class EmotionIndex:
+    """NRCLex emotion labels over a VAD lexicon's term ids.
+
+    labels[i] is the number of emotions of term i (0 for the rest); emotion
+    words the VAD lexicon lacks get ids past its end (see `extra`). Lookups
+    are case-sensitive, like NRCLex's.
+    """
+
+    def __init__(self, index, n_terms, emotions=None):
+        emotions = NRCLex.lexicon if emotions is None else emotions
+        self.index = index
+        self.extra = {}
+        ids = []
+        for word in emotions:
+            i = index.get(word)
+            if i is None:
+                i = self.extra.setdefault(word, n_terms + len(self.extra))
+            ids.append(i)
+        self.labels = np.zeros(n_terms + len(self.extra), dtype=np.int8)
+        self.labels[ids] = [len(v) for v in emotions.values()]
+        self.words = emotions
+        self._labels = self.labels.tolist()
+
+    def __len__(self):
+        return len(self.words)
+
+    def _count(self, token):
+        n = 0
+        for w in nrc_words(token):
+            i = self.index.get(w)
+            if i is None:
+                i = self.extra.get(w)
+            if i is not None:
+                n += self._labels[i]
+        return n
+
+    def lookup_words(self, words):
+        """Emotion labels per whitespace token; their sum is NRCLex's raw_emotion_scores total.
+
+        Each distinct word is resolved only once.
+        """
+        table = {w: self._count(w) for w in set(words)}
+        return np.fromiter(map(table.__getitem__, words), dtype=np.int64, count=len(words))
@@ -0,0 +1,173 @@
+# persistent, content-addressed cache of analyze_text features, in one SQLite file
+#   cache = FeatureCache('features.sqlite', max_entries=100000)
+#   features = cache.analyze(text)                  # stored result, or analyze_text and store it
+#   found = cache.get_many(texts)                   # None where missing
+#   cache.put_many(zip(texts, features)); print(cache.stats())
+# the key hashes the text together with the lexicon file's sha256 and FEATURE_VERSION, so
+# editing the lexicon CSV (or the analysis) makes every old entry miss; those are deleted
+# the first time this cache writes under the new lexicon. WAL mode lets several processes
+# read and write the same file at once. set SOUNDSCAPE_CACHE to a path to turn it on in
+# app.py, render.py and corpus.py (see from_env).
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from six_dimensions import analyze_text, lexicon, load_vad_lexicon
+
+# bump when analyze_text changes what it returns for the same text
+FEATURE_VERSION = 1
+ENV_CACHE = 'SOUNDSCAPE_CACHE'
+MAX_ENTRIES = 100000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS features (
+    key TEXT PRIMARY KEY,       -- sha256 of version, lexicon hash, phrases flag and text
+    lexicon TEXT NOT NULL,      -- sha256 of the lexicon file
+    version INTEGER NOT NULL,
+    features TEXT NOT NULL,     -- JSON
+    used REAL NOT NULL          -- last access, for LRU eviction
+);
+CREATE INDEX IF NOT EXISTS features_used ON features (used);
+"""
+
+
+class FeatureCache:
+    """analyze_text results on disk, keyed by content, with LRU eviction past max_entries.
+
+    One connection per thread and process, so the cache can be shared with
+    a worker thread or survive a fork.
+    """
+
+    def __init__(self, path, max_entries=MAX_ENTRIES, vad_path=lexicon, phrases=False, timeout=30.0):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.vad_path = vad_path
+        self.phrases = phrases
+        self.timeout = timeout
+        self._local = threading.local()
+        self._purged = set()        # lexicon hashes stale entries were already removed for
+        self.hits = self.misses = self.puts = self.evicted = 0
+        self.get_seconds = self.put_seconds = 0.0
+        self.gets = self.put_calls = 0
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _lexicon_hash(self):
+        # get_vad_lexicon re-checks the file's size and mtime, so a changed CSV is seen at once
+        return load_vad_lexicon(self.vad_path).sha256
+
+    def key(self, text, lexicon_hash=None):
+        lexicon_hash = lexicon_hash or self._lexicon_hash()
+        h = hashlib.sha256(f'{FEATURE_VERSION}\0{lexicon_hash}\0{int(self.phrases)}\0'.encode())
+        h.update(text.encode('utf-8', 'surrogatepass'))
+        return h.hexdigest()
+
+    def __len__(self):
+        return self._conn().execute('SELECT COUNT(*) FROM features').fetchone()[0]
+
+    def get(self, text):
+        return self.get_many([text])[0]
+
+    def put(self, text, features):
+        self.put_many([(text, features)])
+
+    def get_many(self, texts):
+        """Stored features for each text, None where there are none."""
+        start = time.perf_counter()
+        lexicon_hash = self._lexicon_hash()
+        keys = [self.key(t, lexicon_hash) for t in texts]
+        found = {}
+        conn = self._conn()
+        for i in range(0, len(keys), 500):              # SQLite caps the number of parameters
+            batch = list(set(keys[i:i + 500]))
+            rows = conn.execute(f'SELECT key, features FROM features WHERE key IN ({",".join("?" * len(batch))})',
+                                batch).fetchall()
+            if rows:
+                found.update(rows)
+                conn.execute(f'UPDATE features SET used = ? WHERE key IN ({",".join("?" * len(rows))})',
+                             [time.time()] + [k for k, _ in rows])
+        result = [json.loads(found[k]) if k in found else None for k in keys]
+        n_hit = sum(r is not None for r in result)
+        self.hits += n_hit
+        self.misses += len(result) - n_hit
+        self.gets += 1
+        self.get_seconds += time.perf_counter() - start
+        return result
+
+    def put_many(self, pairs):
+        """Store (text, features) pairs, then evict the least recently used past max_entries."""
+        start = time.perf_counter()
+        lexicon_hash = self._lexicon_hash()
+        now = time.time()
+        rows = [(self.key(text, lexicon_hash), lexicon_hash, FEATURE_VERSION,
+                 json.dumps({k: float(v) for k, v in features.items()}), now)
+                for text, features in pairs]
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if lexicon_hash not in self._purged:
+                conn.execute('DELETE FROM features WHERE lexicon != ? OR version != ?',
+                             (lexicon_hash, FEATURE_VERSION))
+            conn.executemany('INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?, ?)', rows)
+            excess = conn.execute('SELECT COUNT(*) FROM features').fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute('DELETE FROM features WHERE key IN '
+                             '(SELECT key FROM features ORDER BY used LIMIT ?)', (excess,))
+                self.evicted += excess
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self._purged.add(lexicon_hash)
+        self.puts += len(rows)
+        self.put_calls += 1
+        self.put_seconds += time.perf_counter() - start
+
+    def analyze(self, text):
+        """analyze_text(text), from the cache when it has it."""
+        features = self.get(text)
+        if features is None:
+            features = analyze_text(text, self.vad_path, self.phrases)
+            self.put(text, features)
+        return features
+
+    def clear(self):
+        self._conn().execute('DELETE FROM features')
+
+    def stats(self):
+        """Hit/miss counts and mean latencies of this instance, plus the entries on disk."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'puts': self.puts,
+            'evicted': self.evicted,
+            'get_ms': self.get_seconds / self.gets * 1000 if self.gets else 0.0,
+            'put_ms': self.put_seconds / self.put_calls * 1000 if self.put_calls else 0.0,
+        }
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def from_env(**options):
+    """A FeatureCache at $SOUNDSCAPE_CACHE, or None when it is not set."""
+    path = os.environ.get(ENV_CACHE)
+    return FeatureCache(path, **options) if path else None
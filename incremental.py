@@ -0,0 +1,205 @@
+# incremental six-dimension analysis for live or very long text
+#   analyzer = IncrementalAnalyzer()
+#   for chunk in feed: analyzer.feed(chunk); print(analyzer.snapshot())
+# the final snapshot equals analyze_text() on the concatenated text.
+
+import copy
+import math
+import re
+
+import numpy as np
+from textblob.en import sentiment as pattern_sentiment
+from textblob._text import EMOTICONS, PUNCTUATION
+
+from six_dimensions import count_emotion_words, lexicon, load_vad_lexicon, scan_text
+
+# text is committed up to the end of a whitespace run that follows a word character.
+# no CL_SPLIT match can span such a point (they all start with punctuation, a
+# conjunction or a newline inside the run), so clauses, tokens and the TextBlob
+# tokenizer see the same pieces as in the full text.
+_SAFE_CUT = re.compile(r'\w\s+(?=\S)')
+
+
+class _SubjectivityStream:
+    """TextBlob's subjectivity (pattern's Sentiment.assessments) over a stream of text.
+
+    Every assessment but the newest is final and folds into a running sum; the
+    newest may still be changed by a following word ("really" -> "really good").
+    Only subjectivity is tracked, polarity-only updates ("!", negations) are skipped.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+        self.last = None        # [subjectivity, intensity] of the newest assessment
+        self.modifier = None    # preceding modifier word
+        self.negation = None    # preceding negation word
+
+    def _push(self, s, i):
+        if self.last is not None:
+            self.total += self.last[0]
+            self.count += 1
+        self.last = [s, i]
+
+    @staticmethod
+    def _tokens(text):
+        return " ".join(pattern_sentiment.tokenizer(text)).split()
+
+    def feed(self, text):
+        for w in self._tokens(text):
+            self._word(w)
+
+    def _word(self, w):
+        lex = pattern_sentiment
+        w = w.lower()
+        if w in lex and None in lex[w]:
+            p, s, i = lex[w][None]
+            if self.modifier is None:
+                self._push(s, i)
+            else:
+                self.last[:] = [max(-1.0, min(s * self.last[1], +1.0)), i]
+            if self.negation is not None:
+                self.last[1] = 1.0 / self.last[1]
+            self.modifier = None
+            self.negation = None
+            if any(map(lex[w].__contains__, lex.modifiers)):
+                self.modifier = w
+            if w in lex.negations:
+                self.negation = w
+        else:
+            if w in lex.negations:
+                self.negation = w
+            elif self.negation and len(w.strip("'")) > 1:
+                self.negation = None
+            if self.negation is not None and self.modifier is not None and lex.modifier(self.modifier):
+                self.negation = None
+            elif self.modifier and len(w) > 2:
+                self.modifier = None
+            if w == "(!)":
+                self._push(1.0, 1.0)
+            if w.isalpha() is False and len(w) <= 5 and w not in PUNCTUATION:
+                for (_type, p), e in EMOTICONS.items():
+                    if w in map(lambda e: e.lower(), e):
+                        self._push(1.0, 1.0)
+                        break
+
+    def value(self):
+        total, count = self.total, self.count
+        if self.last is not None:
+            total += self.last[0]
+            count += 1
+        return total / float(count or 1)
+
+
+class IncrementalAnalyzer:
+    """analyze_text() for text that arrives in chunks.
+
+    feed(chunk) costs O(len(chunk)) amortised: text is processed up to the last
+    safe cut point and only the unfinished tail is kept. Keeps running V/A/D sums,
+    Welford statistics over clause valences and running emotion-word counts.
+    """
+
+    def __init__(self, vad_path=lexicon):
+        self.vad_lex = load_vad_lexicon(vad_path)
+        # the unfinished tail: its chunks, joined only when a cut commits them; the tail's last
+        # non-whitespace character and whether whitespace follows it are all a cut needs of it
+        self._pending = []
+        self._last = ''
+        self._trailing = False
+        # valence/arousal/dominance sums over whitespace tokens found in the lexicon
+        self._vad_sum = np.zeros(3)
+        self._vad_hits = 0
+        # Welford mean/M2 over closed clause valences
+        self._clauses = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        # the clause still open at the end of the committed text
+        self._open_sum = 0.0
+        self._open_hits = 0
+        self._open_nonempty = False
+        # density counts
+        self._words = 0
+        self._emotions = 0
+        self._subjectivity = _SubjectivityStream()
+
+    def feed(self, chunk):
+        # the tail holds no cut of its own, so one can only start at its last word character
+        head = self._last + (' ' if self._trailing else '')
+        cut = None
+        for cut in _SAFE_CUT.finditer(head + chunk):
+            pass
+        if cut is not None:
+            end = cut.end() - len(head)
+            self._consume(''.join(self._pending) + chunk[:end])
+            self._pending = [chunk[end:]]
+        elif chunk:
+            self._pending.append(chunk)
+        solid = chunk.rstrip()
+        if solid:
+            self._last, self._trailing = solid[-1], len(solid) < len(chunk)
+        elif chunk:
+            self._trailing = True
+        return self
+
+    def snapshot(self):
+        """Features for everything fed so far, as analyze_text would return them."""
+        final = copy.copy(self)
+        final._vad_sum = self._vad_sum.copy()
+        final._subjectivity = copy.copy(self._subjectivity)
+        final._subjectivity.last = copy.copy(self._subjectivity.last)
+        final._consume(''.join(self._pending))
+        final._close_clause()
+        return final._features()
+
+    def _add_clause(self, value):
+        self._clauses += 1
+        delta = value - self._mean
+        self._mean += delta / self._clauses
+        self._m2 += delta * (value - self._mean)
+
+    def _close_clause(self):
+        if self._open_nonempty:
+            self._add_clause(self._open_sum / self._open_hits if self._open_hits else 0.0)
+        self._open_sum, self._open_hits, self._open_nonempty = 0.0, 0, False
+
+    def _consume(self, segment):
+        if not segment:
+            return
+        scan = scan_text(segment, self.vad_lex)
+        hits = scan.word_ids[scan.word_ids >= 0]
+        if len(hits):
+            self._vad_sum += self.vad_lex.scores(hits).sum(axis=1)
+            self._vad_hits += len(hits)
+
+        # piece 0 continues the open clause; every later piece starts a new one
+        sums, counts = scan.clause_sums()
+        pieces = scan.clause_pieces.tolist()
+        k = 0
+        if pieces and pieces[0] == 0:
+            self._open_sum += sums[0]
+            self._open_hits += int(counts[0])
+            self._open_nonempty = True
+            k = 1
+        if scan.n_pieces > 1:
+            self._close_clause()
+        for j in range(k, len(pieces)):
+            if pieces[j] == scan.n_pieces - 1:
+                self._open_sum, self._open_hits, self._open_nonempty = sums[j], int(counts[j]), True
+            else:
+                self._add_clause(sums[j] / counts[j] if counts[j] else 0.0)
+
+        self._words += len(scan.word_ids)
+        self._emotions += count_emotion_words(segment, self.vad_lex)
+        self._subjectivity.feed(segment)
+
+    def _features(self):
+        vad = self._vad_sum / self._vad_hits if self._vad_hits else np.zeros(3)
+        variation = math.sqrt(self._m2 / self._clauses) if self._clauses > 1 else 0.0
+        return {
+            'valence': float(vad[0]),
+            'arousal': float(vad[1]),
+            'dominance': float(vad[2]),
+            'subjectivity': float(self._subjectivity.value()),
+            'variation': float(variation),
+            'density': float(self._emotions / self._words if self._words else 0.0),
+        }
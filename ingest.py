@@ -0,0 +1,251 @@
+# NRC-VAD lexicon ingestion: stream the raw .txt (tab-separated) or a .csv, validate every row, and
+# write one versioned binary artifact that loads by memory-mapping, without parsing or copying
+#   python ingest.py NRC-VAD-Lexicon-v2.1.txt -o NRC-VAD-Lexicon-v2.1.vadlex
+#   python ingest.py NRC-VAD-Lexicon-v2.1.txt --csv NRC-VAD-Lexicon-v2.1.csv    # what txt2csv.py did
+#   python ingest.py --verify NRC-VAD-Lexicon-v2.1.vadlex
+# the artifact holds the terms sorted (for binary search) with their ids, the float32 (3, n)
+# V/A/D matrix, the multi-word PhraseTrie's arrays and a sha256 over all of them. layout:
+# MAGIC, the JSON header's length (uint64), the header, then every array 64-byte aligned.
+# vad_lexicon.py keeps one next to the source (in its .cache directory) and opens it with
+# open_artifact; the pages are shared by every process that maps the file.
+
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import math
+import os
+import struct
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from phrases import PhraseTrie
+
+MAGIC = b'VADLEX\0\0'
+FORMAT_VERSION = 1
+ALIGN = 64
+DIMENSIONS = ('valence', 'arousal', 'dominance')
+MAX_ERRORS = 20                 # reported at once, before giving up on a file
+BLOCK = 4096                    # rows parsed and validated together
+
+
+#1. streaming and validation ─────────────────────────────────────────────────────────────────────────
+def _blocks(f, path):
+    """(number of the first line, [fields of each line]) BLOCK lines at a time; blank lines give [''] or [].
+
+    A .csv goes through the csv module (its quoting), anything else is split on tabs only,
+    so multi-word terms ("a bit") keep their spaces.
+    """
+    if path.endswith('.csv'):
+        lines = csv.reader(f)
+    else:
+        lines = (line.rstrip('\r\n').split('\t') for line in f)
+    first = 1
+    for block in iter(lambda: list(itertools.islice(lines, BLOCK)), []):
+        yield first, block
+        first += len(block)
+
+
+def _row_errors(path, rows):
+    """Why rows (line number, fields) are invalid, one at a time, and the valid ones; the slow path."""
+    errors, valid = [], []
+    for n, fields in rows:
+        try:
+            scores = [float(x) for x in fields[1:]]
+        except ValueError:
+            errors.append(f"{path}:{n}: scores must be numbers: {fields[1:]}")
+            continue
+        if not all(-1.0 <= s <= 1.0 for s in scores):      # also rejects nan
+            errors.append(f"{path}:{n}: scores of {fields[0]!r} must be in [-1, 1]: {scores}")
+            continue
+        valid.append((n, fields))
+    return errors, valid
+
+
+def read_lexicon(path, strict=True):
+    """Stream a lexicon file into (terms, (n, 3) float64 valence/arousal/dominance), validating it.
+
+    Terms are lower-cased with their whitespace collapsed; scores must be numbers in
+    [-1, 1]. A header row (term, valence, arousal, dominance) is skipped. Rows are parsed
+    and checked BLOCK at a time; bad ones raise ValueError with their line numbers
+    (up to MAX_ERRORS of them). With strict=False they are left out instead, with one
+    warning that lists them: how the app loads a lexicon, where ingest.py refuses it.
+    """
+    terms, scores, errors = [], [], []
+    seen = {}
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        for first, block in _blocks(f, path):
+            if first == 1 and [x.strip().lower() for x in block[0][1:]] == list(DIMENSIONS):
+                block[0] = []
+            good = [(first + k, fields) for k, fields in enumerate(block) if len(fields) == 4]
+            if len(good) < len(block):
+                errors += [f"{path}:{first + k}: expected a term and 3 scores, got {len(fields)} field(s)"
+                           for k, fields in enumerate(block)
+                           if len(fields) != 4 and (len(fields) > 1 or fields and fields[0].strip())]
+            try:
+                values = np.fromiter(map(float, itertools.chain.from_iterable(
+                    fields[1:] for _, fields in good)), dtype=np.float64, count=3 * len(good)).reshape(-1, 3)
+            except ValueError:
+                values = None
+            if values is None or not ((values >= -1.0) & (values <= 1.0)).all():    # also catches nan
+                bad, good = _row_errors(path, good)
+                errors += bad
+                values = np.array([[float(x) for x in fields[1:]] for _, fields in good]).reshape(-1, 3)
+            keep = np.zeros(len(good), dtype=bool)
+            for k, ((n, fields), term) in enumerate(zip(good, [' '.join(fields[0].lower().split())
+                                                               for _, fields in good])):
+                if not term:
+                    errors.append(f"{path}:{n}: empty term")
+                elif seen.setdefault(term, n) != n:
+                    errors.append(f"{path}:{n}: duplicate term {term!r} (first on line {seen[term]})")
+                else:
+                    terms.append(term)
+                    keep[k] = True
+            scores.append(values[keep])
+            if strict and len(errors) >= MAX_ERRORS:
+                break
+    if errors and strict:
+        raise ValueError(f"invalid lexicon {path}:\n  " + "\n  ".join(errors[:MAX_ERRORS]))
+    if errors:
+        more = f"\n  ... and {len(errors) - MAX_ERRORS} more" if len(errors) > MAX_ERRORS else ""
+        warnings.warn(f"skipped {len(errors)} invalid row(s) of {path}:\n  " + "\n  ".join(errors[:MAX_ERRORS])
+                      + more, stacklevel=2)
+    if not terms:
+        raise ValueError(f"{path} has no terms")
+    return terms, np.concatenate(scores)
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+#2. building the arrays ─────────────────────────────────────────────────────────────────────────────
+def build_arrays(terms, scores):
+    """The artifact's arrays from read_lexicon's terms and scores; term ids follow the terms' order."""
+    unsorted = np.array(terms)
+    order = np.argsort(unsorted, kind='stable')
+    arrays = {
+        'keys': unsorted[order],                        # sorted terms, for searchsorted
+        'term_ids': order.astype(np.int32),             # the id of every sorted term
+        'vad': scores.astype(np.float32).T.copy(),
+    }
+    trie = PhraseTrie(terms, {t: i for i, t in enumerate(terms)})
+    arrays.update(trie.arrays())
+    return arrays
+
+
+def content_hash(arrays):
+    h = hashlib.sha256()
+    for name in sorted(arrays):
+        a = np.ascontiguousarray(arrays[name])
+        h.update(f'{name}\0{a.dtype.str}\0{a.shape}\0'.encode())
+        h.update(a.data)
+    return h.hexdigest()
+
+
+#3. the artifact file ───────────────────────────────────────────────────────────────────────────────
+def _aligned(n):
+    return -(-n // ALIGN) * ALIGN
+
+
+def write_artifact(path, arrays, **info):
+    """Write arrays (and info, kept in the header) to path, atomically."""
+    layout, offset = {}, 0
+    for name, a in arrays.items():
+        layout[name] = {'dtype': a.dtype.str, 'shape': list(a.shape), 'offset': offset}
+        offset = _aligned(offset + a.nbytes)
+    header = {'format': FORMAT_VERSION, 'rows': int(arrays['vad'].shape[1]), 'sha256': content_hash(arrays),
+              **info, 'arrays': layout}
+    raw = json.dumps(header).encode('utf-8')
+    start = _aligned(len(MAGIC) + 8 + len(raw))
+    raw = raw.ljust(start - len(MAGIC) - 8)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + struct.pack('<Q', len(raw)) + raw)
+        for name, a in arrays.items():
+            f.seek(start + layout[name]['offset'])
+            f.write(np.ascontiguousarray(a).data)
+        f.truncate(start + offset)
+    os.replace(tmp, path)
+    return header
+
+
+def open_artifact(path):
+    """(header, arrays) of an artifact; the arrays are read-only views of one memory map."""
+    with open(path, 'rb') as f:
+        head = f.read(len(MAGIC) + 8)
+        if len(head) < len(MAGIC) + 8 or head[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a lexicon artifact")
+        size = struct.unpack('<Q', head[len(MAGIC):])[0]
+        header = json.loads(f.read(size))
+    if header.get('format') != FORMAT_VERSION:
+        raise ValueError(f"{path} has format {header.get('format')}, this version reads {FORMAT_VERSION}")
+    start = len(MAGIC) + 8 + size                  # the header is padded to the first array
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        begin = start + spec['offset']
+        end = begin + dtype.itemsize * math.prod(spec['shape'])
+        if end > len(data):
+            raise ValueError(f"{path} is truncated")
+        arrays[name] = data[begin:end].view(dtype).reshape(spec['shape'])
+    return header, arrays
+
+
+def verify(path):
+    """True if the artifact's arrays still hash to the sha256 in its header."""
+    header, arrays = open_artifact(path)
+    return content_hash(arrays) == header['sha256']
+
+
+def ingest(source, output):
+    """Validate source (.txt or .csv) and write its artifact to output; returns the header."""
+    arrays = build_arrays(*read_lexicon(source))
+    return write_artifact(output, arrays, source=os.path.basename(source), source_sha256=file_hash(source))
+
+
+def write_csv(path, terms, scores):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(('term',) + DIMENSIONS)
+        for term, vad in zip(terms, scores.tolist()):
+            writer.writerow([term] + [f'{s:g}' for s in vad])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate an NRC-VAD lexicon and build its binary artifact.")
+    parser.add_argument('source', help="the lexicon: NRC's tab-separated .txt or a .csv (an artifact with --verify)")
+    parser.add_argument('-o', '--output', help="artifact to write (default: the source with a .vadlex extension)")
+    parser.add_argument('--csv', help="also write the validated rows here as CSV")
+    parser.add_argument('--verify', action='store_true', help="check an artifact against its content hash")
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        ok = verify(args.source)
+        print(f"{args.source}: {'ok' if ok else 'CORRUPT (content hash mismatch)'}")
+        return 0 if ok else 1
+    output = args.output or os.path.splitext(args.source)[0] + '.vadlex'
+    start = time.perf_counter()
+    try:
+        header = ingest(args.source, output)
+        if args.csv:
+            write_csv(args.csv, *read_lexicon(args.source))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"{header['rows']} terms from {args.source} -> {output} in {time.perf_counter() - start:.3f} s "
+          f"(sha256 {header['sha256'][:12]})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
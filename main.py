@@ -1,130 +1,46 @@
 # Elizabeth Li 5/13/2025
 # sentiment analysis and sonification
 
-from pyo import Server, Sine, Adsr, Pattern
+from audio_backend import get_backend
+from mapping import clamp_features, map_subjectivity
+from soundscape import Soundscape, WINDOW_WORDS, text_score
 from six_dimensions import analyze_text
-import random
 
 TEXT = input("Enter the text to sonify: ")
 
-#1. configuration ─────────────────────────────────────────────────────────────────────────────
-# variation - volume
-CHORD_VOL_MIN, CHORD_VOL_MAX = 0.01, 0.5 
-NOTES_VOL_MIN, NOTES_VOL_MAX = 0.2, 3.0
-# arousal - tempo
-INTERVAL_MIN, INTERVAL_MAX = 0.1, 1.0
-TEMPO_JITTER = 0.1     # tempo: ±10% timing jitter
-
-#base pitch for C4
-ROOT_C4 = 261.63
+#1. configuration: see mapping.py (volumes, tempo, pitch) and soundscape.py (windows)
 
 
 #2. text analysis ─────────────────────────────────────────────────────────────────────────────
-features  = analyze_text(TEXT)
+features  = clamp_features(analyze_text(TEXT))    # everything but valence clamped to [0, 1]
 valence   = float(features['valence'])
 variation = float(features['variation'])
 arousal   = float(features['arousal'])
 dominance = float(features['dominance'])
 subjectivity = float(features['subjectivity'])
 
-# clamp everything except valence to valid ranges, just in case
-variation = max(0.0, min(variation, 1.0))
-arousal   = max(0.0, min(arousal,   1.0))
-dominance = max(0.0, min(dominance, 1.0))
-subjectivity = max(0.0, min(subjectivity, 1.0))
-
-
-#3. Mapping ─────────────────────────────────────────────────────────────────────────────
-# positive valence = major triad, negative valence = minor triad
-def map_valence(valence):
-    intervals = [0,4,7] if valence >= 0 else [0,3,7]
-    root_freq = ROOT_C4 * (2 ** valence)
-    return [root_freq * (2 ** (i/12)) for i in intervals]
-chord = map_valence(valence) #chord is originally chord_freqs
-
-# low variation = soft notes/strong chord, high variation = strong notes/soft chord
-def map_variation(variation):
-    chord_vol = CHORD_VOL_MAX - variation * (CHORD_VOL_MAX - CHORD_VOL_MIN)
-    note_vol  = NOTES_VOL_MIN + variation * (NOTES_VOL_MAX - NOTES_VOL_MIN)
-    return chord_vol, note_vol
-chord_vol, note_vol = map_variation(variation)
-
-# arousal = tempo
-def map_arousal(arousal):
-    return INTERVAL_MAX - arousal * (INTERVAL_MAX - INTERVAL_MIN)
-tempo = map_arousal(arousal)
-
-# dominance = the pitch of the next tone (how randomly its order is following the previous note)
-note_index = [0]
-def map_dominance(dominance, chord, note_index):
-    if random.random() < dominance:
-        note_index = (note_index[0] + 1) % len(chord)
-        return chord[note_index[0]]
-    else:
-        return random.choice(chord)
-
-#subjectivity = how long each note is played
-def map_subjectivity(subjectivity, min_release=0.1, max_release=1.0):
-    return min_release + subjectivity * (max_release - min_release)
-subjectivity = map_subjectivity(subjectivity)
-attack  = 0.005 + subjectivity * (0.05  - 0.005)
-decay   = 0.05  + subjectivity * (0.5   - 0.05)
-sustain = 0.2   + subjectivity * (0.8   - 0.2)
-release = 0.05   + subjectivity * (1.0   - 0.05)
-duration = release + 1
 
+#3. Mapping (whole text, plus the same six dimensions window by window) ────────────────────────
+params, windows = text_score(TEXT, features)
+chord = params['chord']
+chord_vol, note_vol = params['chord_vol'], params['note_vol']
+tempo = params['tempo']
 
-#4. Setup pyo ─────────────────────────────────────────────────────────────────────────────
-s = Server(duplex=False, nchnls=2, sr=44100, audio='portaudio').boot()
-s.start()
 
+#4. Audio backend: pyo by default, SOUNDSCAPE_AUDIO=offline or null to run without a sound card ──
+backend = get_backend()     # boots on the first note, after the analysis
 
 
-#5. background music 
-left_background, right_background = [], []
-for note in chord: #for 0 in [0,4,7]
-    left_background.append(Sine(freq=note, mul=chord_vol).out(chnl=0) )
-    right_background.append(Sine(freq=note, mul=chord_vol).out(chnl=1) )
-
-#6. set "melody" notes
-mel_idx     = [0]
-left_melody  = []
-right_melody = []
-
-def play_melody():
-    #pick the next note based on dominance
-    freq = map_dominance(dominance, chord, note_index)
-    
-    # Trigger envelope
-    #env = Adsr(release=release, mul=NOTE_VOL)
-    env = Adsr(attack=attack, decay=decay, sustain=sustain, release=release, dur=duration, mul=note_vol)
-    #env = Adsr(attack=0.01, decay=0.05, sustain=0.6, release=release, dur=duration, mul=NOTE_VOL)
-    env.play()
-
-    # Play melody
-    left_melody.append(Sine(freq=freq, mul=env).out(chnl=0)  )
-    right_melody.append(Sine(freq=freq, mul=env).out(chnl=1) )
-
-    # limits list of notes to 50 to save memory
-    if len(left_melody) > 50:
-        left_melody.pop(0)
-        right_melody.pop(0)
-
-    # play the next note at a jittered tempo
-    next_interval = tempo + random.uniform(-TEMPO_JITTER * tempo, TEMPO_JITTER * tempo)
-    next_interval = max(INTERVAL_MIN, min(INTERVAL_MAX, next_interval))
-    melody.time = next_interval
-
-#7. Start melody
-melody = Pattern(play_melody, time=tempo)
-melody.play()
+#5. background chord + melody notes
+soundscape = Soundscape(params, windows).start(backend)
 
 print(f"valence={valence:.2f}, chord={chord}")
 print(f"variation={variation:.2f}, background chord volume={chord_vol:.2f}, notes volume={note_vol:.2f}")
 print(f"arousal={arousal:.2f}, tempo={tempo:.2f}")
 print(f"dominance={dominance:.2f}")
-print(f"subjectivity={subjectivity:.2f}")
-
-# 8) Keep GUI alive
-s.gui(locals())
+print(f"subjectivity={map_subjectivity(subjectivity):.2f}")
+print(f"{len(windows['tempo'])} windows of {WINDOW_WORDS} words: "
+      f"tempo {windows['tempo'].min():.2f}..{windows['tempo'].max():.2f}")
 
+# 6) Keep GUI alive (offline: write the file, null: run the clock)
+backend.wait(locals())
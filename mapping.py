@@ -0,0 +1,115 @@
+# mapping from the six text dimensions to the soundscape's musical parameters, for main.py and app.py
+# every mapper takes a single value or an array of them (one per window), and a settings dict whose
+# values may be arrays too: they broadcast, so one call maps a whole grid of settings (sweep.py)
+
+import random
+import numpy as np
+
+#1. configuration ─────────────────────────────────────────────────────────────────────────────
+# variation - volume
+CHORD_VOL_MIN, CHORD_VOL_MAX = 0.01, 0.5
+NOTES_VOL_MIN, NOTES_VOL_MAX = 0.2, 3.0
+# arousal - tempo
+INTERVAL_MIN, INTERVAL_MAX = 0.1, 1.0
+TEMPO_JITTER = 0.1     # tempo: ±10% timing jitter
+
+#base pitch for C4
+ROOT_C4 = 261.63
+
+# the same constants as one dict (plus the envelope ranges); DEFAULTS is main.py's mapping,
+# APP the app's: its own volume ranges, slower tempi, and arousal/dominance rescaled from [-1, 1]
+# ('signed') where main.py clips them to [0, 1]. both map variation to volume and subjectivity
+# to the envelope the same way
+DEFAULTS = {
+    'root': ROOT_C4,
+    'chord_vol_min': CHORD_VOL_MIN, 'chord_vol_max': CHORD_VOL_MAX,
+    'notes_vol_min': NOTES_VOL_MIN, 'notes_vol_max': NOTES_VOL_MAX,
+    'interval_min': INTERVAL_MIN, 'interval_max': INTERVAL_MAX,
+    'release_min': 0.1, 'release_max': 1.0,             # map_subjectivity
+    'attack_min': 0.005, 'attack_max': 0.05,
+    'decay_min': 0.05, 'decay_max': 0.5,
+    'sustain_min': 0.2, 'sustain_max': 0.8,
+    'env_release_min': 0.05, 'env_release_max': 1.0,
+    'signed': False,
+}
+APP = dict(DEFAULTS, chord_vol_min=0.01, chord_vol_max=0.4, notes_vol_min=1.0, notes_vol_max=3.0,
+           interval_min=0.5, interval_max=4.0, signed=True)
+PRESETS = {'main': DEFAULTS, 'app': APP}
+
+
+#2. Mapping ─────────────────────────────────────────────────────────────────────────────
+# positive valence = major triad, negative valence = minor triad
+def map_valence(valence, settings=DEFAULTS):
+    valence = np.asarray(valence, dtype=float)[..., None]
+    intervals = np.where(valence >= 0, [0,4,7], [0,3,7])
+    root = np.asarray(settings['root'], dtype=float)[..., None]
+    chords = root * (2 ** valence) * (2 ** (intervals/12))
+    return chords.tolist() if chords.ndim == 1 else chords    # one list of 3 freqs, or shape (n, 3)
+
+# low variation = soft notes/strong chord, high variation = strong notes/soft chord
+def map_variation(variation, settings=DEFAULTS):
+    s = settings
+    chord_vol = s['chord_vol_max'] - variation * (s['chord_vol_max'] - s['chord_vol_min'])
+    note_vol  = s['notes_vol_min'] + variation * (s['notes_vol_max'] - s['notes_vol_min'])
+    return chord_vol, note_vol
+
+# arousal = tempo
+def map_arousal(arousal, settings=DEFAULTS):
+    return settings['interval_max'] - arousal * (settings['interval_max'] - settings['interval_min'])
+
+# dominance = the pitch of the next tone (how randomly its order is following the previous note)
+def map_dominance(dominance, chord, note_index, rng=random):
+    if rng.random() < dominance:
+        note_index[0] = (note_index[0] + 1) % len(chord)
+        return chord[note_index[0]]
+    else:
+        return rng.choice(chord)
+
+#subjectivity = how long each note is played
+def map_subjectivity(subjectivity, min_release=0.1, max_release=1.0):
+    return min_release + subjectivity * (max_release - min_release)
+
+def map_envelope(subjectivity, settings=DEFAULTS):
+    """ADSR settings of the melody notes, from the mapped subjectivity."""
+    s = settings
+    subjectivity = map_subjectivity(subjectivity, s['release_min'], s['release_max'])
+    scale = lambda k: s[k + '_min'] + subjectivity * (s[k + '_max'] - s[k + '_min'])     # noqa: E731
+    release = scale('env_release')
+    return {
+        'attack':  scale('attack'),
+        'decay':   scale('decay'),
+        'sustain': scale('sustain'),
+        'release': release,
+        'duration': release + 1,
+    }
+
+
+#3. All parameters at once ─────────────────────────────────────────────────────────────────────
+def clamp_features(features, settings=DEFAULTS):
+    # clamp everything to valid ranges, just in case; signed arousal/dominance go from [-1, 1] to [0, 1]
+    clamped = dict(features)
+    clamped['valence'] = np.clip(features['valence'], -1.0, 1.0)
+    for k in ('variation', 'subjectivity'):
+        clamped[k] = np.clip(features[k], 0.0, 1.0)
+    for k in ('arousal', 'dominance'):
+        clamped[k] = np.where(settings['signed'], (np.clip(features[k], -1.0, 1.0) + 1) / 2,
+                              np.clip(features[k], 0.0, 1.0))
+    return clamped
+
+def _plain(value):
+    # pyo only takes Python floats, not NumPy scalars
+    return float(value) if np.ndim(value) == 0 else value
+
+def soundscape_params(features, settings=DEFAULTS):
+    """Musical parameters for analyze_text features (or analyze_windows trajectories)."""
+    f = clamp_features(features, settings)
+    chord_vol, note_vol = map_variation(f['variation'], settings)
+    params = {
+        'chord': map_valence(f['valence'], settings),
+        'chord_vol': chord_vol,
+        'note_vol': note_vol,
+        'tempo': map_arousal(f['arousal'], settings),
+        'dominance': f['dominance'],
+    }
+    params.update(map_envelope(f['subjectivity'], settings))
+    return {k: v if k == 'chord' else _plain(v) for k, v in params.items()}
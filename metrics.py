@@ -0,0 +1,182 @@
+# built-in instrumentation: per-stage timers, counters and gauges, off unless turned on
+#   SOUNDSCAPE_METRICS=1 python main.py        # or metrics.enable() before the work starts
+#   print(metrics.to_json()); print(metrics.to_prometheus()); print(metrics.report())
+# stages: load_vad_lexicon, scan_text, compute_vad, compute_subjectivity, compute_sentiment_variation,
+# compute_lexical_density, analyze_text (they nest: analyze_text contains the others), schedule,
+# render, mix and dispatch (the audio side). counters: tokens, lexicon_hits, notes_scheduled,
+# voices_stolen, voices_reclaimed; gauges: live_voices, voice_bytes (the NumPy engines' voice
+# state). while off, a timed function pays one flag test per call.
+# numbers are per process: server.py merges its workers' into its own (see take/merge).
+
+import functools
+import json
+import os
+import threading
+import time
+
+ENV_METRICS = 'SOUNDSCAPE_METRICS'
+PREFIX = 'soundscape_'
+
+_enabled = os.environ.get(ENV_METRICS, '') not in ('', '0')
+_lock = threading.Lock()
+_timers = {}        # stage -> [calls, total seconds, max seconds]
+_counters = {}
+_gauges = {}
+
+
+def enabled():
+    return _enabled
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+
+def disable():
+    enable(False)
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+def record(stage, seconds):
+    with _lock:
+        t = _timers.get(stage)
+        if t is None:
+            _timers[stage] = [1, seconds, seconds]
+        else:
+            t[0] += 1
+            t[1] += seconds
+            if seconds > t[2]:
+                t[2] = seconds
+
+
+def count(name, n=1):
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def gauge(name, value):
+    if _enabled:
+        _gauges[name] = value
+
+
+def timed(stage):
+    """Decorator: time every call of the function as stage, while enabled."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(stage, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+class _Timer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.start)
+
+
+class _Off:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_OFF = _Off()
+
+
+def timer(stage):
+    """Context manager timing its block as stage, while enabled."""
+    return _Timer(stage) if _enabled else _OFF
+
+
+def stats():
+    """Everything recorded so far: timers (calls, total_s, mean_ms, max_ms), counters, gauges."""
+    with _lock:
+        timers = {stage: {'calls': n, 'total_s': total, 'mean_ms': total / n * 1000, 'max_ms': peak * 1000}
+                  for stage, (n, total, peak) in sorted(_timers.items())}
+        counters, gauges = dict(sorted(_counters.items())), dict(sorted(_gauges.items()))
+    if counters.get('tokens'):
+        gauges['lexicon_hit_rate'] = counters.get('lexicon_hits', 0) / counters['tokens']
+    return {'enabled': _enabled, 'timers': timers, 'counters': counters, 'gauges': gauges}
+
+
+def to_json(**kwargs):
+    return json.dumps(stats(), **kwargs)
+
+
+def to_prometheus():
+    """stats() in Prometheus' text exposition format."""
+    s = stats()
+    lines = []
+    if s['timers']:
+        name = PREFIX + 'stage_seconds'
+        lines += [f'# HELP {name} Time spent per stage.', f'# TYPE {name} summary']
+        for stage, t in s['timers'].items():
+            lines += [f'{name}_count{{stage="{stage}"}} {t["calls"]}',
+                      f'{name}_sum{{stage="{stage}"}} {t["total_s"]!r}']
+        lines += [f'# HELP {name}_max Longest single call per stage.', f'# TYPE {name}_max gauge']
+        lines += [f'{name}_max{{stage="{stage}"}} {t["max_ms"] / 1000!r}' for stage, t in s['timers'].items()]
+    for counter, value in s['counters'].items():
+        lines += [f'# TYPE {PREFIX}{counter}_total counter', f'{PREFIX}{counter}_total {value}']
+    for g, value in s['gauges'].items():
+        lines += [f'# TYPE {PREFIX}{g} gauge', f'{PREFIX}{g} {value!r}']
+    return '\n'.join(lines) + '\n'
+
+
+def report():
+    """stats() as lines of text, for a console."""
+    s = stats()
+    if not s['enabled'] and not s['timers']:
+        return f"instrumentation is off (set {ENV_METRICS}=1 or call metrics.enable())"
+    lines = [f"{stage:<28} {t['calls']:>7} calls {t['mean_ms']:>9.3f} ms mean {t['max_ms']:>9.3f} ms max"
+             for stage, t in s['timers'].items()]
+    lines += [f"{name:<28} {value:>7}" for name, value in s['counters'].items()]
+    lines += [f"{name:<28} {value:>7.3f}" if isinstance(value, float) else f"{name:<28} {value:>7}"
+              for name, value in s['gauges'].items()]
+    return '\n'.join(lines)
+
+
+def take():
+    """This process's raw numbers, cleared here (a worker hands them to its parent, see merge)."""
+    with _lock:
+        data = {'timers': dict(_timers), 'counters': dict(_counters), 'gauges': dict(_gauges)}
+        _timers.clear()
+        _counters.clear()
+        _gauges.clear()
+    return data
+
+
+def merge(data):
+    """Add numbers from take() in another process to this one's."""
+    with _lock:
+        for stage, (n, total, peak) in data['timers'].items():
+            t = _timers.setdefault(stage, [0, 0.0, 0.0])
+            t[0] += n
+            t[1] += total
+            t[2] = max(t[2], peak)
+        for name, value in data['counters'].items():
+            _counters[name] = _counters.get(name, 0) + value
+        _gauges.update(data['gauges'])
@@ -0,0 +1,139 @@
+# greedy longest-match matcher for the multi-word NRC-VAD terms ("a bit", "can't wait", ...)
+# the trie is stored level by level as sorted (parent node, word id) keys, so all text
+# positions walk it together with searchsorted: cost is O(len(text) * max phrase length).
+
+import numpy as np
+
+
+class PhraseTrie:
+    """Trie over the word ids of the lexicon's multi-word terms.
+
+    Phrase words that are lexicon terms themselves keep their term id; the
+    others get ids past the end of the lexicon (see `extra`).
+    """
+
+    def __init__(self, terms, index):
+        n_terms = len(terms)
+        self.extra = {}
+        edges = {}            # (depth, parent node, word id) -> child node
+        terminal = [-1]       # node -> term id; node 0 is the root
+        for tid, term in enumerate(terms):
+            words = term.split()
+            if len(words) < 2:
+                continue
+            node = 0
+            for depth, w in enumerate(words):
+                wid = index.get(w)
+                if wid is None:
+                    wid = self.extra.setdefault(w, n_terms + len(self.extra))
+                key = (depth, node, wid)
+                if key not in edges:
+                    edges[key] = len(terminal)
+                    terminal.append(-1)
+                node = edges[key]
+            terminal[node] = tid
+
+        self.vocab_size = n_terms + len(self.extra)
+        self.max_len = max((k[0] + 1 for k in edges), default=0)
+        self.terminal = np.array(terminal, dtype=np.int64)
+        self.levels = []
+        for depth in range(self.max_len):
+            level = sorted((parent * self.vocab_size + wid, child)
+                           for (d, parent, wid), child in edges.items() if d == depth)
+            keys = np.array([k for k, _ in level], dtype=np.int64)
+            children = np.array([c for _, c in level], dtype=np.int64)
+            self.levels.append((keys, children))
+        # the root level is indexed directly: first word id -> node (0 = no phrase)
+        self.first = np.zeros(self.vocab_size + 1, dtype=np.int64)
+        if self.levels:
+            self.first[self.levels[0][0]] = self.levels[0][1]
+
+    @classmethod
+    def from_arrays(cls, arrays, n_terms):
+        """The trie arrays() stored (e.g. memory-mapped from a lexicon artifact), without rebuilding it."""
+        self = cls.__new__(cls)
+        self.extra = {w: n_terms + k for k, w in enumerate(arrays['phrase_extra'].tolist())}
+        self.vocab_size = n_terms + len(self.extra)
+        self.terminal = arrays['phrase_terminal']
+        self.first = arrays['phrase_first']
+        self.levels = []
+        while f'phrase_keys_{len(self.levels)}' in arrays:
+            depth = len(self.levels)
+            self.levels.append((arrays[f'phrase_keys_{depth}'], arrays[f'phrase_children_{depth}']))
+        self.max_len = len(self.levels)
+        return self
+
+    def arrays(self):
+        """Everything the trie is, as named arrays (see from_arrays)."""
+        extra = sorted(self.extra, key=self.extra.get)
+        out = {'phrase_extra': np.array(extra, dtype=str if extra else '<U1'),
+               'phrase_terminal': self.terminal, 'phrase_first': self.first}
+        for depth, (keys, children) in enumerate(self.levels):
+            out[f'phrase_keys_{depth}'] = keys
+            out[f'phrase_children_{depth}'] = children
+        return out
+
+    def __len__(self):
+        return int((self.terminal >= 0).sum())
+
+    def longest(self, ids, breaks=None):
+        """Length and term id of the longest phrase starting at every position (0/-1 if none).
+
+        breaks[i] is True where a phrase may not run on into token i (clause starts).
+        """
+        n = len(ids)
+        length = np.zeros(n, dtype=np.int64)
+        term = np.full(n, -1, dtype=np.int64)
+        if not self.levels:
+            return length, term
+        node = self.first[ids]                   # -1 ids land on the spare last slot
+        pos = np.flatnonzero(node)
+        node = node[pos]
+        for depth in range(1, self.max_len):
+            keys, children = self.levels[depth]
+            at = pos + depth
+            ok = at < n
+            ok[ok] = ids[at[ok]] >= 0
+            if breaks is not None:
+                ok[ok] = ~breaks[at[ok]]
+            pos, node, at = pos[ok], node[ok], at[ok]
+            key = node * self.vocab_size + ids[at]
+            j = np.minimum(np.searchsorted(keys, key), len(keys) - 1)
+            found = keys[j] == key
+            pos, node = pos[found], children[j[found]]
+            if not len(pos):
+                break
+            t = self.terminal[node]
+            done = t >= 0
+            length[pos[done]] = depth + 1
+            term[pos[done]] = t[done]
+        return length, term
+
+    def match(self, ids, breaks=None):
+        """Greedy left-to-right longest match.
+
+        Returns (ids, keep): ids with each matched phrase's term id on its first
+        token, and a mask that drops the phrase's remaining tokens.
+        """
+        length, term = self.longest(ids, breaks)
+        starts = np.flatnonzero(length)
+        ends = starts + length[starts]
+        # a start that no earlier candidate reaches is always taken; only the
+        # rare overlapping clusters need the sequential greedy pass
+        reach = np.maximum.accumulate(np.concatenate(([0], ends[:-1])))
+        taken = np.zeros(len(ids), dtype=bool)
+        taken[starts[starts >= reach]] = True
+        for i in starts[starts < reach].tolist():
+            lo = max(0, i - self.max_len + 1)
+            if not any(taken[j] and j + length[j] > i for j in range(lo, i)):
+                taken[i] = True
+
+        out = ids.copy()
+        first = np.flatnonzero(taken)
+        out[first] = term[first]
+        # drop the remaining tokens of every taken phrase
+        cover = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.add.at(cover, first + 1, 1)
+        np.add.at(cover, first + length[first], -1)
+        keep = np.cumsum(cover[:-1]) == 0
+        return out, keep
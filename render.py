@@ -0,0 +1,89 @@
+# offline rendering of the soundscape to a WAV/FLAC file, as fast as the CPU allows
+#   python render.py story.txt -o story.wav --duration 600 --seed 1
+#   python render.py features.json -o story.flac      # precomputed analyze_text features
+#   python render.py story.txt -o story.wav --cache features.sqlite   # analyse once, re-render freely
+# no sound card needed: .wav files are rendered by the NumPy engine (synth.py), other
+# formats (or --engine pyo) by pyo's offline server, without real-time pacing.
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import feature_cache
+from audio_backend import PyoBackend, render_soundscape
+from mapping import soundscape_params
+from soundscape import Soundscape, text_score
+from synth import write_wav
+
+# libsndfile formats by file extension
+FORMATS = {'.wav': 0, '.aif': 1, '.aiff': 1, '.flac': 5}
+ENGINES = ('numpy', 'pyo')
+
+
+def render(source, path, duration=60.0, seed=None, sr=44100, engine=None, cache=None):
+    """Render duration seconds of the soundscape for source to path.
+
+    source is a text, or a dict of analyze_text features (then the soundscape is
+    static, with no windows). The same seed gives the same file. engine defaults
+    to 'numpy' for .wav and 'pyo' otherwise. A FeatureCache, if given, supplies
+    (and keeps) the text's analyze_text features. Returns the render speed as a
+    multiple of real time.
+    """
+    ext = Path(path).suffix.lower()
+    if ext not in FORMATS:
+        raise ValueError(f"unsupported output format {ext!r}, use one of {sorted(FORMATS)}")
+    engine = engine or ('numpy' if ext == '.wav' else 'pyo')
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}, not {engine!r}")
+    if engine == 'numpy' and ext != '.wav':
+        raise ValueError("the numpy engine writes .wav only, use engine='pyo'")
+    if isinstance(source, str):
+        params, windows = text_score(source, cache.analyze(source) if cache is not None else None)
+    else:
+        params, windows = soundscape_params(source), None
+
+    start = time.perf_counter()
+    if engine == 'numpy':
+        write_wav(path, render_soundscape(params, windows, duration, seed, sr), sr)
+        return duration / (time.perf_counter() - start)
+
+    backend = PyoBackend(sr=sr, audio='offline', verbosity=1)
+    try:
+        backend.boot().recordOptions(dur=duration, filename=str(path), fileformat=FORMATS[ext],
+                                     sampletype=0)
+        scape = Soundscape(params, windows, seed=seed).start(backend)
+        backend.wait()      # returns once the whole file is written
+        scape.stop()
+    finally:
+        backend.shutdown()
+    elapsed = time.perf_counter() - start
+
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        raise RuntimeError(f"pyo could not write {path} (its libsndfile may lack {ext} support)")
+    return duration / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a text's soundscape to an audio file.")
+    parser.add_argument('source', help="text file, or a .json file of analyze_text features")
+    parser.add_argument('-o', '--output', required=True, help="output .wav, .aif or .flac file")
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds of audio (default: 60)")
+    parser.add_argument('--seed', type=int, default=None, help="seed for a reproducible melody")
+    parser.add_argument('--sr', type=int, default=44100, help="sample rate (default: 44100)")
+    parser.add_argument('--engine', choices=ENGINES,
+                        help="synthesis engine (default: numpy for .wav, else pyo)")
+    parser.add_argument('--cache', default=os.environ.get(feature_cache.ENV_CACHE),
+                        help="SQLite feature cache for the text's analysis (default: $SOUNDSCAPE_CACHE)")
+    args = parser.parse_args(argv)
+    cache = feature_cache.FeatureCache(args.cache) if args.cache else None
+
+    with open(args.source, encoding='utf-8') as f:
+        source = json.load(f) if args.source.endswith('.json') else f.read()
+    speed = render(source, args.output, args.duration, args.seed, args.sr, args.engine, cache)
+    print(f"rendered {args.duration:.1f} s to {args.output} at {speed:.0f}x real time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# the soundscape's note and chord events, computed ahead at sample-accurate onsets
+#   schedule = Schedule(Soundscape(params, windows, seed=1), sr=44100)
+#   schedule.until(44100)       # every event of the first second, as ScheduledEvents
+#   backend.play(schedule)      # what Soundscape.start does
+# onsets are running sums of whole-sample intervals drawn from the soundscape's seeded RNG,
+# BATCH notes at a time, so the melody no longer depends on when a Python callback gets to
+# run: the same seed gives the same onsets however busy the process is. the offline and null
+# backends play each event at its sample; pyo rounds to its 256-sample blocks.
+
+import collections
+
+import metrics
+
+BATCH = 64          # notes computed per batch
+
+ScheduledEvent = collections.namedtuple('ScheduledEvent', 'sample kind args')   # kind: 'chord' or 'note'
+
+
+class Schedule:
+    """The events of a Soundscape's melody in onset order.
+
+    'chord' events (freqs, amp) come whenever the chord or its volume changes;
+    'note' events carry note_on's arguments (freq, amp, attack, decay, sustain,
+    release, dur). Onsets are rounded to multiples of quantum samples (1:
+    sample-accurate; BLOCK reproduces where pyo plays them).
+    """
+
+    def __init__(self, scape, sr=44100, batch=BATCH, quantum=1):
+        self.scape = scape
+        self.sr, self.batch, self.quantum = sr, batch, quantum
+        self.events = collections.deque()
+        self.onset = 0              # unrounded sample of the next note
+        self.batches = 0
+        self._chord = None
+
+    @metrics.timed('schedule')
+    def _compute(self):
+        scape, p, q = self.scape, self.scape.params, self.quantum
+        envelope = tuple(float(p[k]) for k in ('attack', 'decay', 'sustain', 'release', 'duration'))
+        for _ in range(self.batch):
+            freq, interval = scape.next_note()
+            sample = round(self.onset / q) * q
+            chord = ([float(f) for f in scape.chord], float(scape.chord_vol))
+            if chord != self._chord:
+                self.events.append(ScheduledEvent(sample, 'chord', chord))
+                self._chord = chord
+            self.events.append(ScheduledEvent(sample, 'note', (float(freq), float(scape.note_vol)) + envelope))
+            self.onset += round(interval * self.sr)
+        self.batches += 1
+        metrics.count('notes_scheduled', self.batch)
+
+    def peek(self):
+        """The sample of the next event."""
+        if not self.events:
+            self._compute()
+        return self.events[0].sample
+
+    def until(self, sample):
+        """Remove and return the events before sample."""
+        due = []
+        while self.peek() < sample:
+            due.append(self.events.popleft())
+        return due
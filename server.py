@@ -0,0 +1,494 @@
+# local HTTP/WebSocket service for analysis and rendering, on asyncio (standard library only)
+#   python server.py --port 8765 --workers 4 [--cache features.sqlite]
+#   curl -d 'I love sunny days' localhost:8765/analyze            # analyze_text features, JSON
+#   curl --data-binary @story.txt 'localhost:8765/render?duration=30&seed=1' -o story.wav
+#   curl localhost:8765/metrics [?format=json]     # with --metrics: stage timings, Prometheus text
+#   ws://localhost:8765/stream, send {"text": ..., "mode": "features"} for feature snapshots as
+#     the text is read, or {"text": ..., "mode": "audio", "seconds": 30} for 16-bit stereo PCM
+#     chunks (binary frames) plus a JSON message whenever the soundscape moves to a new window
+# analysis runs in a process pool, in batches of up to --batch texts gathered for --batch-ms.
+# at most --max-inflight requests are served at once; past that the answer is 503 (Retry-After),
+# and a slow WebSocket reader holds its stream back rather than piling up frames.
+
+import argparse
+import asyncio
+import base64
+import concurrent.futures
+import hashlib
+import io
+import json
+import os
+import signal
+import sys
+import urllib.parse
+
+import numpy as np
+
+import feature_cache
+import metrics
+from corpus import analyze_chunk, init_worker, lookup_cached, merge_cached, pool_context
+from incremental import IncrementalAnalyzer
+from session import Session
+from six_dimensions import lexicon, load_vad_lexicon
+from soundscape import text_score
+from audio_backend import render_soundscape
+from synth import write_wav
+
+BATCH = 16              # texts per analysis batch
+BATCH_WAIT = 0.005      # seconds to wait for a batch to fill
+MAX_INFLIGHT = 64       # requests served at once
+MAX_BODY = 10 * 2**20   # bytes
+MAX_DURATION = 600.0    # seconds of rendered audio
+STREAM_WORDS = 100      # words per feature update
+STREAM_CHUNK = 0.25     # seconds of audio per PCM frame
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or REASONS[status])
+        self.status = status
+
+
+class WebSocketError(Exception):
+    """Past the handshake: the connection is closed with code (1009: message too big)."""
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+#1. analysis and rendering in the worker processes ─────────────────────────────────────────────────
+def _render_wav(text, features, duration, seed, sr):
+    params, windows = text_score(text, features)
+    out = io.BytesIO()
+    write_wav(out, render_soundscape(params, windows, duration, seed, sr), sr)
+    return out.getvalue()
+
+
+def _measured(fn, *args):
+    # fn(*args) in a worker, with the metrics it recorded there (merged into the server's by _pool)
+    was = metrics.enabled()
+    metrics.enable()
+    try:
+        return fn(*args), metrics.take()
+    finally:
+        metrics.enable(was)
+
+
+async def _pool(executor, fn, *args):
+    loop = asyncio.get_running_loop()
+    if not metrics.enabled():
+        return await loop.run_in_executor(executor, fn, *args)
+    result, measured = await loop.run_in_executor(executor, _measured, fn, *args)
+    metrics.merge(measured)
+    return result
+
+
+class Batcher:
+    """Gathers analyze_text requests into batches for the process pool.
+
+    A batch is taken once a worker is free, so waiting texts pile up here (and
+    are answered together) rather than in the pool; with a FeatureCache only
+    the texts it lacks are analysed.
+    """
+
+    def __init__(self, executor, workers, batch=BATCH, wait=BATCH_WAIT, cache=None):
+        self.executor, self.workers = executor, workers
+        self.batch, self.wait, self.cache = batch, wait, cache
+        self.queue = asyncio.Queue()
+        self.batches = self.texts = 0
+        self._task = None
+
+    async def analyze(self, text):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((text, future))
+        return await future
+
+    async def _run(self):
+        slots = asyncio.Semaphore(self.workers)
+        while True:
+            await slots.acquire()
+            items = [await self.queue.get()]
+            if self.wait and self.queue.qsize() < self.batch - 1:
+                await asyncio.sleep(self.wait)
+            while len(items) < self.batch and not self.queue.empty():
+                items.append(self.queue.get_nowait())
+            asyncio.create_task(self._analyze_batch(items, slots))
+
+    async def _analyze_batch(self, items, slots):
+        loop = asyncio.get_running_loop()
+        texts = [text for text, _ in items]
+        try:
+            if self.cache is None:
+                found, todo = [None] * len(texts), texts
+            else:               # SQLite lookups off the event loop
+                found, todo = await loop.run_in_executor(None, lookup_cached, texts, self.cache)
+            results = await _pool(self.executor, analyze_chunk, todo) if todo else []
+            if self.cache is not None:
+                results = await loop.run_in_executor(None, merge_cached, found, todo, results, self.cache)
+            for (_, future), features in zip(items, results):
+                if not future.done():
+                    future.set_result({k: float(v) for k, v in features.items()})
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.batches += 1
+            self.texts += len(items)
+            slots.release()
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+#2. HTTP and WebSocket framing ────────────────────────────────────────────────────────────────
+async def read_request(reader):
+    """(method, path, query, headers, body) of the next request, or None when the client is done."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HTTPError(400, "Content-Length must be a non-negative integer")
+    if length > MAX_BODY:
+        raise HTTPError(413)
+    body = await reader.readexactly(length) if length else b''
+    url = urllib.parse.urlsplit(target)
+    return method, url.path, dict(urllib.parse.parse_qsl(url.query)), headers, body
+
+
+def response(status, body=b'', content_type='application/json', keep_alive=True, headers=()):
+    head = [f'HTTP/1.1 {status} {REASONS[status]}', f'Content-Type: {content_type}',
+            f'Content-Length: {len(body)}', 'Connection: ' + ('keep-alive' if keep_alive else 'close')]
+    head += [f'{name}: {value}' for name, value in headers]
+    return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+
+def json_response(status, obj, **kwargs):
+    return response(status, json.dumps(obj).encode(), **kwargs)
+
+
+def ws_accept(key):
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def ws_frame(opcode, payload=b'', mask=None):
+    """A final WebSocket frame; clients must mask theirs (mask: 4 bytes)."""
+    n = len(payload)
+    head = bytes([0x80 | opcode])
+    bit = 0x80 if mask else 0
+    if n < 126:
+        head += bytes([bit | n])
+    elif n < 2**16:
+        head += bytes([bit | 126]) + n.to_bytes(2, 'big')
+    else:
+        head += bytes([bit | 127]) + n.to_bytes(8, 'big')
+    if mask:
+        return head + mask + _unmask(payload, mask)
+    return head + payload
+
+
+def _unmask(data, mask):
+    n = len(data)
+    key = (mask * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, 'big') ^ int.from_bytes(key, 'big')).to_bytes(n, 'big')
+
+
+async def ws_read(reader, writer):
+    """The next (opcode, payload) message, answering pings; (8, b'') once the peer closes.
+
+    A message over MAX_BODY, in one frame or many, raises WebSocketError (1009).
+    """
+    message, first = b'', None
+    while True:
+        b1, b2 = await reader.readexactly(2)
+        opcode, n = b1 & 0x0F, b2 & 0x7F
+        if n == 126:
+            n = int.from_bytes(await reader.readexactly(2), 'big')
+        elif n == 127:
+            n = int.from_bytes(await reader.readexactly(8), 'big')
+        if len(message) + n > MAX_BODY:         # the message so far, over all its frames
+            raise WebSocketError(1009, f"messages are limited to {MAX_BODY} bytes")
+        mask = await reader.readexactly(4) if b2 & 0x80 else None
+        data = await reader.readexactly(n)
+        if mask:
+            data = _unmask(data, mask)
+        if opcode == 9:                         # ping
+            writer.write(ws_frame(10, data))
+            continue
+        if opcode == 10:
+            continue
+        if opcode == 8:
+            return 8, data
+        message += data
+        first = opcode if first is None else first
+        if b1 & 0x80:
+            return first, message
+
+
+#3. the server ──────────────────────────────────────────────────────────────────────────────────
+class SoundscapeServer:
+    """The service: /analyze, /render, /stream (WebSocket), /health and /metrics.
+
+    workers processes analyse and render; at most max_inflight requests (and
+    streams) are served at once, later ones get 503 until one finishes.
+    """
+
+    def __init__(self, workers=None, batch=BATCH, batch_wait=BATCH_WAIT, max_inflight=MAX_INFLIGHT,
+                 cache=None, vad_path=lexicon, phrases=False, sr=44100):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_inflight = max_inflight
+        self.vad_path, self.phrases, self.sr = vad_path, phrases, sr
+        self.cache = cache
+        load_vad_lexicon(vad_path)              # forked workers inherit it
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            self.workers, mp_context=pool_context(), initializer=init_worker, initargs=(vad_path, phrases))
+        self.batcher = Batcher(self.executor, self.workers, batch, batch_wait, cache)
+        self.inflight = 0
+        self.requests = self.rejected = self.errors = 0
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=8765):
+        self.server = await asyncio.start_server(self._connection, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        self.batcher.close()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(cancel_futures=True)
+
+    def health(self):
+        return {'status': 'ok', 'workers': self.workers, 'inflight': self.inflight,
+                'max_inflight': self.max_inflight, 'requests': self.requests, 'rejected': self.rejected,
+                'errors': self.errors, 'queued': self.batcher.queue.qsize(), 'batches': self.batcher.batches,
+                'batch_mean': self.batcher.texts / self.batcher.batches if self.batcher.batches else 0.0}
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    writer.write(json_response(e.status, {'error': str(e)}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                if path == '/stream' and headers.get('upgrade', '').lower() == 'websocket':
+                    writer.write(await self._admit(False, self._stream, reader, writer, headers))
+                    await writer.drain()
+                    break
+                with metrics.timer('request'):
+                    writer.write(await self._admit(keep_alive, self._route, method, path, query, headers, body,
+                                                   keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _admit(self, keep_alive, handler, *args):
+        """handler(*args) within the in-flight bound; its response, or an error response."""
+        self.requests += 1
+        if self.inflight >= self.max_inflight:
+            self.rejected += 1
+            return json_response(503, {'error': 'too many requests in flight'}, keep_alive=keep_alive,
+                                 headers=[('Retry-After', '1')])
+        self.inflight += 1
+        try:
+            return await handler(*args)
+        except HTTPError as e:
+            return json_response(e.status, {'error': str(e)}, keep_alive=keep_alive)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+        except Exception as e:
+            self.errors += 1
+            return json_response(500, {'error': repr(e)}, keep_alive=keep_alive)
+        finally:
+            self.inflight -= 1
+
+    async def _route(self, method, path, query, headers, body, keep_alive):
+        if path == '/health':
+            return json_response(200, self.health(), keep_alive=keep_alive)
+        if path == '/metrics':
+            if query.get('format') == 'json':
+                return response(200, metrics.to_json().encode(), keep_alive=keep_alive)
+            return response(200, metrics.to_prometheus().encode(), 'text/plain; version=0.0.4', keep_alive)
+        if path not in ('/analyze', '/render'):
+            raise HTTPError(404)
+        if method != 'POST':
+            raise HTTPError(405)
+        text = _text(body, headers)
+        if path == '/render':
+            # checked before the analysis, so a bad request costs nothing
+            try:
+                duration = float(query.get('duration', 10.0))
+                seed = int(query['seed']) if 'seed' in query else None
+            except ValueError:
+                raise HTTPError(400, "duration must be a number and seed an integer")
+            if not 0 < duration <= MAX_DURATION:
+                raise HTTPError(400, f"duration must be in (0, {MAX_DURATION:g}] seconds")
+        features = await self.batcher.analyze(text)
+        if path == '/analyze':
+            return json_response(200, features, keep_alive=keep_alive)
+        wav = await _pool(self.executor, _render_wav, text, features, duration, seed, self.sr)
+        return response(200, wav, 'audio/wav', keep_alive)
+
+    async def _stream(self, reader, writer, headers):
+        if 'sec-websocket-key' not in headers:
+            raise HTTPError(400, "missing Sec-WebSocket-Key")
+        writer.write(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                      f'Sec-WebSocket-Accept: {ws_accept(headers["sec-websocket-key"])}\r\n\r\n').encode())
+        try:
+            opcode, data = await ws_read(reader, writer)
+        except WebSocketError as e:
+            writer.write(ws_frame(8, e.code.to_bytes(2, 'big') + str(e).encode()))
+            return b''
+        if opcode == 8:
+            return b''
+        try:
+            request = json.loads(data)
+            text = request['text']
+            mode = request.get('mode', 'features')
+            if mode not in ('features', 'audio'):
+                raise ValueError(f"mode must be 'features' or 'audio', not {mode!r}")
+            if mode == 'features':
+                await self._stream_features(writer, text, int(request.get('words', STREAM_WORDS)))
+            else:
+                seconds = float(request.get('seconds', 10.0))
+                if not 0 < seconds <= MAX_DURATION:
+                    raise ValueError(f"seconds must be in (0, {MAX_DURATION:g}]")
+                chunk = float(request.get('chunk', STREAM_CHUNK))
+                if not 0 < chunk <= MAX_DURATION or int(chunk * self.sr) < 1:
+                    raise ValueError(f"chunk must be at least one sample and at most {MAX_DURATION:g} seconds")
+                await self._stream_audio(writer, text, seconds, request.get('seed'), chunk)
+            await _send(writer, 1, json.dumps({'type': 'done'}).encode())
+            writer.write(ws_frame(8, (1000).to_bytes(2, 'big')))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+        except Exception as e:
+            # past the handshake errors are WebSocket messages: 1003 for a bad request, 1011 for ours
+            bad = isinstance(e, (KeyError, ValueError, TypeError))
+            if not bad:
+                self.errors += 1
+            writer.write(ws_frame(1, json.dumps({'type': 'error', 'error': str(e) if bad else repr(e)}).encode()))
+            writer.write(ws_frame(8, (1003 if bad else 1011).to_bytes(2, 'big')))
+        return b''
+
+    async def _stream_features(self, writer, text, words):
+        # the analyzer keeps state between pieces, so it runs on one thread rather than in the pool
+        loop = asyncio.get_running_loop()
+        analyzer = IncrementalAnalyzer(self.vad_path)
+        pieces, read = text.split(' '), 0
+        for i in range(0, len(pieces), words):
+            piece = ' '.join(pieces[i:i + words]) + (' ' if i + words < len(pieces) else '')
+            read += len(piece.split())
+            features = await loop.run_in_executor(None, _feed, analyzer, piece)
+            await _send(writer, 1, json.dumps({'type': 'features', 'words': read, 'features': features}).encode())
+
+    async def _stream_audio(self, writer, text, seconds, seed, chunk):
+        loop = asyncio.get_running_loop()
+        features = await self.batcher.analyze(text)
+        params, windows = await loop.run_in_executor(self.executor, text_score, text, features)
+        session = Session(self.sr)
+        stream = session.add(params=params, windows=windows, seed=seed)
+        await _send(writer, 1, json.dumps({'type': 'audio', 'sr': self.sr, 'channels': 2, 'format': 's16le',
+                                           'seconds': seconds, 'features': features}).encode())
+        window, total = None, int(round(seconds * self.sr))
+        while session.now < total:
+            n = min(int(chunk * self.sr), total - session.now)
+            audio = await loop.run_in_executor(None, session.render, n)
+            if stream.window != window:
+                window = stream.window
+                w = {k: np.asarray(windows[k][window]).tolist() for k in ('chord', 'chord_vol', 'note_vol', 'tempo')}
+                await _send(writer, 1, json.dumps({'type': 'window', 'index': int(window),
+                                                   'time': session.time - n / self.sr, **w}).encode())
+            pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype('<i2')
+            await _send(writer, 2, pcm.tobytes())
+
+
+def _feed(analyzer, piece):
+    analyzer.feed(piece)
+    return {k: float(v) for k, v in analyzer.snapshot().items()}
+
+
+async def _send(writer, opcode, payload):
+    # waits while the client is slow to read, so a stream never runs far ahead of it
+    writer.write(ws_frame(opcode, payload))
+    await writer.drain()
+
+
+def _text(body, headers):
+    try:
+        if headers.get('content-type', '').startswith('application/json'):
+            return json.loads(body)['text']
+        return body.decode('utf-8')
+    except (ValueError, KeyError, TypeError):
+        raise HTTPError(400, "send the text as the body, or as JSON {\"text\": ...}")
+
+
+async def serve(host, port, **options):
+    server = await SoundscapeServer(**options).start(host, port)
+    print(f"serving on http://{host}:{server.port} with {server.workers} workers", file=sys.stderr)
+    # stop cleanly on Ctrl-C or kill, so the worker processes go too
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve text analysis and soundscape rendering locally.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=None, help="analysis processes (default: one per CPU)")
+    parser.add_argument('--batch', type=int, default=BATCH, help=f"texts per batch (default: {BATCH})")
+    parser.add_argument('--batch-ms', type=float, default=BATCH_WAIT * 1000,
+                        help="milliseconds to wait for a batch to fill (default: 5)")
+    parser.add_argument('--max-inflight', type=int, default=MAX_INFLIGHT,
+                        help=f"requests served at once, later ones get 503 (default: {MAX_INFLIGHT})")
+    parser.add_argument('--phrases', action='store_true', help="match multi-word lexicon terms")
+    parser.add_argument('--cache', default=os.environ.get(feature_cache.ENV_CACHE),
+                        help="SQLite feature cache (default: $SOUNDSCAPE_CACHE)")
+    parser.add_argument('--metrics', action='store_true',
+                        help=f"record stage timings for /metrics (default: ${metrics.ENV_METRICS})")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+    cache = feature_cache.FeatureCache(args.cache, phrases=args.phrases) if args.cache else None
+    asyncio.run(serve(args.host, args.port, workers=args.workers, batch=args.batch,
+                      batch_wait=args.batch_ms / 1000, max_inflight=args.max_inflight,
+                      cache=cache, phrases=args.phrases))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# several soundscapes at once on one audio engine: one stream per text (per character, per
+# live feed), each with its own parameters, RNG, schedule and voice pool, all mixed to stereo
+# by one MixEngine (synth.py) with a gain and pan per stream
+#   session = Session()
+#   alice = session.add(text=alice_lines, pan=-0.5, seed=1)
+#   bob = session.add(params=params, windows=windows, gain=0.7, pan=0.5)
+#   session.run(60); write_wav('dialogue.wav', session.audio(), session.sr)
+#   session.stats()         # CPU per stream, as a fraction of real time
+# live, several texts share one pyo server instead: PyoBackend(server=shared, gain=.., pan=..) each.
+
+import time
+
+import numpy as np
+
+import metrics
+from audio_backend import pan_gains
+from soundscape import Soundscape, text_score
+from synth import BLOCK, VOICES, MixEngine
+
+
+class Stream:
+    """One text in a Session: its Soundscape, schedule and voice pool on the session's engine.
+
+    To the Soundscape it is the audio backend (play, stop). Its melody starts
+    where the session's clock was when it was added.
+    """
+
+    def __init__(self, session, name, params, windows=None, seed=None, gain=1.0, pan=0.0):
+        self.session, self.name = session, name
+        self.sr = session.sr
+        self.start = session.now
+        self.id = session.engine.add_stream(*pan_gains(gain, pan))
+        self.gain, self.pan = gain, pan
+        self.cpu = 0.0                  # seconds: its schedule plus its share of the mixing
+        self.notes = 0                  # notes started so far
+        self.schedule = None
+        self.scape = Soundscape(params, windows, seed=seed).start(self)
+
+    def play(self, schedule):
+        self.schedule = schedule
+
+    def stop(self):
+        self.session.remove(self)
+
+    def set_level(self, gain=None, pan=None):
+        self.gain = self.gain if gain is None else gain
+        self.pan = self.pan if pan is None else pan
+        self.session.engine.set_levels(self.id, *pan_gains(self.gain, self.pan))
+
+    @metrics.timed('dispatch')
+    def dispatch(self, until):
+        """Start the events of this stream before session sample until."""
+        engine = self.session.engine
+        start = time.thread_time()
+        for event in self.schedule.until(until - self.start):
+            if event.kind == 'note':
+                engine.note_on(*event.args, stream=self.id)
+                self.notes += 1
+            else:
+                engine.set_chord(*event.args, stream=self.id)
+        self.cpu += time.thread_time() - start
+
+    def next_event(self):
+        return self.start + self.schedule.peek()
+
+    @property
+    def window(self):
+        """The index of the window the stream is playing (None without windows or before the first note).
+
+        The Soundscape itself is ahead: its schedule is computed in batches.
+        """
+        scape = self.scape
+        if scape.windows is None or not self.notes:
+            return None
+        return (self.notes - 1) // scape.notes_per_window % len(scape.windows['tempo'])
+
+
+class Session:
+    """Streams mixed on one clock and one engine; add and remove them at any time.
+
+    Every event sounds at its sample. audio() is the mix run() kept, (frames, 2)
+    float32; render() returns the next samples without keeping them (live use).
+    """
+
+    def __init__(self, sr=44100, block=BLOCK, voices=VOICES):
+        self.sr, self.block = sr, block
+        self.engine = MixEngine(sr, voices)
+        self.streams = []
+        self.now = 0                    # samples mixed so far
+        self._chunks = []
+
+    @property
+    def time(self):
+        return self.now / self.sr
+
+    def add(self, text=None, params=None, windows=None, seed=None, gain=1.0, pan=0.0, name=None):
+        """A new stream for text (analysed here), or for params and windows already mapped."""
+        if text is not None:
+            params, windows = text_score(text)
+        stream = Stream(self, name or f'stream {len(self.streams) + 1}', params, windows, seed, gain, pan)
+        self.streams.append(stream)
+        return stream
+
+    def remove(self, stream):
+        if stream in self.streams:
+            self.streams.remove(stream)
+            self.engine.remove_stream(stream.id)
+
+    @metrics.timed('mix')
+    def render(self, n):
+        """Mix the next n samples of every stream, (n, 2) float32."""
+        out = np.zeros((n, 2), dtype=np.float32)
+        end = self.now + n
+        while self.now < end:
+            for stream in self.streams:
+                stream.dispatch(self.now + 1)
+            # render up to the next event of any stream
+            stop = min([end] + [s.next_event() for s in self.streams])
+            start = time.thread_time()
+            out[n - (end - self.now):n - (end - stop)] = self.engine.render(stop - self.now)
+            self._share(time.thread_time() - start)
+            self.now = stop
+        return out
+
+    def _share(self, cpu):
+        # the mixing time goes to the streams by the oscillators each had sounding
+        sounding = self.engine.sounding
+        total = sounding.sum()
+        if total:
+            for stream in self.streams:
+                stream.cpu += cpu * sounding[stream.id] / total
+
+    def run(self, seconds):
+        """Mix seconds more audio, block by block, and keep it for audio()."""
+        end = self.now + int(round(seconds * self.sr))
+        while self.now < end:
+            self._chunks.append(self.render(min(self.block, end - self.now)))
+
+    def audio(self):
+        return np.concatenate(self._chunks) if self._chunks else np.zeros((0, 2), dtype=np.float32)
+
+    def stats(self):
+        """Per stream: CPU seconds, CPU per second of audio (1.0 = a whole core), busy and stolen voices."""
+        pool = self.engine.pool
+        return [{'name': s.name, 'gain': s.gain, 'pan': s.pan, 'cpu_s': s.cpu,
+                 'load': s.cpu / max((self.now - s.start) / self.sr, 1e-9),
+                 'voices': int(self.engine.active[s.id * pool:(s.id + 1) * pool].sum()),
+                 'stolen': int(self.engine.stolen[s.id])}
+                for s in self.streams]
@@ -2,50 +2,38 @@
 # input text and get 
 # six dimensions: valence, arousal, dominance, subjectivity, variation (how much sentiment shifts across clauses), density (proportion of explicitly emotional words in the text)
 
-import csv
 from textblob import TextBlob
 import numpy as np
-from nrclex import NRCLex
 import re
+import bisect
+import metrics
+from clauses import _WS_TABLE, clause_bounds, clause_spans, code_points
+from vad_lexicon import DEFAULT_LEXICON, STRIP_CHARS, get_vad_lexicon
 
-lexicon = '/Users/elizabethli/Desktop/School/mus14/narrative-soundscapes/NRC-VAD-Lexicon-v2.1.csv'
+lexicon = DEFAULT_LEXICON
 input = "This course will focus on practices of embodiment, listening, and sensing vibration. Our own bodies and voices, individual and collective, will be our primary sites of research and learning. The sonic practices we will do together are rooted in non-western, primarily South Asian traditions and philosophies of the voice and body, which, with my guidance, we will bring into a contemporary, living, and experimental shared space of inquiry and possibility."
 
+@metrics.timed('load_vad_lexicon')
 def load_vad_lexicon(filepath=lexicon):
-    vad = {}
-    with open(filepath, encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            term = row['term'].lower()
-            vad[term] = {
-                'valence': float(row['valence']),
-                'arousal': float(row['arousal']),
-                'dominance': float(row['dominance'])
-            }
-    return vad
+    # shared, cached store (see vad_lexicon.py) instead of re-parsing the CSV on every call
+    return get_vad_lexicon(filepath)
 
 # 2. Compute mean VAD for a text
-def compute_vad(text, vad_lex):
-    tokens = [w.strip('.,!?;:').lower() for w in text.split()]
-    vs, ars, doms = [], [], []
-    for t in tokens:
-        if t in vad_lex:
-            vs.append(vad_lex[t]['valence'])
-            ars.append(vad_lex[t]['arousal'])
-            doms.append(vad_lex[t]['dominance'])
-    return {
-        'valence': np.mean(vs) if vs else 0.0,
-        'arousal': np.mean(ars) if ars else 0.0,
-        'dominance': np.mean(doms) if doms else 0.0
-    }
+@metrics.timed('compute_vad')
+def compute_vad(text, vad_lex=None, phrases=False):
+    if vad_lex is None:
+        vad_lex = load_vad_lexicon()
+    return scan_text(text, vad_lex, phrases).vad()
 
 # 3. Subjectivity (TextBlob; polarity, subjectivity)
+@metrics.timed('compute_subjectivity')
 def compute_subjectivity(text):
     return TextBlob(text).sentiment.subjectivity
 
 
 # 5. Sentiment variation across sentences
-#all the ways to split sentences into clauses
+#all the ways to split sentences into clauses (the reference: clause_spans in clauses.py
+#finds the same matches in linear time, and is what split_clauses and scan_text use)
 CL_SPLIT = re.compile(
     r"""
     (?:[.?!]\s+)             |  # sentence end
@@ -59,31 +47,193 @@ CL_SPLIT = re.compile(
 
 def split_clauses(text: str) -> list[str]:
     """Split text into clauses based on punctuation and conjunctions."""
-    return [part.strip() for part in CL_SPLIT.split(text) if part.strip()]
+    starts, ends = clause_bounds(text)
+    return [text[a:b] for a, b in zip(starts.tolist(), ends.tolist())]
 
-def compute_sentiment_variation(text, vad_lex):
-    clauses = split_clauses(text)
-    clause_vals = []
-    for clause in clauses:
-        tokens = [w.strip('.,!?;:').lower() for w in clause.split()]
-        vals = [vad_lex[t]['valence'] for t in tokens if t in vad_lex]
-        clause_vals.append(np.mean(vals) if vals else 0.0)
-    return float(np.std(clause_vals)) if len(clause_vals) > 1 else 0.0
+# single tokenizer pass: whitespace-token ids for the VAD means, plus the same
+# tokens cut at CL_SPLIT matches and grouped per clause for the variation
+class TextScan:
+    """Token ids from one pass over a text.
+
+    word_ids: one lexicon id per whitespace token (-1 if not in the lexicon)
+    clause_ids: ids of the clause fragments, in text order
+    clause_starts: offset of each non-empty clause in clause_ids
+    clause_pieces: which CL_SPLIT piece each of those clauses is (0 .. n_pieces - 1)
+    word_offsets, clause_offsets: character offset of every word_ids entry and of
+        the first fragment of every clause
+    """
+
+    def __init__(self, vad_lex, word_ids, clause_ids, clause_starts, clause_pieces, n_pieces,
+                 word_offsets=None, clause_offsets=None):
+        self.vad_lex = vad_lex
+        self.word_ids = word_ids
+        self.clause_ids = clause_ids
+        self.clause_starts = clause_starts
+        self.clause_pieces = clause_pieces
+        self.n_pieces = n_pieces
+        self.word_offsets = word_offsets
+        self.clause_offsets = clause_offsets
+
+    def vad(self):
+        ids = self.word_ids[self.word_ids >= 0]
+        if not len(ids):
+            return {'valence': 0.0, 'arousal': 0.0, 'dominance': 0.0}
+        vs, ars, doms = self.vad_lex.scores(ids)
+        return {
+            'valence': np.mean(vs),
+            'arousal': np.mean(ars),
+            'dominance': np.mean(doms)
+        }
+
+    def clause_sums(self):
+        """Valence sum and lexicon-hit count per clause."""
+        if not len(self.clause_starts):
+            return np.zeros(0), np.zeros(0, dtype=np.int64)
+        hit = self.clause_ids >= 0
+        vals = np.zeros(len(self.clause_ids))
+        vals[hit] = self.vad_lex.scores(self.clause_ids[hit])[0]
+        sums = np.add.reduceat(vals, self.clause_starts)
+        counts = np.add.reduceat(hit.astype(np.int64), self.clause_starts)
+        return sums, counts
+
+    def clause_valences(self):
+        """Mean valence per clause (0.0 for clauses without lexicon words)."""
+        sums, counts = self.clause_sums()
+        return np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+
+    def variation(self):
+        clause_vals = self.clause_valences()
+        return float(np.std(clause_vals)) if len(clause_vals) > 1 else 0.0
+
+
+_STRIP_CODES = np.array([ord(c) for c in STRIP_CHARS], dtype=np.uint32)
+
+def _token_spans(text):
+    """Code points of text plus start/end offsets of the tokens text.split() returns."""
+    codes = code_points(text)
+    solid = ~_WS_TABLE[np.minimum(codes, 0x3001)]
+    edges = np.diff(np.concatenate(([False], solid, [False])).view(np.int8))
+    return codes, np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def _fragments(text, cut_tokens, starts, ends, ms, me):
+    """Pieces of the tokens that overlap a CL_SPLIT match, as (offset, word) pairs.
+
+    CL_SPLIT.split() cuts these tokens (e.g. "rock-and-roll", "well-" before a
+    dash match), so their clause fragments differ from the whitespace token.
+    """
+    ms, me = ms.tolist(), me.tolist()
+    out = []
+    for i in cut_tokens.tolist():
+        s, e = int(starts[i]), int(ends[i])
+        j = bisect.bisect_right(me, s)
+        a = s
+        while j < len(ms) and ms[j] < e:
+            if ms[j] > a:
+                out.append((a, text[a:ms[j]]))
+            a = max(a, me[j])
+            j += 1
+        if a < e:
+            out.append((a, text[a:e]))
+    return out
+
+def _match_phrases(trie, ids, piece, offsets, n_terms):
+    """Fold multi-word terms into single ids; phrases never cross a clause boundary."""
+    ids, keep = trie.match(ids, np.diff(piece, prepend=piece[:1]) != 0)
+    ids, piece, offsets = ids[keep], piece[keep], offsets[keep]
+    ids[ids >= n_terms] = -1            # phrase-only words carry no scores
+    return ids, piece, offsets
+
+@metrics.timed('scan_text')
+def scan_text(text, vad_lex, phrases=False):
+    """Tokenize text once into a TextScan (ids for compute_vad and compute_sentiment_variation).
+
+    With phrases=True, multi-word lexicon terms ("a bit", "can't wait") are matched
+    greedily, longest first, and count as one token.
+    """
+    trie = vad_lex.phrases if phrases else None
+    extra = trie.extra if phrases else None
+    words = text.split()
+    word_ids = vad_lex.lookup_words(words, extra)
+    codes, starts, ends = _token_spans(text)
+
+    ms, me = clause_spans(codes)
+    # clause (split piece) of every token: number of matches that end before it
+    piece = np.searchsorted(me, starts, side='right')
+    # tokens overlapping a match get cut into fragments
+    lo = np.searchsorted(ends, ms, side='right')
+    hi = np.searchsorted(starts, me, side='left')
+    depth = np.zeros(len(words) + 1, dtype=np.int64)
+    np.add.at(depth, lo, 1)
+    np.add.at(depth, hi, -1)
+    overlaps = np.cumsum(depth[:-1])
+    cut = overlaps > 0
+    keep = ~cut
+    # matches that touch exactly one token
+    one = np.flatnonzero(hi - lo == 1)
+    tok, m_start, m_end = lo[one], ms[one], me[one]
+    alone = overlaps[tok] == 1
+    # the common case, a single .,!?;: glued to the end of a word ("word." before
+    # a sentence-end match), leaves the normalised token and its id unchanged
+    trailing = tok[alone & np.isin(codes[m_start], _STRIP_CODES)
+                   & (ends[tok] - m_start == 1) & (starts[tok] < m_start)]
+    cut[trailing] = False
+    keep[trailing] = True
+    # a token entirely inside one match (a standalone conjunction) has no fragments
+    cut[tok[alone & (starts[tok] >= m_start) & (ends[tok] <= m_end)]] = False
+
+    frags = _fragments(text, np.flatnonzero(cut), starts, ends, ms, me)
+    frag_pos = np.array([a for a, _ in frags], dtype=np.int64)
+    frag_ids = vad_lex.lookup_words([w for _, w in frags], extra)
+
+    pos = np.concatenate((starts[keep], frag_pos))
+    order = np.argsort(pos, kind='stable')
+    pos = pos[order]
+    clause_ids = np.concatenate((word_ids[keep], frag_ids))[order]
+    clause_piece = np.searchsorted(me, pos, side='right')
+    if phrases:
+        word_ids, _, starts = _match_phrases(trie, word_ids, piece, starts, len(vad_lex))
+        clause_ids, clause_piece, pos = _match_phrases(trie, clause_ids, clause_piece, pos, len(vad_lex))
+    clause_starts = np.flatnonzero(np.diff(clause_piece, prepend=-1))
+    if metrics.enabled():
+        metrics.count('tokens', len(word_ids))
+        metrics.count('lexicon_hits', int((word_ids >= 0).sum()))
+    return TextScan(vad_lex, word_ids, clause_ids, clause_starts, clause_piece[clause_starts], len(ms) + 1,
+                    starts, pos[clause_starts])
+
+@metrics.timed('compute_sentiment_variation')
+def compute_sentiment_variation(text, vad_lex=None, phrases=False):
+    if vad_lex is None:
+        vad_lex = load_vad_lexicon()
+    return scan_text(text, vad_lex, phrases).variation()
 
 # 6. Emotional lexical density (LIWC-style count of emotion words)
-def compute_lexical_density(text):
-    emo = NRCLex(text)
-    total = len(text.split())
-    emo_count = sum(emo.raw_emotion_scores.values())
-    return emo_count / total if total else 0.0
+# NRCLex(text).raw_emotion_scores totals, counted with the emotion index over the
+# VAD term ids (see emotion_lexicon.py) instead of a new NRCLex object per call
+def count_emotion_words(text, vad_lex=None):
+    if vad_lex is None:
+        vad_lex = load_vad_lexicon()
+    return int(vad_lex.emotions.lookup_words(text.split()).sum())
+
+@metrics.timed('compute_lexical_density')
+def compute_lexical_density(text, vad_lex=None):
+    words = text.split()
+    if not words:
+        return 0.0
+    if vad_lex is None:
+        vad_lex = load_vad_lexicon()
+    return int(vad_lex.emotions.lookup_words(words).sum()) / len(words)
 
 # 7. Master analysis function
-def analyze_text(text, vad_path=lexicon):
+@metrics.timed('analyze_text')
+def analyze_text(text, vad_path=lexicon, phrases=False):
     vad_lex = load_vad_lexicon(vad_path)
-    features = compute_vad(text, vad_lex)           # Valence, Arousal, Dominance
+    scan = scan_text(text, vad_lex, phrases)        # one tokenizer pass for VAD + variation
+    with metrics.timer('compute_vad'):
+        features = scan.vad()                       # Valence, Arousal, Dominance
     features['subjectivity'] = compute_subjectivity(text)
-    features['variation'] = compute_sentiment_variation(text, vad_lex)
-    features['density'] = compute_lexical_density(text)
+    with metrics.timer('compute_sentiment_variation'):
+        features['variation'] = scan.variation()
+    features['density'] = compute_lexical_density(text, vad_lex)
 
     features = {k: float(v) for k, v in features.items()} #remove the "np.float" outputs
 
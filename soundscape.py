@@ -0,0 +1,88 @@
+# the chord-plus-melody soundscape, played on an audio backend (see audio_backend.py)
+#   params, windows = text_score(text)
+#   scape = Soundscape(params, windows, seed=1).start(get_backend())
+# the melody is computed ahead as a Schedule of sample-accurate events (scheduler.py)
+
+import random
+
+from mapping import INTERVAL_MAX, INTERVAL_MIN, TEMPO_JITTER, map_dominance, soundscape_params
+from scheduler import Schedule
+from six_dimensions import analyze_text
+from trajectory import analyze_windows
+
+# trajectory: the text is read in windows of words, each window sets chord, volumes and tempo
+WINDOW_WORDS, HOP_WORDS = 60, 20
+NOTES_PER_WINDOW = 8
+
+
+def text_score(text, features=None):
+    """Whole-text parameters plus per-window ones (chord, volumes, tempo) for a text.
+
+    features, if given, are the text's analyze_text() result (saves analysing it twice).
+    """
+    params = soundscape_params(features if features is not None else analyze_text(text))
+    windows = soundscape_params(analyze_windows(text, window=WINDOW_WORDS, hop=HOP_WORDS))
+    return params, windows
+
+
+class Soundscape:
+    """A sustained triad plus a melody of ADSR notes picked from it.
+
+    next_note() holds the melody logic; start() plays it, as a Schedule of
+    events computed ahead, on an audio backend (live pyo, an offline render or
+    the null backend of audio_backend.py).
+
+    params come from mapping.soundscape_params; with windows (the same mapping of
+    analyze_windows trajectories) the chord, volumes and tempo move on to the next
+    window every notes_per_window notes and loop at the end. A seed makes the
+    melody reproducible; jitter is the random change of each interval, as a
+    fraction of the tempo, kept within interval_range (the mapping's tempo range).
+    """
+
+    def __init__(self, params, windows=None, notes_per_window=NOTES_PER_WINDOW, seed=None,
+                 jitter=TEMPO_JITTER, interval_range=(INTERVAL_MIN, INTERVAL_MAX)):
+        self.params = params
+        self.windows = windows
+        self.notes_per_window = notes_per_window
+        self.jitter = jitter
+        self.interval_range = interval_range
+        self.rng = random.Random(seed)
+        self.chord = list(params['chord'])
+        self.chord_vol = params['chord_vol']
+        self.note_vol = params['note_vol']
+        self.tempo = params['tempo']
+        self.note_index = [0]
+        self.notes_played = 0
+        self.window = None          # index into windows, once the first note is played
+
+    def start(self, backend):
+        self.backend = backend
+        self.schedule = Schedule(self, backend.sr)
+        backend.play(self.schedule)
+        return self
+
+    def stop(self):
+        self.backend.stop()
+
+    def next_window(self):
+        w = self.windows
+        self.window = (self.notes_played // self.notes_per_window) % len(w['tempo'])
+        i = self.window
+        self.chord = [float(f) for f in w['chord'][i]]
+        self.chord_vol, self.note_vol, self.tempo = float(w['chord_vol'][i]), float(w['note_vol'][i]), float(w['tempo'][i])
+
+    def next_note(self):
+        """Advance the melody by one note: its frequency and the time until the next note."""
+        if self.windows is not None and self.notes_played % self.notes_per_window == 0:
+            self.next_window()
+        self.notes_played += 1
+
+        #pick the next note based on dominance
+        freq = map_dominance(self.params['dominance'], self.chord, self.note_index, self.rng)
+
+        # play the next note at a jittered tempo
+        next_interval = tempo = self.tempo
+        if self.jitter:
+            next_interval = tempo + self.rng.uniform(-self.jitter * tempo, self.jitter * tempo)
+            next_interval = max(self.interval_range[0], min(self.interval_range[1], next_interval))
+        return freq, next_interval
@@ -0,0 +1,145 @@
+# parameter sweeps: audition a text's soundscape over a grid of mapping settings
+#   python sweep.py story.txt --set interval_max=1,2,4 --set chord_vol_max=0.1,0.4 -o previews/
+#   python sweep.py story.txt --preset app --set root=220,261.63 --seconds 5 --workers 4
+#   previews = render_previews(text, {'interval_max': [1, 2, 4]}, seconds=5)   # from Python
+# the text is analysed once (and kept: in this process, and in the FeatureCache if one is
+# given), the whole grid is mapped in one vectorized pass of mapping.py, and the short
+# offline previews render in parallel. any DEFAULTS key (mapping.py) can be swept.
+
+import argparse
+import itertools
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+import feature_cache
+from analysis_worker import LRUCache, text_key
+from audio_backend import render_soundscape
+from corpus import pool_context
+from mapping import DEFAULTS, PRESETS, soundscape_params
+from six_dimensions import analyze_text
+from soundscape import HOP_WORDS, WINDOW_WORDS
+from synth import write_wav
+from trajectory import analyze_windows
+
+_ANALYSES = LRUCache(32)
+
+
+def analyze_once(text, cache=None):
+    """(features, trajectory) of text, analysed on the first call only."""
+    key = text_key(text)
+    result = _ANALYSES.get(key)
+    if result is None:
+        features = cache.analyze(text) if cache is not None else analyze_text(text)
+        result = features, analyze_windows(text, window=WINDOW_WORDS, hop=HOP_WORDS)
+        _ANALYSES.put(key, result)
+    return result
+
+
+def grid(axes):
+    """Every combination of the axes' values, as one flat array per axis ({} for a single point)."""
+    names = list(axes)
+    points = list(itertools.product(*(axes[k] for k in names)))
+    return {k: np.array([p[i] for p in points], dtype=float) for i, k in enumerate(names)}
+
+
+def sweep_params(features, trajectory, axes, base=DEFAULTS):
+    """(settings, params, windows) for every point of the grid, mapped in one pass.
+
+    axes maps settings keys to the values to try; the rest come from base.
+    """
+    points = grid(axes)
+    n = len(next(iter(points.values()))) if points else 1
+    whole = soundscape_params(features, dict(base, **points))
+    windows = soundscape_params(trajectory, dict(base, **{k: v[:, None] for k, v in points.items()}))
+    w = len(trajectory['valence'])
+    whole = {k: np.broadcast_to(v, (n, 3) if k == 'chord' else (n,)) for k, v in whole.items()}
+    windows = {k: np.broadcast_to(v, (n, w, 3) if k == 'chord' else (n, w)) for k, v in windows.items()}
+    out = []
+    for i in range(n):
+        settings = dict(base, **{k: float(v[i]) for k, v in points.items()})
+        params = {k: v[i].tolist() if k == 'chord' else float(v[i]) for k, v in whole.items()}
+        out.append((settings, params, {k: v[i] for k, v in windows.items()}))
+    return out
+
+
+def _preview(params, windows, seconds, seed, sr, interval_range):
+    return render_soundscape(params, windows, seconds, seed, sr, interval_range=interval_range)
+
+
+def render_previews(text, axes, seconds=5.0, seed=1, base=DEFAULTS, workers=None, sr=44100, cache=None):
+    """A short offline render for every point of the grid: [(settings, (frames, 2) audio)].
+
+    workers processes render at once (default: one per CPU); the same seed plays
+    the same melody at every point, so only the mapping differs.
+    """
+    features, trajectory = analyze_once(text, cache)
+    mapped = sweep_params(features, trajectory, axes, base)
+    jobs = [(params, windows, seconds, seed, sr, (s['interval_min'], s['interval_max']))
+            for s, params, windows in mapped]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers == 1:
+        audio = [_preview(*job) for job in jobs]
+    else:
+        with pool_context().Pool(workers) as pool:
+            audio = pool.starmap(_preview, jobs)
+    return [(settings, a) for (settings, _, _), a in zip(mapped, audio)]
+
+
+def preview_name(index, settings, axes):
+    return f"{index:03d}_" + "_".join(f"{k}={settings[k]:g}" for k in axes) + ".wav"
+
+
+def parse_axis(option):
+    key, _, values = option.partition('=')
+    if key not in DEFAULTS or key == 'signed':
+        raise argparse.ArgumentTypeError(f"{key!r} is not a mapping setting, use one of "
+                                         f"{sorted(k for k in DEFAULTS if k != 'signed')}")
+    try:
+        return key, [float(v) for v in values.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"values of {key} must be numbers, not {values!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render previews of a text's soundscape over a grid of mappings.")
+    parser.add_argument('text', help="a text file")
+    parser.add_argument('--set', dest='axes', type=parse_axis, action='append', default=[],
+                        metavar='KEY=V1,V2,...', help="a mapping setting and the values to try (repeatable)")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='main', help="settings not swept")
+    parser.add_argument('-o', '--output', default='previews', help="directory for the .wav files")
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache', default=os.environ.get(feature_cache.ENV_CACHE),
+                        help="SQLite feature cache (default: $SOUNDSCAPE_CACHE)")
+    args = parser.parse_args(argv)
+
+    text = Path(args.text).read_text(encoding='utf-8')
+    axes = dict(args.axes)
+    cache = feature_cache.FeatureCache(args.cache) if args.cache else None
+    start = time.perf_counter()
+    analyze_once(text, cache)
+    analysed = time.perf_counter()
+    previews = render_previews(text, axes, args.seconds, args.seed, PRESETS[args.preset], args.workers,
+                               cache=cache)
+    rendered = time.perf_counter()
+
+    out = Path(args.output)
+    out.mkdir(parents=True, exist_ok=True)
+    index = []
+    for i, (settings, audio) in enumerate(previews):
+        name = preview_name(i, settings, axes)
+        write_wav(out / name, audio)
+        index.append({'file': name, **{k: settings[k] for k in axes}})
+    (out / 'index.json').write_text(json.dumps({'preset': args.preset, 'seconds': args.seconds,
+                                                'seed': args.seed, 'previews': index}, indent=2))
+    print(f"{len(previews)} previews of {args.seconds:g} s in {out}/: analysis {analysed - start:.2f} s, "
+          f"mapping and rendering {rendered - analysed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
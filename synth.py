@@ -0,0 +1,253 @@
+# block-based NumPy synthesis of the soundscape (the voice model of soundscape.py):
+# the sustained triad plus a fixed-size pool of ADSR sine voices, computed as arrays
+# one audio block at a time. audio_backend.OfflineBackend drives it with the soundscape.
+#   engine = SynthEngine(); engine.set_chord([261.63, 329.63, 392.0], 0.1)
+#   engine.note_on(329.63, 0.5, 0.01, 0.1, 0.5, 0.5, 1.5); mono = engine.render(256)
+# MixEngine renders several streams (session.py) in the same arrays, to stereo:
+#   engine = MixEngine(); s = engine.add_stream(1.0, 0.5); engine.note_on(..., stream=s)
+
+import wave
+
+import numpy as np
+
+import metrics
+from voices import VoiceAllocator
+
+BLOCK = 256         # pyo's default buffer size
+VOICES = 32         # notes last at most 2.05 s and start at least 0.09 s apart: 23 at once
+
+
+def adsr(t, attack, decay, sustain, release, dur):
+    """Linear ADSR levels (pyo's Adsr with a duration) at times t seconds after the onset.
+
+    Parameters broadcast against t; the release starts at dur - release, the level
+    is 0 before the onset and from dur on.
+    """
+    def level(t):
+        # the attack ramp until it meets the decay ramp, which stops at the sustain level
+        return np.minimum(t / attack, 1 - (1 - sustain) * np.clip((t - attack) / decay, 0, 1))
+    release_start = dur - release
+    env = np.where(t < release_start, level(t), level(release_start) * (dur - t) / release)
+    return np.maximum(env, 0)
+
+
+def _envelope(attack, decay, sustain, release, dur):
+    """The ADSR envelope as 5 breakpoints: (times after the onset, levels)."""
+    release_start = max(dur - release, 0.0)
+    times = np.minimum([0.0, attack, attack + decay, release_start], release_start)
+    return np.append(times, dur), np.append(adsr(times, attack, decay, sustain, release, dur), 0.0)
+
+
+def _sines(phase, freq, sr, t):
+    """sin(phase + 2 pi freq t / sr), one row per oscillator.
+
+    Within a block the math is float32 (NumPy vectorizes it, float64 sin it does
+    not); the start phase stays float64, so there is no drift across blocks.
+    """
+    omega = (2 * np.pi * freq / sr).astype(np.float32)
+    return np.sin(phase.astype(np.float32)[:, None] + omega[:, None] * t)
+
+
+class SynthEngine:
+    """Chord oscillators plus a fixed pool of melody voices, rendered block by block.
+
+    The voice state is one array per field; a VoiceAllocator (voices.py) picks
+    the voice of each new note: a free one or, when all are busy, the oldest
+    (steal='age') or quietest (steal='amplitude') one.
+    """
+
+    def __init__(self, sr=44100, voices=VOICES, steal='age'):
+        self.sr = sr
+        self.clock = 0                                  # samples rendered so far
+        # sustained chord, phases carried across blocks (and frequency changes)
+        self.chord_freq = np.zeros(0)
+        self.chord_phase = np.zeros(0)
+        self.chord_amp = 0.0
+        # melody voice pool
+        self.active = np.zeros(voices, dtype=bool)
+        self.age = np.zeros(voices, dtype=np.int64)     # samples since the onset
+        self.freq = np.zeros(voices)
+        self.amp = np.zeros(voices)
+        self.dur = np.zeros(voices)
+        # envelope breakpoints (seconds after the onset) and their levels, (voices, 5)
+        self.env_times = np.zeros((voices, 5))
+        self.env_levels = np.zeros((voices, 5))
+        self.voices = VoiceAllocator(voices, steal, sr)
+
+    @property
+    def stolen(self):
+        """Notes that took a busy voice."""
+        return int(self.voices.stolen.sum())
+
+    @property
+    def nbytes(self):
+        """Bytes held by the voice state (the engine's arrays and the allocator's)."""
+        return self.voices.nbytes + sum(a.nbytes for a in (self.active, self.age, self.freq, self.amp, self.dur,
+                                                            self.env_times, self.env_levels))
+
+    def reclaim(self):
+        """Silence every voice and give it back (the stream or pattern stopped)."""
+        self.active[:] = False
+        return self.voices.reclaim(self.clock)
+
+    def set_chord(self, freqs, amp):
+        freqs = np.asarray(freqs, dtype=float)
+        if len(freqs) != len(self.chord_phase):
+            self.chord_phase = np.zeros(len(freqs))
+        self.chord_freq, self.chord_amp = freqs, amp
+
+    def note_on(self, freq, amp, attack, decay, sustain, release, dur):
+        return self._start(0, freq, amp, attack, decay, sustain, release, dur)
+
+    def _start(self, pool, freq, amp, attack, decay, sustain, release, dur):
+        v = self.voices.allocate(self.clock, amp, attack, decay, sustain, release, dur, pool)
+        self.active[v] = True
+        self.age[v] = 0
+        self.freq[v], self.amp[v], self.dur[v] = freq, amp, dur
+        self.env_times[v], self.env_levels[v] = _envelope(attack, decay, sustain, release, dur)
+        return v
+
+    def _chord_sines(self, n, t):
+        """The chord oscillators' next n samples, one row each."""
+        sines = _sines(self.chord_phase, self.chord_freq, self.sr, t)
+        self.chord_phase = (self.chord_phase + 2 * np.pi * self.chord_freq * n / self.sr) % (2 * np.pi)
+        return sines
+
+    def _voices(self, n, t):
+        """The sounding voices, their envelopes and sines over the next n samples, one row each.
+
+        Ages the voices by n.
+        """
+        v = np.flatnonzero(self.active)
+        if not len(v):
+            return v, None, None
+        age = self.age[v]
+        # every voice's envelope on one time axis, each voice shifted past the
+        # previous one's end, so a single np.interp evaluates all of them
+        shift = np.arange(len(v)) * (self.dur[v].max() + n / self.sr + 1.0)
+        ts = (age[:, None] + np.arange(n)) / self.sr + shift[:, None]     # (voices, n)
+        env = np.interp(ts.ravel(), (self.env_times[v] + shift[:, None]).ravel(),
+                        self.env_levels[v].ravel()).reshape(len(v), n)
+        env = (env * self.amp[v, None]).astype(np.float32)
+        phase = (2 * np.pi * self.freq[v] * age / self.sr) % (2 * np.pi)
+        sines = _sines(phase, self.freq[v], self.sr, t)
+        self.age[v] += n
+        self.active[v] = self.age[v] < self.dur[v] * self.sr
+        return v, env, sines
+
+    @metrics.timed('render')
+    def render(self, n):
+        """The next n mono samples."""
+        t = np.arange(n, dtype=np.float32)
+        out = self.chord_amp * self._chord_sines(n, t).sum(axis=0)
+        v, env, sines = self._voices(n, t)
+        if len(v):
+            out += np.einsum('ij,ij->j', env, sines)
+        self.clock += n
+        if metrics.enabled():
+            metrics.gauge('live_voices', int(self.active.sum()))
+            metrics.gauge('voice_bytes', self.nbytes)
+        return out
+
+
+class MixEngine(SynthEngine):
+    """Several streams in one engine: each has a pool of voices, a chord and (left, right) levels.
+
+    Stream s owns voices s * voices ... (s + 1) * voices - 1 (pool s of the
+    allocator), and a new note steals only from its own stream. render() mixes every stream to stereo.
+    Streams are added and removed at any time; the arrays grow as needed.
+    """
+
+    def __init__(self, sr=44100, voices=VOICES, steal='age'):
+        super().__init__(sr, 0)
+        self.pool = voices
+        self.voices = VoiceAllocator(voices, steal, sr, pools=0)     # a pool per stream
+        self.levels = np.zeros((0, 2))                  # per stream
+        self.chord_amps = np.zeros(0)                   # per stream
+        self.chord_stream = np.zeros(0, dtype=int)      # per chord oscillator
+        self.chord_gain = np.zeros((0, 2))
+        self.free = []                                  # ids of removed streams
+        self.sounding = np.zeros(0, dtype=np.int64)     # oscillators per stream in the last render
+
+    def add_stream(self, left=1.0, right=1.0):
+        """A new stream's id."""
+        if self.free:
+            s = self.free.pop()
+        else:
+            s = len(self.levels)
+            grow = self.pool
+            self.active = np.append(self.active, np.zeros(grow, dtype=bool))
+            self.age = np.append(self.age, np.zeros(grow, dtype=np.int64))
+            for name in ('freq', 'amp', 'dur'):
+                setattr(self, name, np.append(getattr(self, name), np.zeros(grow)))
+            self.env_times = np.vstack([self.env_times, np.zeros((grow, 5))])
+            self.env_levels = np.vstack([self.env_levels, np.zeros((grow, 5))])
+            self.levels = np.vstack([self.levels, np.zeros((1, 2))])
+            self.chord_amps = np.append(self.chord_amps, 0.0)
+            self.voices.add_pool()
+        self.voices.stolen[s] = 0
+        self.set_levels(s, left, right)
+        return s
+
+    def remove_stream(self, s):
+        self.set_chord([], 0.0, s)
+        self.active[s * self.pool:(s + 1) * self.pool] = False
+        self.voices.reclaim(self.clock, s)
+        self.levels[s] = 0.0
+        self.free.append(s)
+
+    def set_levels(self, s, left, right):
+        self.levels[s] = left, right
+        self.chord_gain[self.chord_stream == s] = self.chord_amps[s] * self.levels[s]
+
+    def set_chord(self, freqs, amp, stream=0):
+        freqs = np.asarray(freqs, dtype=float)
+        mine = self.chord_stream == stream
+        if mine.sum() == len(freqs):
+            self.chord_freq[mine] = freqs           # the phases carry on
+        else:
+            keep = ~mine
+            self.chord_freq = np.append(self.chord_freq[keep], freqs)
+            self.chord_phase = np.append(self.chord_phase[keep], np.zeros(len(freqs)))
+            self.chord_stream = np.append(self.chord_stream[keep], np.full(len(freqs), stream))
+            self.chord_gain = np.vstack([self.chord_gain[keep], np.zeros((len(freqs), 2))])
+            mine = self.chord_stream == stream
+        self.chord_amps[stream] = amp
+        self.chord_gain[mine] = amp * self.levels[stream]
+
+    @property
+    def stolen(self):
+        """Notes that took a busy voice, per stream."""
+        return self.voices.stolen
+
+    def note_on(self, freq, amp, attack, decay, sustain, release, dur, stream=0):
+        return self._start(stream, freq, amp, attack, decay, sustain, release, dur)
+
+    @metrics.timed('render')
+    def render(self, n):
+        """The next n samples of every stream, (n, 2) float32."""
+        t = np.arange(n, dtype=np.float32)
+        out = np.zeros((n, 2), dtype=np.float32)
+        if len(self.chord_freq):
+            out += self._chord_sines(n, t).T @ self.chord_gain.astype(np.float32)
+        v, env, sines = self._voices(n, t)
+        streams = v // self.pool
+        if len(v):
+            out += (env * sines).T @ self.levels[streams].astype(np.float32)
+        self.sounding = (np.bincount(streams, minlength=len(self.levels))
+                         + np.bincount(self.chord_stream, minlength=len(self.levels)))
+        self.clock += n
+        if metrics.enabled():
+            metrics.gauge('live_voices', int(self.active.sum()))
+            metrics.gauge('voice_bytes', self.nbytes)
+        return out
+
+
+def write_wav(path, audio, sr=44100):
+    """Write float audio (frames, channels) as 16-bit PCM, clipped to [-1, 1], to a path or binary file."""
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype('<i2')
+    with wave.open(path if hasattr(path, 'write') else str(path), 'wb') as w:
+        w.setnchannels(audio.shape[1])
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(pcm.tobytes())
@@ -0,0 +1,78 @@
+# Test the background analysis worker with a fake Tk scheduler (no display needed)
+
+import threading
+import time
+import pytest
+from analysis_worker import AnalysisWorker, LRUCache
+
+
+class FakeTk:
+    """Collects after() callbacks; pump() runs them like Tk's event loop would."""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, fn):
+        self.pending.append(fn)
+
+    def pump(self, until, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not until():
+            assert time.monotonic() < deadline, "timed out"
+            callbacks, self.pending = self.pending, []
+            for fn in callbacks:
+                fn()
+            time.sleep(0.005)
+
+
+def slow_upper(calls, delay=0.2):
+    def analyze(text):
+        calls.append(text)
+        time.sleep(delay)
+        return text.upper()
+    return analyze
+
+
+def test_newest_request_wins_and_is_cached():
+    tk, calls, done = FakeTk(), [], []
+    worker = AnalysisWorker(slow_upper(calls), tk.after)
+    on_done = lambda result, seconds, cached: done.append((result, cached))
+    start = time.perf_counter()
+    for text in ('a', 'b', 'c'):
+        worker.submit(text, on_done)
+    assert time.perf_counter() - start < 0.1          # submit never waits for the analysis
+    tk.pump(lambda: done and not worker.busy)
+    assert done == [('C', False)]
+    assert 'b' not in calls                           # replaced before it started
+    # unchanged text comes straight from the cache, on the calling thread
+    worker.submit('c', on_done)
+    assert done[-1] == ('C', True)
+    assert calls.count('c') == 1
+
+
+def test_errors_reach_on_error():
+    def fail(text):
+        raise ValueError(text)
+    tk, errors = FakeTk(), []
+    worker = AnalysisWorker(fail, tk.after)
+    worker.submit('oops', lambda *args: pytest.fail("no result expected"), errors.append)
+    tk.pump(lambda: errors)
+    assert isinstance(errors[0], ValueError)
+    assert 'oops' not in {k for k in worker.cache._items}
+
+
+def test_callbacks_run_on_the_polling_thread():
+    tk, threads = FakeTk(), []
+    worker = AnalysisWorker(str.upper, tk.after)
+    worker.submit('x', lambda *args: threads.append(threading.current_thread()))
+    tk.pump(lambda: threads)
+    assert threads == [threading.main_thread()]
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
@@ -0,0 +1,140 @@
+# Drive the app on the null audio backend: the UI keeps running while the text is analysed.
+# it runs headless on stand-in widgets and a small event loop, and on real Tk where there is a display
+
+import heapq
+import itertools
+import threading
+import time
+import tkinter as tk
+import types
+
+import pytest
+
+import app
+from audio_backend import NullBackend
+
+
+class FakeRoot:
+    """Tk's master as the app and its AnalysisWorker use it: title, after and an event loop."""
+
+    def __init__(self):
+        self._due = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def title(self, text):
+        self.text = text
+
+    def after(self, ms, fn, *args):
+        with self._lock:
+            heapq.heappush(self._due, (time.monotonic() + ms / 1000, next(self._order), fn, args))
+
+    def update(self):
+        """Run every callback that is due, like one turn of Tk's event loop."""
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._due or self._due[0][0] > now:
+                    return
+                _, _, fn, args = heapq.heappop(self._due)
+            fn(*args)
+
+    def destroy(self):
+        self._due.clear()
+
+
+class FakeWidget:
+    def __init__(self, master=None, *args, command=None, **options):
+        self.command = command
+        self.text = ''
+
+    def grid(self, **options):
+        pass
+
+    def config(self, **options):
+        pass
+
+    def see(self, index):
+        pass
+
+    def invoke(self):
+        return self.command()
+
+    # a Text's contents; like Tk, get() ends with a newline
+    def insert(self, index, text):
+        self.text = text + self.text if index == "1.0" else self.text + text
+
+    def delete(self, first, last):
+        self.text = ''
+
+    def get(self, first, last):
+        return self.text + "\n"
+
+
+class FakeVar:
+    def __init__(self, master=None, value=None):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+FAKE_TK = types.SimpleNamespace(Label=FakeWidget, Text=FakeWidget, Button=FakeWidget, Checkbutton=FakeWidget,
+                                BooleanVar=FakeVar, END=tk.END)
+
+
+@pytest.fixture(params=['headless', 'tk'])
+def root(request, monkeypatch):
+    if request.param == 'headless':
+        monkeypatch.setattr(app, 'tk', FAKE_TK)
+        monkeypatch.setattr(app, 'scrolledtext', types.SimpleNamespace(ScrolledText=FakeWidget))
+        root = FakeRoot()
+    else:
+        try:
+            root = tk.Tk()
+        except tk.TclError:
+            pytest.skip("no display for Tk")
+        root.withdraw()
+    yield root
+    root.destroy()
+
+
+def test_ui_stays_responsive(root, monkeypatch):
+    features = {'valence': 0.2, 'arousal': 0.3, 'dominance': 0.4, 'subjectivity': 0.5,
+                'variation': 0.1, 'density': 0.1}
+
+    def slow_analyze(text):
+        time.sleep(0.5)
+        return features, app.analyze_windows(text, window=app.WINDOW_WORDS, hop=app.HOP_WORDS)
+    monkeypatch.setattr(app, 'analyze', slow_analyze)
+
+    backend = NullBackend()
+    gui = app.EmotionMusicApp(root, backend=backend)
+    assert not gui.audio_booted and not backend.events     # no audio until there is something to play
+
+    start = time.perf_counter()
+    gui.run_button.invoke()
+    assert time.perf_counter() - start < 0.1          # the click returns at once
+
+    ticks = []
+    def tick():
+        ticks.append(time.perf_counter())
+        root.after(10, tick)
+    tick()
+    deadline = time.monotonic() + 5
+    while gui.scape is None:
+        assert time.monotonic() < deadline, "analysis never finished"
+        root.update()
+        time.sleep(0.002)
+    # the event loop kept turning while the analysis ran
+    assert len(ticks) > 10 and max(b - a for a, b in zip(ticks, ticks[1:])) < 0.2
+    assert "Analysis: 0." in gui.output_console.get("1.0", tk.END)
+    backend.run(2.0)
+    kinds = [e.kind for e in backend.events]
+    assert kinds[0] == 'chord' and 'note' in kinds
+
+    # pressing again with the same text is served from the cache straight away
+    gui.scape = None
+    gui.run_button.invoke()
+    assert gui.scape is not None
+    assert "cached" in gui.output_console.get("1.0", tk.END)
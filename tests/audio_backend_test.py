@@ -0,0 +1,71 @@
+# Test the audio backends that need no sound card: choice by environment, lazy boot, null and offline
+
+import subprocess
+import sys
+import wave
+from pathlib import Path
+
+import numpy as np
+import pytest
+from audio_backend import NullBackend, OfflineBackend, get_backend, render_soundscape
+from mapping import soundscape_params
+from soundscape import Soundscape
+
+ROOT = Path(__file__).resolve().parents[1]
+FEATURES = {'valence': 0.3, 'arousal': 0.6, 'dominance': 0.5, 'subjectivity': 0.4,
+            'variation': 0.2, 'density': 0.1}
+
+
+def test_backend_from_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv('SOUNDSCAPE_AUDIO', 'null')
+    assert isinstance(get_backend(), NullBackend)
+    monkeypatch.setenv('SOUNDSCAPE_OUTPUT', str(tmp_path / 'a.wav'))
+    monkeypatch.setenv('SOUNDSCAPE_SECONDS', '2.5')
+    backend = get_backend('offline')
+    assert isinstance(backend, OfflineBackend) and backend.seconds == 2.5
+    assert backend.path == str(tmp_path / 'a.wav')
+    with pytest.raises(ValueError):
+        get_backend('alsa')
+
+
+def test_pyo_is_not_loaded_until_boot():
+    code = ("import sys, app, render; from audio_backend import get_backend; "
+            "b = get_backend('pyo'); assert b.server is None and 'pyo' not in sys.modules")
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+
+
+def test_null_backend_records_the_melody_at_its_samples():
+    params = soundscape_params(FEATURES)
+    backend = NullBackend()
+    scape = Soundscape(params, seed=4).start(backend)
+    backend.run(10.0)
+    assert backend.events[0] == (0.0, 'chord', (params['chord'], params['chord_vol']))
+    notes = [e for e in backend.events if e.kind == 'note']
+
+    # the same melody, each note round(interval * sr) samples after the previous one
+    replay, onset, expected = Soundscape(params, seed=4), 0, []
+    while onset < 10 * 44100:
+        freq, interval = replay.next_note()
+        expected.append((onset / 44100, freq))
+        onset += round(interval * 44100)
+    assert [(e.time, e.args[0]) for e in notes] == expected
+
+    scape.stop()
+    count = len(backend.events)
+    backend.run(5.0)
+    assert backend.events[-1].kind == 'stop' and len(backend.events) == count
+
+
+def test_offline_backend_writes_the_render(tmp_path):
+    params = soundscape_params(FEATURES)
+    backend = get_backend('offline', path=tmp_path / 'out.wav', seconds=1.5)
+    Soundscape(params, seed=2).start(backend)
+    backend.wait()
+    with wave.open(str(tmp_path / 'out.wav')) as w:
+        assert (w.getnchannels(), w.getnframes()) == (2, int(1.5 * 44100))
+    # run in pieces or at once, the clock gives the same audio (up to float32 rounding)
+    pieces = OfflineBackend()
+    Soundscape(params, seed=2).start(pieces)
+    for seconds in (0.3, 0.01, 1.19):
+        pieces.run(seconds)
+    assert np.allclose(pieces.audio(), render_soundscape(params, duration=1.5, seed=2), atol=1e-4)
@@ -0,0 +1,34 @@
+# Run the benchmark suite's harness briefly and check that compare fails on a regression
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SUITE = os.path.join(ROOT, 'benchmarks', 'suite.py')
+
+
+def suite(*args):
+    return subprocess.run([sys.executable, SUITE, *args], capture_output=True, text=True, timeout=300)
+
+
+def test_run_save_and_compare(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    r = suite('run', '-k', 'schedule', '-k', 'split_clauses/one_token', '--min-time', '0.01', '--rounds', '2',
+              '--save', str(baseline))
+    assert r.returncode == 0, r.stderr
+    results = json.loads(baseline.read_text())
+    assert set(results['benchmarks']) == {'schedule/60s', 'split_clauses/one_token'}
+    assert results['benchmarks']['schedule/60s']['group'] == 'audio' and results['machine']['python']
+
+    # twice as slow fails, within the threshold passes
+    slower = json.loads(baseline.read_text())
+    slower['benchmarks']['schedule/60s']['median'] *= 2
+    slower['benchmarks']['split_clauses/one_token']['median'] *= 1.1
+    current = tmp_path / 'current.json'
+    current.write_text(json.dumps(slower))
+    r = suite('compare', str(baseline), str(current))
+    assert r.returncode == 1 and 'REGRESSION' in r.stdout and '1 regression(s)' in r.stdout
+    assert suite('compare', str(baseline), str(current), '--threshold', '1.5').returncode == 0
+    assert suite('compare', str(current), str(baseline)).returncode == 0           # faster is fine
@@ -0,0 +1,71 @@
+# Test the linear-time clause segmenter against the CL_SPLIT regex it replaces
+
+import glob
+import os
+import random
+import sys
+
+from clauses import clause_bounds, clause_spans
+from six_dimensions import CL_SPLIT, lexicon, split_clauses
+
+TEXTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'texts')
+
+# conjunctions in every case (and the letters re.IGNORECASE folds: İ, ı, ſ), near-misses,
+# every separator, Unicode whitespace and word characters
+PIECES = ['and', 'AND', 'And', 'but', 'or', 'Or', 'so', 'for', 'nor', 'yet', 'if', 'when', 'while',
+          'because', 'although', 'though', 'unless', 'since', 'İf', 'ıf', 'ſo', 'ſince', 'andy', 'sandy',
+          'ors', 'soon', '_and', 'and_', 'and1', 'é', '日本', '𝔘', 'x', '.', ',', '!', '?', ';', ':', '—',
+          '-', '--', ' ', '  ', '\n', '\n\n', '\r\n', '\t', '　', '\xa0', '\x1c', "'", '(']
+
+ADVERSARIAL = ['- ' * 5000, ', ' * 5000 + 'and', '—' * 5000 + ' ', ',' + ' ' * 5000 + 'x', '\n' * 5000,
+               'and' * 5000, ' and' * 5000, '.!?' * 3000 + ' ', 'x' * 10000]
+
+
+def corpus():
+    rng = random.Random(3)
+    for _ in range(3000):
+        yield ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 25)))
+    with open(lexicon, encoding='utf-8') as f:
+        vocab = [line.split(',')[0] for line in f][1::40]
+    glue = ['', '', '.', ',', '!', ';', ':', ' -', ' —', '\n', ', and', ', because']
+    for _ in range(50):
+        yield ' '.join(rng.choice(vocab) + rng.choice(glue) for _ in range(rng.randint(1, 400)))
+    for path in glob.glob(os.path.join(TEXTS, '*.txt')):
+        with open(path, encoding='utf-8') as f:
+            yield f.read()
+    yield from ADVERSARIAL
+
+
+def test_same_matches_and_clauses_as_the_regex():
+    for text in corpus():
+        ms, me = clause_spans(text)
+        assert list(zip(ms.tolist(), me.tolist())) == [m.span() for m in CL_SPLIT.finditer(text)], repr(text)
+        assert split_clauses(text) == [p.strip() for p in CL_SPLIT.split(text) if p.strip()], repr(text)
+    starts, ends = clause_bounds("")
+    assert len(starts) == len(ends) == 0
+
+
+def calls(fn):
+    """Python and C function calls made while running fn."""
+    n = 0
+
+    def count(frame, event, arg):
+        nonlocal n
+        n += event in ('call', 'c_call')
+    sys.setprofile(count)
+    try:
+        fn()
+    finally:
+        sys.setprofile(None)
+    return n
+
+
+def test_linear_on_pathological_input():
+    # a fixed number of array passes: the same calls for 8x the input, whatever it holds
+    # (the time it takes is benchmarks/suite.py's clause_spans/*)
+    clause_bounds(', and ' * 10)
+    for unit in (', ', '- ', ',' + ' ' * 50, 'and ', ', and', '\n'):
+        small, large = unit * 2_000, unit * 16_000
+        assert calls(lambda: clause_bounds(small)) == calls(lambda: clause_bounds(large)), unit
+        matches = len(clause_spans(small)[0]), len(clause_spans(large)[0])
+        assert matches[1] in (matches[0], 8 * matches[0]), (unit, matches)
@@ -0,0 +1,83 @@
+# Test batch analysis: the pool against sequential analyze_text, the forked lexicon, and the CLI's I/O
+
+import csv
+import io
+import json
+import multiprocessing
+import sys
+
+import pytest
+
+import corpus
+from six_dimensions import analyze_text, load_vad_lexicon
+
+TEXTS = [f"Day {i}: I love the calm sea, but the storm brought fear and anger. " * (1 + i % 3) for i in range(20)]
+LEXICON = ("term,valence,arousal,dominance\n"
+           "love,0.9,0.5,0.4\n"
+           "calm,0.6,-0.8,0.2\n"
+           "storm,-0.4,0.7,0.3\n"
+           "fear,-0.8,0.6,-0.5\n"
+           "anger,-0.7,0.8,0.3\n")
+
+
+def _lexicon_id(path):
+    return id(load_vad_lexicon(path))
+
+
+def test_pool_matches_sequential_in_order():
+    expected = [analyze_text(t) for t in TEXTS]
+    for workers, chunksize in ((1, 4), (2, 3), (3, 16)):
+        got = list(corpus.analyze_corpus(iter(TEXTS), workers=workers, chunksize=chunksize))
+        assert got == [pytest.approx(f) for f in expected]
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="workers are forked on Linux only")
+def test_forked_workers_share_the_parents_lexicon(tmp_path):
+    path = tmp_path / "small.csv"
+    path.write_text(LEXICON, encoding='utf-8')
+    path = str(path)
+    got = list(corpus.analyze_corpus(TEXTS, workers=2, chunksize=4, vad_path=path))
+    assert got == [pytest.approx(analyze_text(t, path)) for t in TEXTS]
+    assert got[0] != pytest.approx(analyze_text(TEXTS[0]))             # not the default lexicon's
+    # the workers use the very lexicon object the parent loaded, inherited rather than rebuilt
+    assert corpus.pool_context().get_start_method() == 'fork'
+    with corpus.pool_context().Pool(2, initializer=corpus.init_worker, initargs=(path, False)) as pool:
+        assert set(pool.map(_lexicon_id, [path] * 4)) == {_lexicon_id(path)}
+
+
+def test_spawned_workers_give_the_same_features(monkeypatch):
+    # the other platforms' default: workers map the lexicon's artifact instead of inheriting it
+    monkeypatch.setattr(corpus, 'pool_context', lambda: multiprocessing.get_context('spawn'))
+    got = list(corpus.analyze_corpus(TEXTS[:6], workers=2, chunksize=3))
+    assert got == [pytest.approx(analyze_text(t)) for t in TEXTS[:6]]
+
+
+def test_records_and_features_round_trip(tmp_path):
+    chapters = tmp_path / "chapters"
+    (chapters / "part2").mkdir(parents=True)
+    (chapters / "one.txt").write_text(TEXTS[0], encoding='utf-8')
+    (chapters / "part2" / "two.txt").write_text(TEXTS[1], encoding='utf-8')
+    posts = tmp_path / "posts.jsonl"
+    posts.write_text(json.dumps({'id': 'a', 'body': TEXTS[2]}) + "\n\n" + json.dumps({'body': TEXTS[3]}) + "\n",
+                     encoding='utf-8')
+    assert list(corpus.read_records(chapters)) == [('one.txt', TEXTS[0]), ('part2/two.txt', TEXTS[1])]
+    records = list(corpus.read_records(posts, text_field='body'))
+    assert records == [('a', TEXTS[2]), (2, TEXTS[3])]
+
+    rows = list(zip([rid for rid, _ in records], corpus.analyze_corpus([t for _, t in records], workers=1)))
+    out = io.StringIO()
+    corpus.write_features(rows, out, 'jsonl')
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == [{'id': rid, **f} for rid, f in rows]
+    out = io.StringIO()
+    corpus.write_features(rows, out, 'csv')
+    back = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert [r['id'] for r in back] == ['a', '2']
+    for r, (_, f) in zip(back, rows):
+        assert {k: float(r[k]) for k in corpus.FEATURES} == pytest.approx(f)
+
+    # the CLI: the same rows, ids and all
+    corpus.main([str(posts), '-o', str(tmp_path / "features.jsonl"), '--text-field', 'body', '--workers', '1'])
+    with open(tmp_path / "features.jsonl", encoding='utf-8') as f:
+        written = [json.loads(line) for line in f]
+    assert [w.pop('id') for w in written] == ['a', 2]
+    assert written == [pytest.approx(f) for _, f in rows]
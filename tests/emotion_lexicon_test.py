@@ -0,0 +1,86 @@
+# Test the emotion index against NRCLex's raw_emotion_scores counting
+
+import random
+
+import nltk
+import pytest
+from nrclex import NRCLex
+from emotion_lexicon import EmotionIndex, nrc_words
+from six_dimensions import compute_lexical_density, count_emotion_words, load_vad_lexicon
+
+TEXTS = [
+    "",
+    "I love sunny days, but sometimes I feel anxious when it's too bright.",
+    "Love LOVE love. \"Hope\" -- despair; (anger) [joy] {fear}... 'trust' “happy” «sad»",
+    "My mother's anger, the children's joy: I wanna cry, you gotta smile, we cannot hate.",
+    "Don't abandon hope! Can't stop the war-torn, ill-fated, so-called 'love-hate' feud.",
+    "U.S. troops at 5pm; 2nd chance & 100% joy/anger -- e.g. terror... $500 reward?!",
+]
+
+
+def has_punkt():
+    try:
+        nltk.data.find('tokenizers/punkt_tab')
+        return True
+    except LookupError:
+        return False
+
+
+# NRCLex splits the text into sentences with NLTK's punkt, so without its data there is nothing to compare
+needs_punkt = pytest.mark.skipif(not has_punkt(), reason="NLTK's punkt_tab data is not installed")
+
+
+def reference_count(text):
+    """NRCLex(text).raw_emotion_scores total."""
+    return sum(NRCLex(text).raw_emotion_scores.values())
+
+
+def random_text(rng, n=400):
+    words = list(NRCLex.lexicon)[::7] + ['the', 'of', "it's", "don't", 'wanna', 'cannot']
+    out = []
+    for _ in range(n):
+        w = rng.choice(words)
+        if rng.random() < 0.1:
+            w = w.capitalize()
+        if rng.random() < 0.1:
+            w = f"{w}-{rng.choice(words)}"
+        if rng.random() < 0.2:
+            w = rng.choice(['"', "'", '(', '']) + w + rng.choice(['.', ',', '!', "'s", '--', ')', '"', '...'])
+        out.append(w)
+    return ' '.join(out)
+
+
+@needs_punkt
+@pytest.mark.parametrize('text', TEXTS)
+def test_same_count_as_nrclex(text):
+    assert count_emotion_words(text) == reference_count(text)
+
+
+@needs_punkt
+def test_same_count_as_nrclex_on_random_text():
+    rng = random.Random(0)
+    for _ in range(5):
+        text = random_text(rng)
+        assert count_emotion_words(text) == reference_count(text)
+        assert compute_lexical_density(text) == reference_count(text) / len(text.split())
+
+
+def test_index():
+    vad_lex = load_vad_lexicon()
+    emotions = vad_lex.emotions
+    assert emotions is vad_lex.emotions                 # built once
+    assert len(emotions) == len(NRCLex.lexicon)
+    assert emotions.labels[vad_lex.index['abandon']] == 3
+    assert emotions.labels[vad_lex.index['table']] == 0
+    # emotion words the VAD lexicon lacks still count, past the end of its ids
+    word, i = next(iter(emotions.extra.items()))
+    assert i >= len(vad_lex) and emotions.labels[i] == len(NRCLex.lexicon[word])
+    small = EmotionIndex({'joy': 0}, 1, {'joy': ['joy', 'positive'], 'dread': ['fear']})
+    assert small.lookup_words(['joy', 'Joy', 'dread.', "joy's"]).tolist() == [2, 0, 1, 2]
+
+
+def test_nrc_words():
+    assert nrc_words('"Hello,') == ['Hello']
+    assert nrc_words("mother's.") == ['mother', "'s"]
+    assert nrc_words('wanna') == ['wan', 'na']
+    assert nrc_words('...') == []
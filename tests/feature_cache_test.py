@@ -0,0 +1,89 @@
+# Test the on-disk feature cache: round trips, LRU eviction, lexicon invalidation, several processes
+
+import multiprocessing
+import os
+
+import feature_cache
+from corpus import analyze_corpus
+from feature_cache import FeatureCache
+
+CSV = "term,valence,arousal,dominance\nhappy,0.985,0.47,0.39\nsad,-0.8,-0.3,-0.4\n"
+
+
+def features(i):
+    return {'valence': i / 10, 'arousal': 0.5, 'dominance': 0.25, 'subjectivity': 0.0,
+            'variation': 0.125, 'density': 1 / 3}
+
+
+def test_round_trip_and_stats(tmp_path, monkeypatch):
+    calls = []
+    real = feature_cache.analyze_text
+
+    def counting(*args):
+        calls.append(args[0])
+        return real(*args)
+    monkeypatch.setattr(feature_cache, 'analyze_text', counting)
+    cache = FeatureCache(tmp_path / 'f.sqlite')
+    text = "I am so happy today, but the rain makes me sad."
+    first = cache.analyze(text)
+    assert cache.analyze(text) == first and calls == [text]
+    # a second instance (another run) finds it on disk
+    assert FeatureCache(tmp_path / 'f.sqlite').get(text) == first
+    assert cache.get_many(['nope', text, 'nope']) == [None, first, None]
+    stats = cache.stats()
+    assert (stats['entries'], stats['hits'], stats['misses'], stats['puts']) == (1, 2, 3, 1)
+    assert stats['get_ms'] > 0
+
+
+def test_lru_eviction(tmp_path):
+    cache = FeatureCache(tmp_path / 'f.sqlite', max_entries=3)
+    cache.put_many([('a', features(1)), ('b', features(2)), ('c', features(3))])
+    assert cache.get('a') == features(1)        # a is now more recent than b
+    cache.put('d', features(4))
+    assert cache.get_many(['a', 'b', 'c', 'd']) == [features(1), None, features(3), features(4)]
+    assert len(cache) == 3 and cache.stats()['evicted'] == 1
+
+
+def test_changed_lexicon_invalidates(tmp_path):
+    lex = tmp_path / 'lex.csv'
+    lex.write_text(CSV, encoding='utf-8')
+    cache = FeatureCache(tmp_path / 'f.sqlite', vad_path=str(lex))
+    cache.put('happy', features(1))
+    assert cache.get('happy') == features(1)
+    lex.write_text(CSV.replace('0.985', '0.9'), encoding='utf-8')
+    os.utime(lex, ns=(0, 10**9))
+    assert cache.get('happy') is None
+    # the stale entry goes the first time this cache writes under the new lexicon
+    assert cache.analyze('happy')['valence'] == 0.9
+    assert len(cache) == 1
+
+
+def _writer(args):
+    path, worker = args
+    cache = FeatureCache(path, max_entries=10000)
+    texts = [f'text {worker} {i}' for i in range(200)]
+    for i in range(0, 200, 20):
+        cache.put_many((t, features(worker)) for t in texts[i:i + 20])
+        cache.get_many(texts[:i + 20])
+    return cache.get_many(texts) == [features(worker)] * 200
+
+
+def test_several_processes(tmp_path):
+    path = str(tmp_path / 'f.sqlite')
+    FeatureCache(path).clear()
+    ctx = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    with ctx.Pool(4) as pool:
+        assert all(pool.map(_writer, [(path, w) for w in range(4)]))
+    assert len(FeatureCache(path)) == 800
+
+
+def test_corpus_reruns_come_from_the_cache(tmp_path):
+    texts = [f"Day {i}: happy and sad, calm then angry." for i in range(40)]
+    for workers in (1, 2):
+        cache = FeatureCache(tmp_path / f'{workers}.sqlite')
+        first = list(analyze_corpus(texts[:25], workers=workers, chunksize=8, cache=cache))
+        assert cache.stats()['puts'] == 25
+        again = list(analyze_corpus(texts, workers=workers, chunksize=8, cache=cache))
+        assert again[:25] == first
+        stats = cache.stats()
+        assert (stats['hits'], stats['puts']) == (25, 40)
@@ -0,0 +1,67 @@
+# Test that feeding text in chunks ends at the same features as the batch analysis
+
+import random
+from incremental import IncrementalAnalyzer
+from six_dimensions import (analyze_text, compute_lexical_density, compute_sentiment_variation,
+                            compute_subjectivity, compute_vad)
+
+TEXTS = [
+    "",
+    "and and, and",
+    "  Not good.  Not bad at all! very very happy :-( ",
+    "I am not very happy!! :) It's really, really good (!) but... Mr. Smith isn't sure.\n\n"
+    "He said \"no\" -- never.  Very   bad; extremely nice, and so-so. U.S. citizens don't care.",
+    "This course will focus on practices of embodiment, listening, and sensing vibration. "
+    "Our own bodies and voices, individual and collective, will be our primary sites of research "
+    "and learning.\nThe sonic practices we will do together are rooted in non-western traditions.",
+    "joy      \n\n\t    and grief\u3000calm ,      and hope\xa0 \n  not    sad.   ",
+]
+
+
+def feed_randomly(text, rng):
+    analyzer = IncrementalAnalyzer()
+    i = 0
+    while i < len(text):
+        j = i + rng.randint(1, 25)
+        analyzer.feed(text[i:j])
+        if rng.random() < 0.2:
+            analyzer.snapshot()         # snapshots must not disturb the running state
+        i = j
+    return analyzer.snapshot()
+
+
+def test_chunked_matches_batch():
+    rng = random.Random(0)
+    for text in TEXTS:
+        expected = compute_vad(text)
+        expected['subjectivity'] = compute_subjectivity(text)
+        expected['variation'] = compute_sentiment_variation(text)
+        expected['density'] = compute_lexical_density(text)
+        for _ in range(5):
+            got = feed_randomly(text, rng)
+            for k, v in expected.items():
+                assert abs(got[k] - v) < 1e-9, (text, k)
+
+
+def test_final_snapshot_equals_analyze_text():
+    rng = random.Random(1)
+    for text in TEXTS[1:]:
+        expected = analyze_text(text)
+        got = feed_randomly(text, rng)
+        assert got.keys() == expected.keys()
+        for k, v in expected.items():
+            assert abs(got[k] - v) < 1e-9, (text, k)
+
+
+def test_text_without_whitespace_is_only_buffered():
+    # no cut point, so the chunks wait in a list and are joined once, not copied on every feed
+    analyzer = IncrementalAnalyzer()
+    word = 'happy' * 4000
+    for c in word:
+        analyzer.feed(c)
+    assert len(analyzer._pending) == len(word)
+    analyzer.feed(' sad day')
+    assert analyzer._pending == ['day']
+    got, expected = analyzer.snapshot(), analyze_text(word + ' sad day')
+    for k, v in expected.items():
+        assert abs(got[k] - v) < 1e-9, k
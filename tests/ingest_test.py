@@ -0,0 +1,102 @@
+# Test lexicon ingestion: parsing and validating the NRC .txt and .csv, and the memory-mapped artifact
+
+import numpy as np
+import pytest
+
+import ingest
+from phrases import PhraseTrie
+from vad_lexicon import DEFAULT_LEXICON, build_vad_lexicon
+
+TXT = ("term\tvalence\tarousal\tdominance\n"
+       "Happy\t0.985\t0.47\t0.39\n"
+       "\n"
+       "a bit\t-0.096\t-0.264\t-0.214\n"
+       "null\t-0.494\t-0.706\t-0.696\n"
+       "can't  wait\t0.5\t0.6\t0.1\n"
+       "sad\t-0.8\t-0.3\t-0.4\n")
+
+
+def write(path, body):
+    path.write_text(body, encoding='utf-8')
+    return str(path)
+
+
+def test_txt_keeps_multi_word_terms(tmp_path):
+    txt = write(tmp_path / "lex.txt", TXT)
+    csv = write(tmp_path / "lex.csv", TXT.replace('\t', ',').replace("can't  wait", '"can\'t wait"'))
+    header = ingest.ingest(txt, str(tmp_path / "lex.vadlex"))
+    assert header['rows'] == 5
+    assert ingest.ingest(csv, str(tmp_path / "csv.vadlex"))['sha256'] == header['sha256']
+
+    lex = build_vad_lexicon(str(tmp_path / "lex.vadlex"))
+    assert isinstance(lex.vad, np.memmap)
+    assert lex.terms == ['happy', 'a bit', 'null', "can't wait", 'sad']
+    assert list(lex.keys) == sorted(lex.terms)
+    assert lex.lookup(['sad', 'nope', 'a bit', 'null']).tolist() == [4, -1, 1, 2]
+    assert lex.lookup_words(['Happy!', 'sad.', 'x' * 100]).tolist() == [0, 4, -1]
+    assert lex['happy'] == {'valence': 0.985, 'arousal': 0.47, 'dominance': 0.39}
+    ids = lex.lookup_words("can't wait , a bit".split(), lex.phrases.extra)
+    assert lex.phrases.match(ids)[0].tolist() == [3, ids[1], -1, 1, ids[4]]
+    assert ingest.verify(str(tmp_path / "lex.vadlex"))
+
+
+@pytest.mark.parametrize('line, message', [
+    ("calm\t0.5\t-0.6\n", "expected a term and 3 scores, got 3"),
+    ("calm\t0.5\tlow\t0.1\n", "scores must be numbers"),
+    ("calm\t0.5\t1.5\t0.1\n", "scores of 'calm' must be in [-1, 1]"),
+    ("calm\tnan\t0.5\t0.1\n", "scores of 'calm' must be in [-1, 1]"),
+    ("\t0.5\t0.5\t0.1\n", "empty term"),
+    ("SAD\t0.5\t0.5\t0.1\n", "duplicate term 'sad' (first on line 7)"),
+])
+def test_invalid_rows_are_reported_with_their_line(tmp_path, line, message):
+    path = write(tmp_path / "lex.txt", TXT + line)
+    with pytest.raises(ValueError) as e:
+        ingest.read_lexicon(path)
+    assert f"lex.txt:8: {message}" in str(e.value)
+
+
+def test_corrupt_artifacts_are_caught(tmp_path):
+    path = str(tmp_path / "lex.vadlex")
+    ingest.ingest(write(tmp_path / "lex.txt", TXT), path)
+    assert ingest.verify(path)
+    _, arrays = ingest.open_artifact(path)
+    with open(path, 'r+b') as f:
+        f.seek(f.read().find(arrays['vad'].tobytes()))      # flip the first score
+        f.write(b'\xff\xff\xff\xff')
+    assert not ingest.verify(path)
+    write(tmp_path / "bad.vadlex", "term,valence\n")
+    with pytest.raises(ValueError):
+        ingest.open_artifact(str(tmp_path / "bad.vadlex"))
+
+
+def test_loading_skips_bad_rows_with_a_warning(tmp_path):
+    bad = ("calm\t0.5\t-0.6\n"                 # line 8: a score short
+           "\t-0.4\t-0.7\t-0.6\n"               # an empty term
+           "SAD\t0.5\t0.5\t0.1\n"              # a duplicate: the first one stays
+           "storm\t-0.4\t0.7\t0.3\n")
+    path = write(tmp_path / "lex.txt", TXT + bad)
+    with pytest.raises(ValueError):
+        ingest.ingest(path, str(tmp_path / "lex.vadlex"))
+    with pytest.warns(UserWarning, match=r"skipped 3 invalid row\(s\)") as caught:
+        lex = build_vad_lexicon(path)
+    assert "lex.txt:9: empty term" in str(caught[0].message)
+    assert lex.terms == ['happy', 'a bit', 'null', "can't wait", 'sad', 'storm']
+    assert lex['sad']['valence'] == pytest.approx(-0.8)
+    # a token that strips to nothing matches no term
+    assert lex.lookup_words(['...', 'storm!']).tolist() == [-1, 5]
+
+
+def test_real_lexicon_round_trips(tmp_path):
+    terms, scores = ingest.read_lexicon(DEFAULT_LEXICON)
+    path = str(tmp_path / "nrc.vadlex")
+    ingest.write_artifact(path, ingest.build_arrays(terms, scores))
+    lex = build_vad_lexicon(path)
+    assert len(lex) == len(terms) == 54801
+    assert (lex.lookup(terms) == np.arange(len(terms))).all()
+    np.testing.assert_array_equal(lex.scores(np.arange(len(terms))).T, scores)
+    # the stored phrase index is the trie built from the terms
+    rebuilt = PhraseTrie(terms, lex.index)
+    ids = np.random.default_rng(0).integers(-1, rebuilt.vocab_size, 50_000)
+    ids[::3] = lex.lookup(['a', 'bit', 'more'] * (len(ids[::3]) // 3 + 1))[:len(ids[::3])]
+    for got, want in zip(lex.phrases.match(ids), rebuilt.match(ids)):
+        np.testing.assert_array_equal(got, want)
@@ -0,0 +1,101 @@
+# Test the instrumentation: off by default and silent, stage timers and counters when on, the exports
+
+import json
+import time
+
+import pytest
+
+import metrics
+from audio_backend import NullBackend, render_soundscape
+from six_dimensions import analyze_text
+from soundscape import Soundscape
+
+TEXT = "I love the bright morning and the calm sea, but the storm brought fear and anger. " * 4
+PARAMS = {'chord': [261.63, 329.63, 392.0], 'chord_vol': 0.1, 'note_vol': 2.0, 'tempo': 0.5,
+          'dominance': 0.5, 'attack': 0.01, 'decay': 0.1, 'sustain': 0.5, 'release': 0.2, 'duration': 0.4}
+
+
+@pytest.fixture
+def on():
+    was = metrics.enabled()
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.enable(was)
+    metrics.reset()
+
+
+def test_off_records_nothing():
+    was = metrics.enabled()
+    metrics.disable()
+    metrics.reset()
+    try:
+        analyze_text(TEXT)
+        render_soundscape(PARAMS, duration=1.0, seed=1)
+        assert metrics.stats() == {'enabled': False, 'timers': {}, 'counters': {}, 'gauges': {}}
+        assert "off" in metrics.report()
+    finally:
+        metrics.enable(was)
+
+
+def test_analysis_and_audio_stages(on):
+    analyze_text(TEXT)
+    backend = NullBackend(seconds=5.0)
+    Soundscape(PARAMS, seed=1).start(backend)
+    backend.wait()
+    render_soundscape(PARAMS, duration=1.0, seed=1)
+    s = metrics.stats()
+    for stage in ('load_vad_lexicon', 'scan_text', 'compute_vad', 'compute_subjectivity',
+                  'compute_sentiment_variation', 'compute_lexical_density', 'analyze_text',
+                  'schedule', 'dispatch', 'render'):
+        assert s['timers'][stage]['calls'] >= 1, stage
+    # the stages nest inside analyze_text
+    assert s['timers']['analyze_text']['total_s'] >= s['timers']['scan_text']['total_s']
+    assert s['counters']['tokens'] == len(TEXT.split())
+    assert 0 < s['counters']['lexicon_hits'] < s['counters']['tokens']
+    assert s['gauges']['lexicon_hit_rate'] == s['counters']['lexicon_hits'] / s['counters']['tokens']
+    assert s['counters']['notes_scheduled'] % 64 == 0 and s['gauges']['live_voices'] >= 0
+
+
+def test_exports(on):
+    with metrics.timer('stage'):
+        time.sleep(0.01)
+    metrics.count('tokens', 10)
+    metrics.count('lexicon_hits', 4)
+    metrics.gauge('live_voices', 3)
+    s = json.loads(metrics.to_json())
+    assert s['timers']['stage']['calls'] == 1 and s['timers']['stage']['max_ms'] >= 10
+    assert s['gauges'] == {'live_voices': 3, 'lexicon_hit_rate': 0.4}
+    text = metrics.to_prometheus()
+    assert 'soundscape_stage_seconds_count{stage="stage"} 1\n' in text
+    assert '# TYPE soundscape_tokens_total counter\nsoundscape_tokens_total 10\n' in text
+    assert 'soundscape_live_voices 3\n' in text
+    # what a worker takes is cleared there and adds up where it is merged
+    taken = metrics.take()
+    assert metrics.stats()['timers'] == {}
+    metrics.merge(taken)
+    metrics.merge(taken)
+    assert metrics.stats()['counters'] == {'tokens': 20, 'lexicon_hits': 8}
+    assert metrics.stats()['timers']['stage']['calls'] == 2
+
+
+def test_off_costs_little():
+    was = metrics.enabled()
+    metrics.disable()
+
+    def f(x):
+        return x
+    g = metrics.timed('f')(f)
+    try:
+        n = 200_000
+        start = time.perf_counter()
+        for i in range(n):
+            f(i)
+        plain = time.perf_counter() - start
+        start = time.perf_counter()
+        for i in range(n):
+            g(i)
+        wrapped = time.perf_counter() - start
+    finally:
+        metrics.enable(was)
+    assert (wrapped - plain) / n < 2e-6         # well under the microseconds any stage takes
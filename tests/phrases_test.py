@@ -0,0 +1,39 @@
+# Test multi-word lexicon matching
+
+import numpy as np
+from phrases import PhraseTrie
+from six_dimensions import compute_vad, load_vad_lexicon, scan_text
+
+
+def terms_of(vad_lex, ids):
+    return [vad_lex.terms[i] if i >= 0 else None for i in ids]
+
+
+def test_greedy_longest_match():
+    terms = ['a', 'b', 'c', 'a b', 'a b c', 'b c', 'c a']
+    trie = PhraseTrie(terms, {t: i for i, t in enumerate(terms)})
+    ids = np.array([0, 1, 2, 0, 1, 2, 0, 1], dtype=np.int32)          # a b c a b c a b
+    out, keep = trie.match(ids)
+    assert [terms[i] for i in out[keep]] == ['a b c', 'a b c', 'a b']
+    # a break in front of token 2 stops "a b c" from spanning it
+    breaks = np.zeros(len(ids), dtype=bool)
+    breaks[2] = True
+    out, keep = trie.match(ids, breaks)
+    assert [terms[i] for i in out[keep]] == ['a b', 'c a', 'b c', 'a b']
+
+
+def test_phrases_are_opt_in():
+    vad_lex = load_vad_lexicon()
+    text = "just a bit sad. I can't wait"
+    assert terms_of(vad_lex, scan_text(text, vad_lex).word_ids) == ['just', None, 'bit', 'sad', None, None, 'wait']
+    scan = scan_text(text, vad_lex, phrases=True)
+    assert terms_of(vad_lex, scan.word_ids) == ['just', 'a bit', 'sad', None, "can't wait"]
+    assert list(scan.clause_starts) == [0, 3]
+    expected = np.mean([vad_lex[t]['valence'] for t in ('just', 'a bit', 'sad', "can't wait")])
+    assert abs(compute_vad(text, vad_lex, phrases=True)['valence'] - expected) < 1e-12
+
+
+def test_phrases_stop_at_clause_boundaries():
+    vad_lex = load_vad_lexicon()
+    scan = scan_text("give it a\nbit", vad_lex, phrases=True)
+    assert 'a bit' not in terms_of(vad_lex, scan.clause_ids)
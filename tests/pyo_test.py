@@ -3,8 +3,9 @@
 # Elizabeth Li 5/13/2025
 # Continuously loop a generative tone driven by six text dimensions.
 
-from pyo import Server, Pattern, Sine, Freeverb, ButLP
+from pyo import Pattern, Sine, Freeverb, ButLP
 import random
+from audio_backend import PyoBackend
 from six_dimensions import analyze_text  # your text-analysis module
 
 def map_features(features):
@@ -48,9 +49,9 @@ def run_text_to_sound_loop(text: str):
     features = analyze_text(text)
     freqs, dur, amp, rev, mod, steps = map_features(features)
 
-    # Initialize Pyo server (no input, stereo output)
-    s = Server(duplex=False, sr=44100, nchnls=2, audio='portaudio').boot()
-    s.start()
+    # Pyo server from the audio backend (no input, stereo output), booted only now
+    backend = PyoBackend()
+    backend.boot()
 
     def play_step():
         # Pick a scale degree and apply modulation
@@ -69,7 +70,7 @@ def run_text_to_sound_loop(text: str):
     loop = Pattern(play_step, time=float(dur)).play()
 
     # GUI keeps process alive
-    s.gui(locals())
+    backend.wait(locals())
 
 if __name__ == "__main__":
     user_text = input("I love sunny days, but sometimes I feel anxious when it's too bright.")
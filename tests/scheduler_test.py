@@ -0,0 +1,88 @@
+# Test the event schedule: batches, window chords, and where pyo's offline render puts the onsets
+
+import wave
+
+import numpy as np
+import pytest
+
+from audio_backend import PyoBackend
+from mapping import soundscape_params
+from scheduler import Schedule
+from synth import BLOCK
+from soundscape import Soundscape
+
+FEATURES = {'valence': 0.3, 'arousal': 0.6, 'dominance': 0.5, 'subjectivity': 0.4,
+            'variation': 0.2, 'density': 0.1}
+
+
+def test_schedule():
+    params = soundscape_params(FEATURES)
+    windows = {'chord': [[200.0, 250.0, 300.0], [210.0, 260.0, 310.0]], 'chord_vol': [0.1, 0.2],
+               'note_vol': [1.0, 2.0], 'tempo': [0.2, 0.4]}
+    schedule = Schedule(Soundscape(params, windows, notes_per_window=4, seed=1), batch=8)
+    events = schedule.until(44100 * 5)
+    assert schedule.batches == 3 and len(events) == 18 + 5       # 18 notes, a chord every 4
+    chords = [e for e in events if e.kind == 'chord']
+    notes = [e for e in events if e.kind == 'note']
+    assert [e.sample for e in chords] == [notes[i].sample for i in range(0, 18, 4)]
+    assert chords[1].args == ([210.0, 260.0, 310.0], 0.2) and notes[4].args[1] == 2.0
+    assert notes[0].args[2:] == tuple(params[k] for k in ('attack', 'decay', 'sustain', 'release', 'duration'))
+    # onsets are whole samples, computed once from the seed however they are taken
+    again = Schedule(Soundscape(params, windows, notes_per_window=4, seed=1), batch=3)
+    assert [e for s in range(0, 44100 * 5, 1000) for e in again.until(s + 1000)] == events
+    blocks = Schedule(Soundscape(params, windows, notes_per_window=4, seed=1), quantum=256).until(44100 * 5)
+    assert all(b.sample == round(e.sample / 256) * 256 for b, e in zip(blocks, events))
+
+
+def test_pyo_onsets_land_on_their_blocks(tmp_path):
+    pytest.importorskip('pyo')
+    # short notes on a silent chord, so every onset is the first sample after a silence
+    params = soundscape_params(FEATURES)
+    params.update(chord_vol=0.0, tempo=0.15, attack=0.005, decay=0.01, sustain=0.5,
+                  release=0.01, duration=0.05)
+    seconds = 10.0
+    scheduled = [e.sample for e in Schedule(Soundscape(params, seed=7), quantum=BLOCK).until(int(seconds * 44100))
+                 if e.kind == 'note']
+
+    # pyo's offline server calls dispatch in step with its rendering, so this checks where the
+    # hand-overs and delayed triggers put each note, not how late a busy process would call them
+    backend = PyoBackend(audio='offline', verbosity=1)
+    try:
+        backend.boot().recordOptions(dur=seconds, filename=str(tmp_path / 'onsets.wav'), fileformat=0,
+                                     sampletype=2)          # 32-bit, so the quietest first samples survive
+        scape = Soundscape(params, seed=7).start(backend)
+        backend.wait()
+        scape.stop()
+    finally:
+        backend.shutdown()
+
+    with wave.open(str(tmp_path / 'onsets.wav')) as w:
+        audio = np.frombuffer(w.readframes(w.getnframes()), '<i4').reshape(-1, 2)
+    sound = audio[:, 0] != 0
+    # a note's first sample is 0 (no level, sine at phase 0), the next is not
+    onsets = np.flatnonzero(sound[1:] & ~sound[:-1])
+    assert len(onsets) == len(scheduled)
+    assert np.abs(onsets - np.array(scheduled)).max() == 0
+
+
+def test_pyo_plays_every_note_however_many_wait(tmp_path):
+    pytest.importorskip('pyo')
+    # a hundred notes handed over at once: every delayed call fires, and each lets itself go
+    note = (0.1, 0.005, 0.01, 0.5, 0.01, 0.05)          # amp, attack, decay, sustain, release, dur
+    scheduled = [(k + 1) * 16 * BLOCK for k in range(100)]
+    backend = PyoBackend(audio='offline', verbosity=1)
+    try:
+        backend.boot().recordOptions(dur=(scheduled[-1] + 16 * BLOCK) / 44100, filename=str(tmp_path / 'many.wav'),
+                                     fileformat=0, sampletype=2)
+        for sample in scheduled:
+            backend.note_on(440.0, *note, delay=sample / 44100)
+        assert len(backend.pending) == 100
+        backend.wait()
+        assert not backend.pending
+    finally:
+        backend.shutdown()
+
+    with wave.open(str(tmp_path / 'many.wav')) as w:
+        audio = np.frombuffer(w.readframes(w.getnframes()), '<i4').reshape(-1, 2)
+    sound = audio[:, 0] != 0
+    assert list(np.flatnonzero(sound[1:] & ~sound[:-1])) == scheduled
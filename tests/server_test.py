@@ -0,0 +1,215 @@
+# Test the local service: HTTP analysis and rendering, 503 under overload, WebSocket streams
+
+import asyncio
+import io
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+import wave
+
+import numpy as np
+import pytest
+
+import metrics
+import server
+from server import SoundscapeServer, ws_frame, ws_read
+from six_dimensions import analyze_text
+
+TEXT = ("I love the bright morning and the calm sea. Then the storm came, and fear and anger "
+        "filled the harbour, but by evening hope returned. ") * 5
+
+
+@pytest.fixture
+def service():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    run = lambda coro: asyncio.run_coroutine_threadsafe(coro, loop).result(60)     # noqa: E731
+    started = []
+
+    def start(**options):
+        s = run(SoundscapeServer(workers=1, **options).start(port=0))
+        started.append(s)
+        return s, run
+    yield start
+    for s in started:
+        run(s.close())
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def post(port, path, data, timeout=60):
+    request = urllib.request.Request(f'http://127.0.0.1:{port}{path}', data=data.encode())
+    with urllib.request.urlopen(request, timeout=timeout) as r:
+        return r.status, r.headers['Content-Type'], r.read()
+
+
+async def ws_connect(port):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b'GET /stream HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                 b'Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n')
+    head = await reader.readuntil(b'\r\n\r\n')
+    assert head.startswith(b'HTTP/1.1 101') and b's3pPLMBiTxaQ9kYGzzhZRbK+xOo=' in head
+    return reader, writer
+
+
+async def ws_session(port, message):
+    reader, writer = await ws_connect(port)
+    writer.write(ws_frame(1, json.dumps(message).encode(), mask=os.urandom(4)))
+    received = []
+    while True:
+        opcode, data = await ws_read(reader, writer)
+        if opcode == 8:
+            break
+        received.append((opcode, data))
+    writer.close()
+    return received
+
+
+def test_analyze_and_render(service):
+    s, _ = service()
+    status, kind, body = post(s.port, '/analyze', TEXT)
+    assert status == 200 and kind == 'application/json'
+    assert json.loads(body) == pytest.approx(analyze_text(TEXT))
+    status, kind, body = post(s.port, '/render?duration=1.5&seed=2', TEXT)
+    with wave.open(io.BytesIO(body)) as w:
+        assert kind == 'audio/wav' and (w.getnchannels(), w.getnframes()) == (2, int(1.5 * 44100))
+    batches = s.batcher.batches
+    for query in ('duration=9999', 'duration=abc', 'duration=nan', 'seed=x'):
+        with pytest.raises(urllib.error.HTTPError) as e:
+            post(s.port, f'/render?{query}', TEXT)
+        assert e.value.code == 400, query
+    # refused before any analysis, and not counted as server errors
+    assert s.batcher.batches == batches and s.errors == 0
+    with pytest.raises(urllib.error.HTTPError) as e:
+        post(s.port, '/nowhere', TEXT)
+    assert e.value.code == 404
+
+
+def test_bad_content_length_is_a_400(service):
+    s, run = service()
+
+    async def send(length):
+        reader, writer = await asyncio.open_connection('127.0.0.1', s.port)
+        writer.write(f'POST /analyze HTTP/1.1\r\nHost: localhost\r\nContent-Length: {length}\r\n\r\n'.encode())
+        answer = await reader.read()
+        writer.close()
+        return answer
+    for length in ('ten', '-5'):
+        assert run(send(length)).startswith(b'HTTP/1.1 400 ')
+
+
+def test_concurrent_requests_are_batched_and_bounded(service, monkeypatch):
+    s, run = service(max_inflight=4, batch_wait=0.05)
+    texts = [f"{TEXT} Day {i}." for i in range(12)]
+    results = [None] * len(texts)
+
+    def request(i):
+        try:
+            results[i] = json.loads(post(s.port, '/analyze', texts[i])[2])
+        except urllib.error.HTTPError as e:
+            results[i] = (e.code, e.headers['Retry-After'])
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(len(texts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    served = [i for i, r in enumerate(results) if isinstance(r, dict)]
+    rejected = [r for r in results if not isinstance(r, dict)]
+    # no more than max_inflight at a time; the rest are told to come back
+    assert served and all(r == (503, '1') for r in rejected)
+    for i in served:
+        assert results[i] == pytest.approx(analyze_text(texts[i]))
+    health = json.loads(post(s.port, '/health', '')[2])
+    assert health['rejected'] == len(rejected) and health['inflight'] == 1     # this request
+    assert health['batch_mean'] > 1                                           # texts went in batches
+
+
+def test_stream_features(service):
+    s, run = service()
+    received = run(ws_session(s.port, {'text': TEXT, 'mode': 'features', 'words': 40}))
+    messages = [json.loads(data) for _, data in received]
+    updates = [m for m in messages if m['type'] == 'features']
+    assert [m['words'] for m in updates] == [40, 80, 120, 125] and messages[-1] == {'type': 'done'}
+    # the last update is the whole text's analysis
+    assert updates[-1]['features'] == pytest.approx(analyze_text(TEXT))
+
+
+def test_stream_audio(service):
+    s, run = service()
+    received = run(ws_session(s.port, {'text': TEXT, 'mode': 'audio', 'seconds': 2.0, 'seed': 1}))
+    header = json.loads(received[0][1])
+    assert header['type'] == 'audio' and header['sr'] == 44100 and header['format'] == 's16le'
+    pcm = b''.join(data for opcode, data in received if opcode == 2)
+    audio = np.frombuffer(pcm, '<i2').reshape(-1, 2)
+    assert len(audio) == 2 * 44100 and np.abs(audio).max() > 0
+    windows = [json.loads(data) for opcode, data in received if opcode == 1 and b'"window"' in data]
+    assert windows[0]['index'] == 0 and windows[0]['time'] == 0.0 and len(windows[0]['chord']) == 3
+    bad = run(ws_session(s.port, {'text': TEXT, 'mode': 'video'}))
+    assert json.loads(bad[0][1])['type'] == 'error'
+    # a chunk under one sample would never move the stream on
+    for chunk in (0, -1, 1e-6, 'nan'):
+        bad = run(ws_session(s.port, {'text': TEXT, 'mode': 'audio', 'seconds': 1.0, 'chunk': chunk}))
+        assert len(bad) == 1 and 'chunk must be' in json.loads(bad[0][1])['error']
+
+
+def test_oversized_frame_closes_the_websocket(service):
+    s, run = service()
+
+    async def oversized():
+        reader, writer = await ws_connect(s.port)
+        writer.write(bytes([0x81, 0x80 | 127]) + (server.MAX_BODY + 1).to_bytes(8, 'big'))
+        opcode, data = await ws_read(reader, writer)
+        rest = await reader.read()
+        writer.close()
+        return opcode, data, rest
+    # a close frame with 1009, not an HTTP response inside the WebSocket
+    opcode, data, rest = run(oversized())
+    assert opcode == 8 and int.from_bytes(data[:2], 'big') == 1009 and rest == b''
+
+    async def fragmented():
+        # the same limit for one message sent as many small continuation frames
+        reader, writer = await ws_connect(s.port)
+        piece = b'x' * 2**16
+        writer.write(bytes([0x01, 0x80 | 127]) + len(piece).to_bytes(8, 'big') + bytes(4) + piece)
+        for _ in range(server.MAX_BODY // len(piece)):
+            writer.write(bytes([0x00, 0x80 | 127]) + len(piece).to_bytes(8, 'big') + bytes(4) + piece)
+        opcode, data = await ws_read(reader, writer)
+        writer.close()
+        return opcode, data
+    opcode, data = run(fragmented())
+    assert opcode == 8 and int.from_bytes(data[:2], 'big') == 1009
+
+
+def test_websocket_frames():
+    mask = b'\x01\x02\x03\x04'
+    for n in (0, 5, 200, 70000):
+        payload = bytes(range(256)) * (n // 256) + bytes(n % 256)
+
+        async def roundtrip():
+            reader = asyncio.StreamReader()
+            reader.feed_data(ws_frame(2, payload, mask=mask))
+            return await ws_read(reader, None)
+        assert asyncio.run(roundtrip()) == (2, payload)
+    assert server._unmask(server._unmask(b'hello', mask), mask) == b'hello'
+
+
+def test_metrics_endpoint(service):
+    was = metrics.enabled()
+    metrics.reset()
+    metrics.enable()
+    try:
+        s, _ = service()
+        post(s.port, '/analyze', TEXT)
+        with urllib.request.urlopen(f'http://127.0.0.1:{s.port}/metrics', timeout=60) as r:
+            kind, text = r.headers['Content-Type'], r.read().decode()
+        # the analysis ran in a worker process; its numbers came back with the result
+        assert kind.startswith('text/plain') and 'soundscape_stage_seconds_count{stage="analyze_text"} 1\n' in text
+        with urllib.request.urlopen(f'http://127.0.0.1:{s.port}/metrics?format=json', timeout=60) as r:
+            stats = json.loads(r.read())
+        assert stats['counters']['tokens'] == len(TEXT.split()) and stats['timers']['request']['calls'] >= 1
+    finally:
+        metrics.enable(was)
+        metrics.reset()
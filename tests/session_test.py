@@ -0,0 +1,59 @@
+# Test the multi-stream session: isolated streams, gain and pan, late starts, CPU per stream
+
+import numpy as np
+from audio_backend import pan_gains, render_soundscape
+from mapping import soundscape_params
+from session import Session
+from synth import MixEngine
+
+FEATURES = {'valence': 0.3, 'arousal': 0.6, 'dominance': 0.5, 'subjectivity': 0.4,
+            'variation': 0.2, 'density': 0.1}
+SAD = dict(FEATURES, valence=-0.6, arousal=0.2, dominance=0.1)
+
+
+def test_streams_mix_like_separate_renders():
+    a, b = soundscape_params(FEATURES), soundscape_params(SAD)
+    session = Session()
+    session.add(params=a, seed=1)
+    session.add(params=b, seed=2, gain=0.5, pan=-1.0)
+    session.run(2.0)
+    mix = session.audio()
+    assert mix.shape == (2 * 44100, 2) and mix.dtype == np.float32
+    # each stream has its own RNG and voices: the mix is the two soundscapes rendered alone
+    alone_a = render_soundscape(a, duration=2.0, seed=1)[:, 0]
+    alone_b = render_soundscape(b, duration=2.0, seed=2)[:, 0]
+    assert np.allclose(mix[:, 0], alone_a + 0.5 * alone_b, atol=1e-3)
+    assert np.allclose(mix[:, 1], alone_a, atol=1e-3)       # b is panned hard left
+    assert pan_gains(1.0, 0.5) == (0.5, 1.0)
+
+
+def test_streams_come_and_go():
+    session = Session()
+    session.run(0.5)
+    late = session.add(params=soundscape_params(FEATURES), seed=3, name='late')
+    session.run(1.0)
+    audio = session.audio()
+    assert not audio[:22050].any() and audio[22050:].any()
+    # it plays from the moment it was added, as if rendered on its own
+    assert np.allclose(audio[22050:, 0], render_soundscape(late.scape.params, duration=1.0, seed=3)[:, 0],
+                       atol=1e-3)
+    stats = session.stats()
+    assert [s['name'] for s in stats] == ['late'] and stats[0]['cpu_s'] > 0 and stats[0]['load'] > 0
+    session.remove(late)
+    session.run(0.5)
+    assert not session.audio()[-22050:].any() and session.stats() == []
+
+
+def test_voice_pools_are_per_stream():
+    engine = MixEngine(voices=4)
+    a, b = engine.add_stream(), engine.add_stream(0.0, 1.0)
+    engine.note_on(500.0, 0.1, 0.01, 0.1, 0.5, 0.5, 2.0, stream=b)
+    for k in range(6):
+        engine.note_on(300.0 + k, 0.1, 0.01, 0.1, 0.5, 0.5, 2.0, stream=a)
+        engine.render(256)
+    # a busy stream steals from its own voices only
+    assert engine.stolen.tolist() == [2, 0] and engine.freq[4] == 500.0
+    out = engine.render(256)
+    assert out.shape == (256, 2) and engine.sounding.tolist() == [4, 1]
+    engine.remove_stream(a)
+    assert engine.add_stream() == a and not engine.active[:4].any()
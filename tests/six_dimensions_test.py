@@ -0,0 +1,64 @@
+# Test the single-pass VAD/variation extractor against the original per-clause code
+
+import csv
+import random
+import numpy as np
+from six_dimensions import CL_SPLIT, compute_sentiment_variation, compute_vad, lexicon, load_vad_lexicon
+
+TRICKY = [
+    "",
+    "\n\n",
+    ". ",
+    "  and  ",
+    "happy.",
+    "rock-and-roll is fun, and so-so. well- said",
+    "foo , and bar",
+    "U.S. army\n\nand navy — great— yes",
+    ". , ; x. and. y",
+    "sandwich,and cake;joy: love!happy ever",
+    "Andrew and andy, Because... because! for-profit;;  x",
+]
+
+
+def reference_lexicon():
+    vad = {}
+    with open(lexicon, encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if not row['term'].strip():         # left out when loading, with a warning
+                continue
+            vad[row['term'].lower()] = {k: float(row[k]) for k in ('valence', 'arousal', 'dominance')}
+    return vad
+
+
+def reference_vad(text, vad_lex):
+    tokens = [w.strip('.,!?;:').lower() for w in text.split()]
+    hits = [vad_lex[t] for t in tokens if t in vad_lex]
+    return {k: np.mean([h[k] for h in hits]) if hits else 0.0 for k in ('valence', 'arousal', 'dominance')}
+
+
+def reference_variation(text, vad_lex):
+    clause_vals = []
+    for clause in [p.strip() for p in CL_SPLIT.split(text) if p.strip()]:
+        tokens = [w.strip('.,!?;:').lower() for w in clause.split()]
+        vals = [vad_lex[t]['valence'] for t in tokens if t in vad_lex]
+        clause_vals.append(np.mean(vals) if vals else 0.0)
+    return float(np.std(clause_vals)) if len(clause_vals) > 1 else 0.0
+
+
+def random_texts(vocab, count=40):
+    rng = random.Random(7)
+    glue = ['', '', '', '.', ',', '!', '?', ';', ':', '-', '—', ' -', '\n', '-and-']
+    for _ in range(count):
+        words = [rng.choice(vocab) + rng.choice(glue) for _ in range(rng.randint(1, 300))]
+        yield ' '.join(words)
+
+
+def test_matches_reference_within_1e_9():
+    ref = reference_lexicon()
+    vad_lex = load_vad_lexicon()
+    vocab = [t for t in ref if t and ' ' not in t][::50] + ['and', 'but', 'so', 'or', 'The', 'Because']
+    for text in TRICKY + list(random_texts(vocab)):
+        expected, got = reference_vad(text, ref), compute_vad(text, vad_lex)
+        for k in expected:
+            assert abs(expected[k] - got[k]) < 1e-9, (text, k)
+        assert abs(reference_variation(text, ref) - compute_sentiment_variation(text, vad_lex)) < 1e-9, text
@@ -0,0 +1,65 @@
+# Test the shared mapping over grids of settings, and the sweep's previews
+
+import numpy as np
+import pytest
+
+import sweep
+from audio_backend import render_soundscape
+from mapping import APP, DEFAULTS, soundscape_params
+
+FEATURES = {'valence': 0.3, 'arousal': -0.4, 'dominance': 0.2, 'subjectivity': 0.6, 'variation': 0.3,
+            'density': 0.1}
+TRAJECTORY = {k: np.array([v, -v, v / 2]) for k, v in FEATURES.items()}
+TEXT = ("I love the bright morning and the calm sea. Then the storm came, and fear and anger "
+        "filled the harbour, but by evening hope returned. ") * 3
+AXES = {'interval_max': [1.0, 2.0], 'chord_vol_max': [0.1, 0.4], 'root': [220.0, 261.63]}
+
+
+def test_grid_matches_one_setting_at_a_time():
+    mapped = sweep.sweep_params(FEATURES, TRAJECTORY, AXES, APP)
+    assert len(mapped) == 8
+    for settings, params, windows in mapped:
+        assert params == pytest.approx(soundscape_params(FEATURES, settings))
+        expected = soundscape_params(TRAJECTORY, settings)
+        for k in expected:
+            np.testing.assert_allclose(windows[k], expected[k])
+
+
+def test_app_preset():
+    params = soundscape_params(FEATURES, APP)
+    # the app's volume ranges, its 0.5-4 s intervals and arousal/dominance rescaled from [-1, 1]
+    assert params['chord_vol'] == pytest.approx(0.4 - 0.3 * 0.39)
+    assert params['note_vol'] == pytest.approx(1.0 + 0.3 * 2.0)
+    assert params['tempo'] == pytest.approx(4.0 - (1 - 0.4) / 2 * 3.5)
+    assert params['dominance'] == pytest.approx(0.6)
+    # the default mapping clips them instead
+    assert soundscape_params(FEATURES)['tempo'] == DEFAULTS['interval_max']
+
+
+def test_app_follows_variation():
+    quiet, busy = (soundscape_params(dict(FEATURES, variation=v), APP) for v in (0.0, 1.0))
+    assert (quiet['chord_vol'], quiet['note_vol']) == pytest.approx((0.4, 1.0))
+    assert (busy['chord_vol'], busy['note_vol']) == pytest.approx((0.01, 3.0))
+    # and its envelope is main.py's
+    assert {k: quiet[k] for k in ('attack', 'decay', 'sustain', 'release', 'duration')} == \
+        pytest.approx({k: soundscape_params(dict(FEATURES, variation=0.0))[k]
+                       for k in ('attack', 'decay', 'sustain', 'release', 'duration')})
+
+
+def test_previews_analyse_once(monkeypatch):
+    calls = []
+    analyze = sweep.analyze_text
+    monkeypatch.setattr(sweep, 'analyze_text', lambda text: calls.append(text) or analyze(text))
+    monkeypatch.setattr(sweep, '_ANALYSES', sweep.LRUCache())
+    axes = {'interval_max': [0.5, 2.0]}
+    previews = sweep.render_previews(TEXT, axes, seconds=1.0, workers=1)
+    again = sweep.render_previews(TEXT, axes, seconds=1.0, workers=2)
+    assert len(calls) == 1
+    for (settings, audio), (_, audio2) in zip(previews, again):
+        assert audio.shape == (44100, 2)
+        np.testing.assert_array_equal(audio, audio2)
+        _, params, windows = [m for m in sweep.sweep_params(*sweep.analyze_once(TEXT), axes)
+                              if m[0] == settings][0]
+        np.testing.assert_array_equal(audio, render_soundscape(params, windows, 1.0, 1, interval_range=(
+            settings['interval_min'], settings['interval_max'])))
+    assert not np.array_equal(previews[0][1], previews[1][1])
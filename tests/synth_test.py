@@ -0,0 +1,54 @@
+# Test the NumPy synthesis engine: envelope shape, voice pool, and the same audio as pyo
+
+import wave
+import numpy as np
+import pytest
+from mapping import soundscape_params
+from audio_backend import render_soundscape
+from synth import SynthEngine, adsr
+
+FEATURES = {'valence': -0.3, 'arousal': 0.8, 'dominance': 0.5, 'subjectivity': 0.4,
+            'variation': 0.2, 'density': 0.1}
+
+
+def test_adsr():
+    t = np.array([-0.1, 0.0, 0.05, 0.1, 0.2, 0.3, 0.5, 0.6, 0.85, 1.0, 1.2])
+    expected = [0, 0, 0.5, 1, 0.75, 0.5, 0.5, 0.5, 0.25, 0, 0]
+    assert np.allclose(adsr(t, 0.1, 0.2, 0.5, 0.3, 1.0), expected)
+
+
+def test_voice_pool_steals_the_oldest_note():
+    engine = SynthEngine(voices=4)
+    for k in range(6):
+        engine.note_on(300.0 + k, 0.1, 0.01, 0.1, 0.5, 0.5, 2.0)
+        engine.render(256)
+    assert engine.stolen == 2 and engine.active.all()
+    # a fixed pool: the third note went to the voice of the first one
+    assert engine.freq.tolist() == [304.0, 305.0, 302.0, 303.0]
+    engine.render(2 * 44100)
+    assert not engine.active.any()
+
+
+def test_render_is_deterministic():
+    params = soundscape_params(FEATURES)
+    a = render_soundscape(params, duration=3.0, seed=1)
+    assert a.shape == (3 * 44100, 2) and a.dtype == np.float32
+    assert np.array_equal(a[:, 0], a[:, 1])
+    assert np.array_equal(a, render_soundscape(params, duration=3.0, seed=1))
+    assert not np.array_equal(a, render_soundscape(params, duration=3.0, seed=2))
+
+
+def test_same_audio_as_pyo(tmp_path, monkeypatch):
+    pytest.importorskip('pyo')
+    import render
+    # quiet enough that the 16-bit pyo file does not clip
+    params = soundscape_params(FEATURES)
+    params.update(chord_vol=0.05, note_vol=0.15)
+    monkeypatch.setattr(render, 'soundscape_params', lambda features: params)
+    render.render(FEATURES, tmp_path / 'pyo.wav', duration=5.0, seed=3, engine='pyo')
+    with wave.open(str(tmp_path / 'pyo.wav')) as w:
+        expected = np.frombuffer(w.readframes(w.getnframes()), '<i2').reshape(-1, 2) / 32767
+    got = render_soundscape(params, duration=5.0, seed=3, quantum=256)
+    # pyo fades in over its first few milliseconds, compare from the second block on
+    diff = got[256:] - expected[256:len(got)]
+    assert np.sqrt(np.mean(diff ** 2)) < 0.01 * np.sqrt(np.mean(got ** 2)) + 1e-4
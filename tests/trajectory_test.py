@@ -0,0 +1,54 @@
+# Test the windowed trajectories against analysing each window on its own
+
+import numpy as np
+import pytest
+from six_dimensions import (compute_lexical_density, compute_sentiment_variation, compute_subjectivity,
+                            compute_vad, load_vad_lexicon, scan_text)
+from trajectory import analyze_windows
+
+TEXT = ("I am not very happy!! :) It's really good (!) but Mr. Smith isn't sure.\n\n"
+        "He said \"no\" -- never.  Very   bad; extremely nice, and so-so. U.S. citizens don't care. "
+        "This course will focus on practices of embodiment, listening, and sensing vibration. "
+        "Our own bodies and voices, individual and collective, will be our primary sites of research.")
+
+
+@pytest.mark.parametrize('text', ["", "and", ". ", TEXT])
+@pytest.mark.parametrize('unit', ['words', 'clauses'])
+def test_one_window_is_the_whole_text(text, unit):
+    traj = analyze_windows(text, window=10000, hop=1, unit=unit)
+    assert len(traj['start']) == 1
+    expected = compute_vad(text)
+    expected['subjectivity'] = compute_subjectivity(text)
+    expected['variation'] = compute_sentiment_variation(text)
+    expected['density'] = compute_lexical_density(text)
+    for k, v in expected.items():
+        assert abs(traj[k][0] - v) < 1e-9, k
+
+
+def test_word_windows():
+    words = TEXT.split()
+    traj = analyze_windows(TEXT, window=7, hop=3)
+    starts = list(range(0, len(words) - 7 + 1, 3))
+    assert (len(words) - 7) % 3 and starts[-1] < len(words) - 7          # the hops miss the end...
+    assert list(traj['start']) == starts + [len(words) - 7]              # ...so a last window ends there
+    assert traj['end'][-1] == len(words)
+    for start, end, valence, arousal in zip(traj['start'], traj['end'], traj['valence'], traj['arousal']):
+        vad = compute_vad(" ".join(words[start:end]))
+        assert abs(valence - vad['valence']) < 1e-9
+        assert abs(arousal - vad['arousal']) < 1e-9
+
+
+def test_clause_windows():
+    clause_vals = scan_text(TEXT, load_vad_lexicon()).clause_valences()
+    for hop in (2, 3):
+        assert analyze_windows(TEXT, window=4, hop=hop, unit='clauses')['end'][-1] == len(clause_vals)
+    traj = analyze_windows(TEXT, window=4, hop=2, unit='clauses')
+    for start, end, variation in zip(traj['start'], traj['end'], traj['variation']):
+        assert abs(variation - np.std(clause_vals[start:end])) < 1e-9
+
+
+def test_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        analyze_windows(TEXT, unit='sentences')
+    with pytest.raises(ValueError):
+        analyze_windows(TEXT, window=10, hop=0)
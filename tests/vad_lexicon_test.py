@@ -0,0 +1,58 @@
+# Test the cached VAD lexicon store
+
+import os
+import numpy as np
+from six_dimensions import compute_vad
+from vad_lexicon import ARTIFACT, DEFAULT_LEXICON, STALE, build_vad_lexicon, cache_dir, get_vad_lexicon
+
+CSV = "term,valence,arousal,dominance\nhappy,0.985,0.47,0.39\nsad,-0.8,-0.3,-0.4\na bit,-0.096,-0.264,-0.214\n"
+
+
+def write_csv(path, body):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(body)
+
+
+def test_cache_is_built_and_memory_mapped(tmp_path):
+    path = str(tmp_path / "lex.csv")
+    write_csv(path, CSV)
+    cold = build_vad_lexicon(path)
+    assert os.path.exists(os.path.join(cache_dir(path), ARTIFACT))
+    warm = build_vad_lexicon(path)
+    assert isinstance(warm.vad, np.memmap)
+    assert warm.terms == cold.terms
+    assert warm['happy'] == {'valence': 0.985, 'arousal': 0.47, 'dominance': 0.39}
+    assert list(warm.lookup(['sad', 'nope', 'a bit'])) == [1, -1, 2]
+
+
+def test_rebuild_removes_the_old_cache_files(tmp_path):
+    path = str(tmp_path / "lex.csv")
+    write_csv(path, CSV)
+    cdir = cache_dir(path)
+    os.makedirs(cdir)
+    for name in STALE:
+        write_csv(os.path.join(cdir, name), "left by version 1")
+    build_vad_lexicon(path)
+    assert sorted(os.listdir(cdir)) == [ARTIFACT, 'meta.json']
+
+
+def test_cache_invalidated_when_csv_changes(tmp_path):
+    path = str(tmp_path / "lex.csv")
+    write_csv(path, CSV)
+    assert get_vad_lexicon(path)['sad']['valence'] == -0.8
+    write_csv(path, CSV.replace("-0.8", "-0.7") + "calm,0.5,-0.6,0.1\n")
+    os.utime(path, ns=(0, 10**9))
+    lex = get_vad_lexicon(path)
+    assert lex['sad']['valence'] == -0.7
+    assert 'calm' in lex
+    assert build_vad_lexicon(path)['calm']['arousal'] == -0.6
+
+
+def test_shipped_lexicon_has_null_and_no_empty_term():
+    # row 32949 is the word "null" (once read as a missing value and left empty)
+    lex = build_vad_lexicon(DEFAULT_LEXICON, use_cache=False)
+    assert lex['null'] == {'valence': -0.494, 'arousal': -0.706, 'dominance': -0.696}
+    assert '' not in lex
+    # tokens that strip to nothing match no term, so they add nothing to a text's scores
+    assert lex.lookup_words(['...', '?!', 'null.']).tolist() == [-1, -1, lex.index['null']]
+    assert compute_vad("... ?! ;", lex) == {'valence': 0.0, 'arousal': 0.0, 'dominance': 0.0}
@@ -3,7 +3,7 @@
 # Elizabeth Li 5/13/2025
 # Continuous, gap-free valence chord via pyo.
 
-from pyo import Server, Sine
+from audio_backend import get_backend
 from six_dimensions import analyze_text   # your sentiment analyzer
 
 # 1) Hardcoded text
@@ -25,19 +25,15 @@ root_freq = root_c4 * (2 ** valence*2)
 # 5) Compute chord frequencies
 chord_freqs = [root_freq * (2 ** (i / 12)) for i in intervals]
 
-# 6) Boot pyo server (stereo out, no input)
-s = Server(duplex=False, nchnls=2, sr=44100, audio='portaudio').boot()
-s.start()
+# 6) Audio backend (pyo unless SOUNDSCAPE_AUDIO says otherwise), booted by the first sound
+backend = get_backend()
 
-# 7) Instantiate and sustain voices on both channels
+# 7) Sustain the chord on both channels
 amp = 0.3
-left_voices, right_voices = [], []
-for f in chord_freqs:
-    left_voices.append(Sine(freq=f, mul=amp).out(chnl=0) )
-    right_voices.append(Sine(freq=f, mul=amp).out(chnl=1) )
+backend.set_chord(chord_freqs, amp)
 
 print(f"Valence={valence:.2f} → root={root_freq:.1f}Hz → "
       f"{'major' if valence>=0 else 'minor'} triad (continuous)")
 
 # 8) GUI loop holds the server alive with zero dropouts
-s.gui(locals())
\ No newline at end of file
+backend.wait(locals())
\ No newline at end of file
@@ -0,0 +1,100 @@
+# Test the voice allocator: the ring, stealing by age and amplitude, reclamation, and a soak run
+
+import gc
+import tracemalloc
+
+import pytest
+
+import metrics
+from audio_backend import NullBackend, PyoBackend
+from soundscape import Soundscape
+from voices import VoiceAllocator
+
+SR = 44100
+NOTE = (0.01, 0.1, 0.5, 0.5, 2.0)       # attack, decay, sustain, release, dur
+PARAMS = {'chord': [220.0, 277.18, 329.63], 'chord_vol': 0.1, 'note_vol': 0.5, 'tempo': 0.3,
+          'dominance': 0.5, 'attack': 0.01, 'decay': 0.1, 'sustain': 0.5, 'release': 0.3, 'duration': 1.5}
+
+
+def test_ring_reuses_free_voices_and_steals_the_oldest():
+    alloc = VoiceAllocator(4, sr=SR)
+    assert [alloc.allocate(k * SR, 0.1, *NOTE) for k in range(3)] == [0, 1, 2]
+    # at 3 s voices 0 and 1 are done, but the ring goes on to voice 3 first
+    assert [alloc.allocate(3 * SR, 0.1, *NOTE) for _ in range(3)] == [3, 0, 1]
+    assert alloc.live(3 * SR) == 4 and alloc.stolen.sum() == 0
+    # all busy: the earliest onset goes
+    assert alloc.allocate(3 * SR, 0.1, *NOTE) == 2
+    assert alloc.stats(3 * SR)['stolen'] == 1 and alloc.live(3 * SR) == 4
+
+
+def test_amplitude_stealing_takes_the_quietest():
+    alloc = VoiceAllocator(3, steal='amplitude', sr=SR)
+    alloc.allocate(0, 0.9, *NOTE)                  # loud, sustaining
+    alloc.allocate(0, 0.1, *NOTE)                  # quiet
+    alloc.allocate(2 * SR, 0.05, *NOTE)             # quietest of all, but not started yet
+    assert alloc.allocate(SR // 2, 0.5, *NOTE) == 1
+    with pytest.raises(ValueError):
+        VoiceAllocator(3, steal='loudest')
+
+
+def test_reclaim_frees_a_pool():
+    alloc = VoiceAllocator(2, sr=SR, pools=2)
+    for pool in (0, 1):
+        for _ in range(3):
+            alloc.allocate(0, 0.1, *NOTE, pool=pool)
+    assert alloc.stolen.tolist() == [1, 1]
+    metrics.enable()
+    try:
+        metrics.reset()
+        assert alloc.reclaim(SR, pool=1) == 2
+        assert alloc.live(SR) == 2 and alloc.allocate(SR, 0.1, *NOTE, pool=1) in (2, 3)
+        assert metrics.stats()['counters']['voices_reclaimed'] == 2
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+
+def test_pyo_voices_are_reused():
+    pytest.importorskip('pyo')
+    backend = PyoBackend(audio='offline', verbosity=1, voices=4)
+    try:
+        for k in range(20):
+            backend.note_on(300.0 + k, 0.1, *NOTE)
+        assert len(backend.pool) == 4 and backend.voices.stolen.sum() == 16
+        backend.stop()
+        assert not backend.pool and backend.voices.live(backend.now) == 0
+    finally:
+        backend.shutdown()
+
+
+def test_soak_hours_on_the_null_backend_hold_flat_memory():
+    # a day of simulated time; like the app, a new soundscape replaces the old one every hour
+    backend = NullBackend(keep=1000)
+
+    def hour(seed, seconds=3600):
+        scape = Soundscape(PARAMS, seed=seed).start(backend)
+        backend.run(seconds)
+        assert backend.voices.live(backend.now) <= backend.voices.capacity
+        scape.stop()
+        assert backend.voices.live(backend.now) == 0
+        gc.collect()
+
+    objects = []
+    for seed in range(23):
+        hour(seed)
+        objects.append(len(gc.get_objects()))
+    # then to the byte (tracing is slow), over two half hours that each turn the event log over:
+    # nothing the second one allocated is still held
+    tracemalloc.start()
+    try:
+        hour(23, 1800)
+        before = tracemalloc.get_traced_memory()[0]
+        hour(24, 1800)
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    stats = backend.voices.stats(backend.now)
+    assert stats['allocated'] > 50_000 and stats['capacity'] == 32 and stats['bytes'] < 4096
+    assert len(backend.events) == 1000
+    assert max(objects[1:]) - objects[1] < 100, objects
+    assert held < 16 * 1024, held
@@ -0,0 +1,146 @@
+# sliding-window trajectories of the six dimensions over the course of a text
+#   traj = analyze_windows(text, window=200, hop=50)                 # windows of words
+#   traj = analyze_windows(text, window=8, hop=2, unit='clauses')    # windows of clauses
+# every feature comes back as a NumPy array with one value per window. per-word
+# values are prefix-summed once, so a trajectory costs O(n) for any number of windows.
+
+import numpy as np
+
+from incremental import _SubjectivityStream
+from six_dimensions import lexicon, load_vad_lexicon, scan_text
+
+UNITS = ('words', 'clauses')
+
+
+class _SubjectivityTrace(_SubjectivityStream):
+    """The subjectivity stream, keeping every assessment and where it starts.
+
+    Offsets count non-whitespace characters, i.e. positions in "".join(text.split()):
+    the pattern tokenizer only inserts spaces, so its tokens line up with the
+    whitespace tokens.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.assessments = []   # the [subjectivity, intensity] lists, updated in place
+        self.offsets = []
+        self._at = 0
+
+    def _push(self, s, i):
+        super()._push(s, i)
+        self.assessments.append(self.last)
+        self.offsets.append(self._at)
+
+    def feed(self, text):
+        for w in self._tokens(text):
+            self._word(w)
+            self._at += len(w)
+
+
+def _prefix(values, axis=-1):
+    """Prefix sums with a leading zero, so sum(values[a:b]) == p[b] - p[a]."""
+    values = np.asarray(values, dtype=np.float64)
+    pad = [(0, 0)] * values.ndim
+    pad[axis] = (1, 0)
+    return np.pad(np.cumsum(values, axis=axis), pad)
+
+
+def _subjectivity_per_word(text, words):
+    """Sum of assessment subjectivities and number of assessments per whitespace token."""
+    trace = _SubjectivityTrace()
+    trace.feed(text)
+    sums = np.zeros(len(words))
+    counts = np.zeros(len(words))
+    if trace.assessments:
+        word_ends = np.cumsum([len(w) for w in words])
+        at = np.searchsorted(word_ends, trace.offsets, side='right')
+        at = np.minimum(at, len(words) - 1)
+        np.add.at(sums, at, [s for s, _ in trace.assessments])
+        np.add.at(counts, at, 1)
+    return sums, counts
+
+
+def _emotions_per_word(words, vad_lex):
+    """NRCLex emotion labels per whitespace token, from the lexicon's emotion index."""
+    return vad_lex.emotions.lookup_words(words).astype(np.float64)
+
+
+def _window_starts(n, window, hop):
+    # a text shorter than one window still gets a single (shorter) window; when the hops fall
+    # short of the end, one more window ends at it, so the last words are always covered
+    last = max(n - window, 0)
+    starts = np.arange(0, last + 1, hop)
+    return starts if starts[-1] == last else np.append(starts, last)
+
+
+def _ratio(num, den):
+    return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den > 0)
+
+
+def analyze_windows(text, window=200, hop=50, unit='words', vad_path=lexicon):
+    """Six-dimension trajectories over windows of window words (or clauses), every hop.
+
+    Returns a dict of arrays with one entry per window: valence, arousal, dominance,
+    subjectivity, variation and density as analyze_text computes them on the
+    window, plus 'start' and 'end', the window bounds in words or clauses.
+    A window's variation is taken over the clauses that start inside it.
+    """
+    if unit not in UNITS:
+        raise ValueError(f"unit must be one of {UNITS}, not {unit!r}")
+    if window < 1 or hop < 1:
+        raise ValueError("window and hop must be positive")
+    vad_lex = load_vad_lexicon(vad_path)
+    words = text.split()
+    scan = scan_text(text, vad_lex)
+    n = len(words)
+
+    # 1. per-word values, as prefix sums
+    hit = scan.word_ids >= 0
+    vad = np.zeros((3, n))
+    vad[:, hit] = vad_lex.scores(scan.word_ids[hit])
+    vad_sums, vad_hits = _prefix(vad), _prefix(hit)
+    subj, assessed = _subjectivity_per_word(text, words)
+    subj_sums, subj_counts = _prefix(subj), _prefix(assessed)
+    emotion_sums = _prefix(_emotions_per_word(words, vad_lex))
+
+    # 2. clause valences (and squares, for the standard deviation), by the word they start in
+    clause_vals = scan.clause_valences()
+    clause_word = np.searchsorted(scan.word_offsets, scan.clause_offsets, side='right') - 1
+    clause_word = np.maximum(clause_word, 0)
+    val_sums, sq_sums = _prefix(clause_vals), _prefix(clause_vals ** 2)
+
+    # 3. window bounds, in words and in clauses
+    if unit == 'words':
+        start = _window_starts(n, window, hop)
+        end = np.minimum(start + window, n)
+        w0, w1 = start, end
+        c0 = np.searchsorted(clause_word, w0, side='left')
+        c1 = np.searchsorted(clause_word, w1, side='left')
+    else:
+        m = len(clause_vals)
+        start = _window_starts(m, window, hop)
+        end = np.minimum(start + window, m)
+        c0, c1 = start, end
+        bounds = np.append(clause_word, n)
+        bounds[0] = 0                   # words in front of the first clause belong to it
+        w0 = bounds[c0]
+        w1 = bounds[c1] if m else np.array([n])
+
+    # 4. window features from prefix-sum differences
+    hits = vad_hits[w1] - vad_hits[w0]
+    vad_mean = _ratio(vad_sums[:, w1] - vad_sums[:, w0], hits)
+    clauses = c1 - c0
+    mean = _ratio(val_sums[c1] - val_sums[c0], clauses)
+    var = _ratio(sq_sums[c1] - sq_sums[c0], clauses) - mean ** 2
+    variation = np.where(clauses > 1, np.sqrt(np.maximum(var, 0.0)), 0.0)
+
+    return {
+        'valence': vad_mean[0],
+        'arousal': vad_mean[1],
+        'dominance': vad_mean[2],
+        'subjectivity': _ratio(subj_sums[w1] - subj_sums[w0], subj_counts[w1] - subj_counts[w0]),
+        'variation': variation,
+        'density': _ratio(emotion_sums[w1] - emotion_sums[w0], w1 - w0),
+        'start': start,
+        'end': end,
+    }
@@ -0,0 +1,244 @@
+# compact, process-wide store for the NRC-VAD lexicon
+# terms are mapped to integer ids and valence/arousal/dominance live in one float32 array.
+# the source (.csv, or NRC's .txt) is ingested once into a binary artifact (ingest.py) kept next
+# to it, which later starts memory-map; an artifact can also be loaded directly.
+
+import json
+import os
+import numpy as np
+from ingest import DIMENSIONS, build_arrays, file_hash, open_artifact, read_lexicon, write_artifact
+from phrases import PhraseTrie
+
+DEFAULT_LEXICON = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'NRC-VAD-Lexicon-v2.1.csv')
+CACHE_VERSION = 2
+
+# same token normalisation six_dimensions has always used
+STRIP_CHARS = '.,!?;:'
+
+
+class VADLexicon:
+    """Terms -> ids, with scores in a (3, n_terms) float32 array (one row per dimension).
+
+    The terms are kept sorted (keys, with term_ids giving each one's id) and found by
+    binary search, so a lexicon mapped from its artifact is ready without building a dict.
+    """
+
+    def __init__(self, arrays, source=None, sha256=None):
+        self.arrays = arrays
+        self.keys = arrays['keys']
+        self.term_ids = arrays['term_ids']
+        self.vad = arrays['vad']
+        self.source = source
+        self.sha256 = sha256            # of the source file's contents
+        self._terms = None
+        self._index = None
+        self._phrases = None
+        self._emotions = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, term):
+        return self._find([term])[0] >= 0
+
+    def __iter__(self):
+        return iter(self.terms)
+
+    def __getitem__(self, term):
+        # keeps the old dict-of-dicts access pattern working: vad_lex[t]['valence']
+        i = int(self._find([term])[0])
+        if i < 0:
+            raise KeyError(term)
+        return {dim: float(self.scores(i)[k]) for k, dim in enumerate(DIMENSIONS)}
+
+    @property
+    def terms(self):
+        """The terms in id order, decoded on first use."""
+        if self._terms is None:
+            rank = np.empty(len(self.keys), dtype=np.int64)
+            rank[self.term_ids] = np.arange(len(self.keys))
+            self._terms = self.keys[rank].tolist()
+        return self._terms
+
+    @property
+    def index(self):
+        """Term -> id dict, built on first use (lookups do not need it)."""
+        if self._index is None:
+            self._index = dict(zip(self.keys.tolist(), self.term_ids.tolist()))
+        return self._index
+
+    def _find(self, terms):
+        """Ids of normalised terms by binary search over the sorted keys (-1 if absent)."""
+        if not len(terms):
+            return np.zeros(0, dtype=np.int32)
+        query = np.array(terms, dtype=str)
+        width = self.keys.dtype.itemsize // 4
+        longer = np.char.str_len(query) > width if query.dtype.itemsize > 4 * width else None
+        query = query.astype(self.keys.dtype)   # same width as the keys (longer ones are cut, and flagged)
+        at = np.minimum(np.searchsorted(self.keys, query), len(self.keys) - 1)
+        found = self.keys[at] == query
+        if longer is not None:
+            found &= ~longer
+        return np.where(found, self.term_ids[at], -1).astype(np.int32)
+
+    def lookup(self, tokens):
+        """Map normalised tokens to term ids (-1 for tokens not in the lexicon)."""
+        return self._find(tokens)
+
+    def lookup_words(self, words, extra=None):
+        """Like lookup, for raw whitespace tokens; each distinct word is normalised only once.
+
+        extra maps further words (e.g. PhraseTrie.extra) to ids past the lexicon.
+        """
+        distinct = list(set(words))
+        normal = [w.strip(STRIP_CHARS).lower() for w in distinct]
+        table = dict(zip(distinct, self._find(normal).tolist()))
+        if extra:
+            for w, n in zip(distinct, normal):
+                if table[w] < 0:
+                    table[w] = extra.get(n, -1)
+        return np.fromiter(map(table.__getitem__, words), dtype=np.int32, count=len(words))
+
+    @property
+    def phrases(self):
+        """PhraseTrie over the multi-word terms, from the artifact's arrays when it has them."""
+        if self._phrases is None:
+            if 'phrase_terminal' in self.arrays:
+                self._phrases = PhraseTrie.from_arrays(self.arrays, len(self))
+            else:
+                self._phrases = PhraseTrie(self.terms, self.index)
+        return self._phrases
+
+    @property
+    def emotions(self):
+        """EmotionIndex of the NRCLex emotion words over these term ids, built on first use."""
+        if self._emotions is None:
+            from emotion_lexicon import EmotionIndex    # pulls in nltk, only when density is needed
+            self._emotions = EmotionIndex(self.index, len(self))
+        return self._emotions
+
+    def scores(self, ids):
+        # the CSV carries at most three decimals, so rounding the float32 value
+        # back to three places recovers exactly the float the CSV parses to
+        return np.round(self.vad[:, ids].astype(np.float64), 3)
+
+
+def normalize_tokens(text):
+    return [w.strip(STRIP_CHARS).lower() for w in text.split()]
+
+
+# 1. binary cache next to the source: <name>.cache/{lexicon.vadlex, meta.json}
+ARTIFACT = 'lexicon.vadlex'
+STALE = ('vad.npy', 'terms.txt')        # the version 1 cache, replaced by the artifact
+
+
+def cache_dir(filepath):
+    return os.path.splitext(filepath)[0] + '.cache'
+
+
+def _read_meta(cdir):
+    try:
+        with open(os.path.join(cdir, 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path, write):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _write_meta(cdir, meta):
+    def write(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+    _write_atomic(os.path.join(cdir, 'meta.json'), write)
+
+
+def _write_cache(cdir, arrays, meta):
+    os.makedirs(cdir, exist_ok=True)
+    write_artifact(os.path.join(cdir, ARTIFACT), arrays, source_sha256=meta['sha256'])
+    # meta goes last, so a half-written cache never validates
+    _write_meta(cdir, meta)
+    for name in STALE:
+        try:
+            os.remove(os.path.join(cdir, name))
+        except FileNotFoundError:
+            pass
+
+
+def _cache_is_fresh(cdir, filepath, st):
+    """Cheap mtime/size check first, content hash only when those changed."""
+    meta = _read_meta(cdir)
+    if not meta or meta.get('version') != CACHE_VERSION:
+        return False, None
+    if meta.get('size') == st.st_size and meta.get('mtime_ns') == st.st_mtime_ns:
+        return True, meta
+    digest = file_hash(filepath)
+    if meta.get('sha256') != digest:
+        return False, digest
+    # touched but unchanged: refresh the stamp so the next start skips the hash
+    meta.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+    try:
+        _write_meta(cdir, meta)
+    except OSError:
+        pass
+    return True, meta
+
+
+def build_vad_lexicon(filepath=DEFAULT_LEXICON, use_cache=True):
+    """Load the lexicon from its binary cache, (re)building the cache when the source changed.
+
+    filepath is a .csv, NRC's tab-separated .txt or an artifact ingest.py wrote (.vadlex).
+    Invalid rows of a source are left out with a warning (ingest.py refuses them).
+    """
+    filepath = os.path.abspath(filepath)
+    if filepath.endswith('.vadlex'):
+        header, arrays = open_artifact(filepath)
+        return VADLexicon(arrays, source=filepath, sha256=header.get('source_sha256', header['sha256']))
+    st = os.stat(filepath)
+    cdir = cache_dir(filepath)
+    digest = None
+    if use_cache:
+        fresh, info = _cache_is_fresh(cdir, filepath, st)
+        if fresh:
+            try:
+                _, arrays = open_artifact(os.path.join(cdir, ARTIFACT))
+                return VADLexicon(arrays, source=filepath, sha256=info['sha256'])
+            except (OSError, ValueError, KeyError):
+                pass
+        else:
+            digest = info
+
+    arrays = build_arrays(*read_lexicon(filepath, strict=False))
+    digest = digest or file_hash(filepath)
+    if use_cache:
+        meta = {
+            'version': CACHE_VERSION,
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'sha256': digest,
+        }
+        try:
+            _write_cache(cdir, arrays, meta)
+        except OSError:
+            # read-only checkout: keep working from memory
+            pass
+    return VADLexicon(arrays, source=filepath, sha256=digest)
+
+
+# 2. one shared instance per lexicon file for the whole process
+_LEXICONS = {}
+
+
+def get_vad_lexicon(filepath=DEFAULT_LEXICON):
+    filepath = os.path.abspath(filepath)
+    st = os.stat(filepath)
+    stamp = (st.st_size, st.st_mtime_ns)
+    cached = _LEXICONS.get(filepath)
+    if cached is None or cached[0] != stamp:
+        cached = (stamp, build_vad_lexicon(filepath))
+        _LEXICONS[filepath] = cached
+    return cached[1]
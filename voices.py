@@ -0,0 +1,114 @@
+# fixed-capacity voice allocation for the audio backends: a ring of reusable voices per pool,
+# one stolen when all are busy, and every voice given back when its stream or pattern stops
+#   alloc = VoiceAllocator(32, steal='amplitude')
+#   v = alloc.allocate(onset, amp, attack, decay, sustain, release, dur)     # onset in samples
+#   alloc.reclaim(now)                  # the stream stopped: all its voices are free again
+#   alloc.live(now); alloc.stats()      # voices sounding; counters and the bytes the state holds
+# a free voice is taken round-robin from a cursor, so a just-released voice rests longest.
+# steal='age' takes the voice with the earliest onset, 'amplitude' the one whose envelope is
+# lowest at the new onset (voices not started yet are stolen last). MixEngine keeps one pool
+# per stream (add_pool); a note only takes a voice of its own pool. the state is a few arrays
+# of fixed size, so memory stays where it was after the first notes however long a piece runs.
+
+import math
+
+import numpy as np
+
+import metrics
+
+STEAL = ('age', 'amplitude')
+
+
+class VoiceAllocator:
+    """Pools of capacity voices: which voice plays each note, on a sample clock.
+
+    A voice is busy from its note's onset until dur seconds later, the end of
+    its ADSR envelope.
+    """
+
+    def __init__(self, capacity, steal='age', sr=44100, pools=1):
+        if steal not in STEAL:
+            raise ValueError(f"steal must be one of {STEAL}, not {steal!r}")
+        self.capacity, self.steal, self.sr = capacity, steal, sr
+        self.onset = np.zeros(0, dtype=np.int64)
+        self.end = np.zeros(0, dtype=np.int64)          # first sample after the note
+        self.adsr = np.zeros((0, 6))                    # amp, attack, decay, sustain, release, dur
+        self.cursor = np.zeros(0, dtype=np.int64)       # per pool: where the ring goes on
+        self.stolen = np.zeros(0, dtype=np.int64)       # per pool
+        self.allocated = self.reclaimed = 0
+        for _ in range(pools):
+            self.add_pool()
+
+    def __len__(self):
+        return len(self.end)
+
+    @property
+    def pools(self):
+        return len(self.cursor)
+
+    def add_pool(self):
+        """Room for one more pool of voices; its id."""
+        n = self.capacity
+        self.onset = np.append(self.onset, np.zeros(n, dtype=np.int64))
+        self.end = np.append(self.end, np.zeros(n, dtype=np.int64))
+        self.adsr = np.vstack([self.adsr, np.ones((n, 6))])
+        self.cursor = np.append(self.cursor, 0)
+        self.stolen = np.append(self.stolen, 0)
+        return self.pools - 1
+
+    def levels(self, now, voices=slice(None)):
+        """Envelope levels of voices at sample now (0 before the onset and after the end)."""
+        from synth import adsr          # synth builds its engines on this module
+        amp, attack, decay, sustain, release, dur = self.adsr[voices].T
+        level = amp * adsr((now - self.onset[voices]) / self.sr, attack, decay, sustain, release, dur)
+        return np.where(now < self.end[voices], level, 0.0)
+
+    def allocate(self, onset, amp, attack, decay, sustain, release, dur, pool=0):
+        """The voice (an index over all pools) to play a note starting at sample onset."""
+        first = pool * self.capacity
+        mine = slice(first, first + self.capacity)
+        free = np.flatnonzero(self.end[mine] <= onset)
+        if len(free):
+            v = free[np.searchsorted(free, self.cursor[pool]) % len(free)]
+        else:
+            if self.steal == 'age':
+                v = int(np.argmin(self.onset[mine]))
+            else:
+                level = np.where(self.onset[mine] > onset, np.inf, self.levels(onset, mine))
+                v = int(np.argmin(level))
+            self.stolen[pool] += 1
+            if metrics.enabled():
+                metrics.count('voices_stolen')
+        self.cursor[pool] = (v + 1) % self.capacity
+        v += first
+        self.onset[v] = onset
+        self.end[v] = onset + math.ceil(dur * self.sr)
+        self.adsr[v] = amp, attack, decay, sustain, release, dur
+        self.allocated += 1
+        if metrics.enabled():
+            metrics.gauge('live_voices', self.live(onset))
+        return int(v)
+
+    def reclaim(self, now, pool=None):
+        """Free every voice (of one pool, or all) at sample now; the number that were still busy."""
+        voices = slice(None) if pool is None else slice(pool * self.capacity, (pool + 1) * self.capacity)
+        busy = int((self.end[voices] > now).sum())
+        self.end[voices] = np.minimum(self.end[voices], now)
+        self.onset[voices] = np.minimum(self.onset[voices], now)
+        self.reclaimed += busy
+        if metrics.enabled():
+            metrics.count('voices_reclaimed', busy)
+            metrics.gauge('live_voices', self.live(now))
+        return busy
+
+    def live(self, now):
+        """Voices busy at sample now (sounding, or started for a later onset)."""
+        return int((self.end > now).sum())
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.onset, self.end, self.adsr, self.cursor, self.stolen))
+
+    def stats(self, now):
+        return {'capacity': len(self), 'live': self.live(now), 'allocated': self.allocated,
+                'stolen': int(self.stolen.sum()), 'reclaimed': self.reclaimed, 'bytes': self.nbytes}